@@ -5,8 +5,19 @@ from routes.alunos import alunos_bp
 # Importa o novo blueprint de autenticação
 from routes.auth import auth_bp 
 
-import logging
-from logging.handlers import RotatingFileHandler
+import database
+import replicas
+import contagem
+import exportacao
+import migracoes
+import log_estruturado
+import metricas
+import compressao
+import repositorios
+from config import carregar_configuracao
+import cache_respostas
+from auth import token_cache, senhas, revogacao, sessoes
+
 import os
 import mysql.connector
 
@@ -14,30 +25,68 @@ def create_app():
     """Factory function para criar e configurar a aplicação Flask"""
     app = Flask(__name__)
     
-    # Configurações básicas da aplicação
-    app.config.from_mapping(
-        SECRET_KEY=os.environ.get('SECRET_KEY') or 'dev-key-segura',
-        MAX_CONTENT_LENGTH=16 * 1024 * 1024,   # Limite de 16MB para uploads
-        JSON_SORT_KEYS=False,   # Mantém ordem dos campos no JSON (mais legível para depuração)
-    )
+    # Configurações básicas da aplicação (partilhadas com create_app_async, ver config.py)
+    app.config.from_mapping(carregar_configuracao())
     
     # Configura CORS para permitir requisições do seu frontend Tkinter e outros
     # Adicione as rotas para o Blueprint de autenticação também.
     CORS(app, resources={
         r"/api/v1/alunos/*": {  
             "origins": ["http://localhost:3000", "https://seusite.com"], # Exemplo para frontend web
-            "methods": ["GET", "POST", "PUT", "DELETE"],
-            "allow_headers": ["Content-Type", "Authorization"] # Necessário para enviar o token
+            "methods": ["GET", "POST", "PUT", "PATCH", "DELETE"],
+            "allow_headers": ["Content-Type", "Authorization", "If-Match", "If-None-Match"], # Token e pedidos condicionais
+            "expose_headers": ["ETag"]
         },
         r"/api/v1/auth/*": { # Permite CORS para as rotas de autenticação
             "origins": ["http://localhost:3000", "https://seusite.com"],
             "methods": ["POST"], # Login e registro são geralmente POSTs
-            "allow_headers": ["Content-Type"] # Não precisa de Authorization para login/register
+            "allow_headers": ["Content-Type", "Authorization"] # Authorization é usado no logout
         }
     })
     
-    # Configuração do sistema de logging
-    configure_logging(app)
+    # Logs em JSON através de uma fila: a escrita em disco corre numa thread própria
+    log_estruturado.init_app(app)
+
+    # Cria o pool de conexões com o MySQL (as conexões são abertas sob demanda)
+    database.init_app(app)
+
+    # Pools das réplicas de leitura (DB_REPLICA_HOSTS), usadas pelos pedidos GET
+    replicas.init_app(app)
+
+    # Repositórios usados pelas rotas, sobre o MySQL ou o SQLite (STORAGE_BACKEND)
+    repositorios.init_app(app)
+
+    # Latência por rota, consultas SQL, pool e bcrypt, expostos em GET /metrics
+    if app.config['METRICS_ENABLED']:
+        metricas.init_app(app)
+
+    # Comprime as respostas (gzip, zstd, br) conforme o Accept-Encoding do cliente
+    if app.config['COMPRESSION_ENABLED']:
+        compressao.init_app(app)
+
+    # Cria/atualiza as tabelas e os índices usados pelas consultas
+    migracoes.init_app(app)
+
+    # Cria o cache de tokens validados usado por token_required
+    token_cache.init_app(app)
+
+    # Cria o pool de hashing de senhas usado no registo e no login
+    senhas.init_app(app)
+
+    # Carrega a lista de tokens revogados (logout) usada por token_required
+    revogacao.init_app(app)
+
+    # Apaga em segundo plano as sessões expiradas (thread criada no primeiro pedido de cada processo)
+    sessoes.init_app(app)
+
+    # Cria o contador de alunos usado na paginação
+    contagem.init_app(app)
+
+    # Cria o cache de respostas das rotas de leitura de alunos
+    cache_respostas.init_app(app)
+
+    # Cria o gestor de exportações em segundo plano
+    exportacao.init_app(app)
     
     # Registra os Blueprints na aplicação principal
     register_blueprints(app)
@@ -54,7 +103,7 @@ def create_app():
         Rota de teste simples para verificar conectividade básica do Flask.
         Se esta rota retornar 404, há um problema com a inicialização da aplicação Flask.
         """
-        print("A rota /test foi acedida!") # Mensagem de depuração
+        app.logger.debug("A rota /test foi acedida!") # Mensagem de depuração
         return "Conexão de teste bem-sucedida com o Flask!", 200
     
     @app.route('/db_test')
@@ -64,62 +113,22 @@ def create_app():
         Útil para depurar problemas de conectividade com o MySQL.
         """
         try:
-            db_host = os.environ.get("DB_HOST", "db") 
-            db_user = os.environ.get("DB_USER", "user")
-            db_password = os.environ.get("DB_PASSWORD", "senha")
-            db_name = os.environ.get("DB_NAME", "escola")
-
-            conn = mysql.connector.connect(
-                host=db_host,
-                user=db_user,
-                password=db_password,
-                database=db_name
-            )
+            conn = database.db_connection()
+            conn.ping()
             conn.close()
-            print("Conexão com o banco de dados bem-sucedida!") 
+            app.logger.info("Conexão com o banco de dados bem-sucedida!")
             return jsonify({"message": "Conexão com o banco de dados bem-sucedida!"}), 200
         except mysql.connector.Error as err:
             app.logger.error(f"Erro MySQL ao testar DB: {err}")
-            print(f"Erro MySQL ao testar DB: {err}") 
             return jsonify({"message": f"Erro ao conectar ao banco de dados: {err}", "details": str(err)}), 500
         except Exception as e:
             app.logger.error(f"Erro inesperado ao testar DB: {e}")
-            print(f"Erro inesperado ao testar DB: {e}") 
             return jsonify({"message": f"Erro inesperado ao testar o banco de dados: {e}", "details": str(e)}), 500
     
-    print("Aplicação Flask criada com sucesso.") 
+    app.logger.info("Aplicação Flask criada com sucesso.")
     
     return app
 
-def configure_logging(app):
-    """Configura o sistema de logging da aplicação"""
-    # Cria o diretório 'logs' se não existir
-    if not os.path.exists('logs'):
-        os.mkdir('logs')
-    
-    # Handler para arquivo de log (rotação diária, mantém 7 dias)
-    file_handler = RotatingFileHandler(
-        'logs/api.log',
-        maxBytes=1024 * 1024 * 10,   # 10MB
-        backupCount=7,
-        encoding='utf-8'
-    )
-    # Define o formato das mensagens de log
-    file_handler.setFormatter(logging.Formatter(
-        '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-    ))
-    file_handler.setLevel(logging.INFO) # Define o nível mínimo de log
-    
-    # Remove handlers padrão para evitar logs duplicados
-    for handler in app.logger.handlers[:]:
-        app.logger.removeHandler(handler)
-    
-    # Adiciona os nossos handlers configurados
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO) # Define o nível de log da aplicação
-    
-    app.logger.info('Aplicação iniciada')
-
 def register_blueprints(app):
     """Registra todos os blueprints da aplicação"""
     app.register_blueprint(alunos_bp) 
@@ -133,7 +142,9 @@ if __name__ == '__main__':
     app.config['DEBUG'] = True # Ativa o modo de depuração (recarrega o servidor ao salvar mudanças)
     app.config['TEMPLATES_AUTO_RELOAD'] = True # Recarrega templates automaticamente
 
-    print("Iniciando o servidor Flask...")
+    # Servidor de desenvolvimento (um único processo); em produção use o gunicorn:
+    # gunicorn --config gunicorn.conf.py app:app
+    app.logger.info("Iniciando o servidor Flask...")
 
     # Inicia o servidor Flask
     # host '0.0.0.0' permite acesso de qualquer IP (útil em Docker)
@@ -0,0 +1,80 @@
+from quart import Quart, jsonify
+
+import database_async
+import log_estruturado
+import contagem
+import cache_respostas
+from config import carregar_configuracao
+from auth import token_cache, senhas
+from auth.revogacao import ListaRevogacaoAsync
+from routes_async.alunos import alunos_bp
+from routes_async.auth import auth_bp
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+def create_app_async():
+    """
+    Factory da variante assíncrona da API (Quart), com os mesmos contratos de
+    /api/v1/alunos/ e /api/v1/auth/ que create_app().
+
+    Cada pedido é uma corrotina: enquanto espera pelo MySQL (pool aiomysql) ou
+    pelo bcrypt (pool de processos), não ocupa uma thread, por isso um único
+    processo aguenta milhares de clientes lentos ou inativos. Servir com:
+
+        hypercorn --bind 0.0.0.0:5000 --workers 2 "app_async:create_app_async()"
+
+    A importação em massa (/bulk) e as exportações (/exports) continuam apenas
+    na API síncrona; as migrações também correm por ela ('flask db-migrate'),
+    tal como a limpeza das sessões expiradas (auth/sessoes.py).
+    """
+    app = Quart(__name__)
+    app.config.from_mapping(carregar_configuracao())
+
+    # Mesmo pipeline de logs da API síncrona (fila + thread de escrita, JSON por linha)
+    log_estruturado.iniciar_pipeline(app)
+
+    # Pool aiomysql: aberto quando o servidor arranca, dentro do event loop
+    database_async.init_app(app)
+
+    # Os mesmos componentes em memória da API síncrona
+    token_cache.init_app(app)
+    senhas.init_app(app)
+    contagem.init_app(app)
+    cache_respostas.init_app(app)
+
+    lista = ListaRevogacaoAsync(database_async.get_pool_async, intervalo=app.config['TOKEN_DENYLIST_REFRESH'])
+    app.extensions['lista_revogacao'] = lista
+
+    @app.before_serving
+    async def carregar_lista_revogacao():
+        # Registado depois de database_async.init_app: o pool já está aberto
+        try:
+            await lista.sincronizar()
+        except Exception as e:
+            logger.error(f"Erro ao carregar a lista de revogação no arranque: {e}")
+
+    @app.after_serving
+    async def encerrar_senhas():
+        app.extensions['senhas'].encerrar()
+
+    app.register_blueprint(alunos_bp)
+    app.register_blueprint(auth_bp)
+
+    @app.route('/')
+    async def index():
+        return "Bem-vindo à API da Escola!", 200
+
+    @app.route('/db_test')
+    async def db_test_route():
+        """Testa a conexão com o banco de dados através do pool assíncrono."""
+        try:
+            async with database_async.db_connection_async() as conn:
+                await conn.ping()
+            return jsonify({"message": "Conexão com o banco de dados bem-sucedida!"}), 200
+        except Exception as e:
+            logger.error(f"Erro ao testar DB: {e}")
+            return jsonify({"message": f"Erro ao conectar ao banco de dados: {e}", "details": str(e)}), 500
+
+    return app
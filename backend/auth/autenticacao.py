@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from auth.jwt_handler import emitir_token, emitir_tokens, verificar_token, TokenInvalido, TokenExpirado
+from auth.sessoes import nova_sessao, hash_sessao
+
+# Regras de autenticação partilhadas por routes/auth.py (Flask) e routes_async/auth.py
+# (Quart): cabeçalhos, validação dos tokens e corpos das respostas. Não acedem ao banco
+# nem ao framework; cada variante faz as suas leituras (síncronas ou não) e converte
+# RecusaAutenticacao na resposta {"message": ...}.
+
+MSG_TOKEN_INVALIDO = "Token inválido ou não encontrado"
+MSG_TOKEN_EXPIRADO = "Token expirado. Por favor, faça login novamente."
+MSG_ACESSO_NEGADO = "Acesso negado: Requer privilégios de administrador"
+
+
+class RecusaAutenticacao(Exception):
+    """Pedido recusado: 'mensagem' vai no corpo {"message": ...}, com o estado 'codigo'."""
+
+    def __init__(self, mensagem, codigo=401):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.codigo = codigo
+
+
+def token_bearer(cabecalho, mensagem="Token de autenticação é obrigatório"):
+    """Token do cabeçalho 'Authorization: Bearer <token>'."""
+    if not cabecalho or not cabecalho.startswith('Bearer '):
+        raise RecusaAutenticacao(mensagem)
+    return cabecalho.split(' ')[1]
+
+
+def claims_de_acesso(token, config):
+    """Claims de um token de acesso assinado: validação apenas com CPU, sem ida ao banco."""
+    try:
+        return verificar_token(token, 'access', config=config)
+    except TokenExpirado:
+        raise RecusaAutenticacao(MSG_TOKEN_EXPIRADO)
+    except TokenInvalido:
+        raise RecusaAutenticacao(MSG_TOKEN_INVALIDO)
+
+
+def validar_sessao_opaca(user):
+    """
+    Utilizador de um token opaco antigo (sessão lida de 'sessoes'), se ainda valer.
+    A sessão expirada é apagada pela limpeza (auth/sessoes.py), não aqui.
+    """
+    if not user:
+        raise RecusaAutenticacao(MSG_TOKEN_INVALIDO)
+    if user['token_expiry'] < datetime.now():
+        raise RecusaAutenticacao(MSG_TOKEN_EXPIRADO)
+    return user
+
+
+def identificar(request, claims=None, user=None):
+    """Guarda em 'request' o utilizador autenticado (das claims do token ou da sessão opaca)."""
+    if claims is not None:
+        request.user_id = int(claims['sub'])
+        request.user_role = claims['role']
+        request.username = claims['usr']
+        request.token_jti = claims['jti']
+    else:
+        request.user_id = user['id']
+        request.user_role = user['role']
+        request.username = user['username']
+
+
+def exigir_admin(request):
+    """Para usar depois de token_required, que define 'user_role'."""
+    if getattr(request, 'user_role', None) != 'admin':
+        raise RecusaAutenticacao(MSG_ACESSO_NEGADO, 403)
+
+
+def credenciais(data):
+    """(username, password) do corpo do login ou do registo."""
+    data = data or {}
+    username = data.get('username')
+    password = data.get('password')
+    if not username or not password:
+        raise RecusaAutenticacao("Nome de utilizador e senha são obrigatórios", 400)
+    return username, password
+
+
+def abrir_sessao(user, config):
+    """
+    Emite os tokens do login, ligados a uma sessão nova (claim 'sid').
+    Devolve (hash da sessão, expiração, corpo da resposta): a rota grava a sessão
+    em 'sessoes' antes de responder.
+    """
+    sessao = nova_sessao()
+    tokens = emitir_tokens(user['id'], user['username'], user['role'], config, sessao)
+    corpo = {"message": "Login bem-sucedido", **tokens}
+    return hash_sessao(sessao), datetime.fromisoformat(tokens['refresh_expires_at']), corpo
+
+
+def claims_de_renovacao(data, config):
+    """Claims do token de renovação do corpo {"refresh_token": ...} (falta ver a revogação)."""
+    token = (data or {}).get('refresh_token')
+    if not token:
+        raise RecusaAutenticacao("Token de renovação é obrigatório", 400)
+    try:
+        return verificar_token(token, 'refresh', config=config)
+    except TokenExpirado:
+        raise RecusaAutenticacao("Token de renovação expirado. Por favor, faça login novamente.")
+    except TokenInvalido:
+        raise RecusaAutenticacao("Token de renovação inválido")
+
+
+def renovar(claims, user, config):
+    """
+    Corpo da resposta do /refresh. 'user' é o utilizador da sessão 'sid' (ou, nos
+    tokens de renovação anteriores às sessões, o utilizador 'sub'), relido do banco
+    para que uma alteração de função ou remoção do utilizador tenha efeito aqui.
+    """
+    if 'sid' in claims and user and user['id'] != int(claims['sub']):
+        user = None
+    if not user:
+        mensagem = ("Sessão terminada. Por favor, faça login novamente." if 'sid' in claims
+                    else "Utilizador não encontrado")
+        raise RecusaAutenticacao(mensagem)
+    token, claims_acesso = emitir_token(
+        user['id'], user['username'], user['role'], 'access', config, claims.get('sid')
+    )
+    return {
+        "message": "Token renovado",
+        "token": token,
+        "expires_at": datetime.fromtimestamp(claims_acesso['exp']).isoformat(),
+        "role": user['role']
+    }
+
+
+def claims_ou_nada(token, tipo, config):
+    """Claims de um token válido, ou None (no logout, um token já expirado não tem nada a revogar)."""
+    try:
+        return verificar_token(token, tipo, config=config)
+    except TokenInvalido:
+        return None
@@ -0,0 +1,105 @@
+import hmac
+import json
+import time
+import uuid
+import base64
+import hashlib
+from datetime import datetime
+
+from flask import current_app
+
+# Cabeçalho fixo: apenas HS256 é aceite (evita ataques com "alg": "none")
+_CABECALHO = {'alg': 'HS256', 'typ': 'JWT'}
+
+
+class TokenInvalido(Exception):
+    """Assinatura, formato ou tipo do token inválidos."""
+
+
+class TokenExpirado(TokenInvalido):
+    """O token é autêntico mas já passou do campo 'exp'."""
+
+
+def _b64_codificar(dados):
+    return base64.urlsafe_b64encode(dados).rstrip(b'=')
+
+
+def _b64_decodificar(texto):
+    return base64.urlsafe_b64decode(texto + b'=' * (-len(texto) % 4))
+
+
+def _assinar(mensagem, segredo):
+    return hmac.new(segredo.encode('utf-8'), mensagem, hashlib.sha256).digest()
+
+
+_CABECALHO_CODIFICADO = _b64_codificar(json.dumps(_CABECALHO, separators=(',', ':')).encode('utf-8'))
+
+
+def parece_jwt(token):
+    """Distingue um token assinado (três partes separadas por '.') dos tokens opacos antigos."""
+    return token.count('.') == 2
+
+
+def emitir_token(user_id, username, role, tipo='access', config=None, sessao=None):
+    """
+    Emite um token assinado com HMAC-SHA256 usando a SECRET_KEY da aplicação.
+    Devolve (token, claims). 'tipo' é 'access' (curta duração, usado em cada pedido)
+    ou 'refresh' (longa duração, usado apenas para obter novos tokens de acesso).
+    'config' é a configuração da aplicação (por omissão, a da aplicação Flask atual).
+    'sessao' é o segredo da sessão criada no login (claim 'sid', ver auth/sessoes.py).
+    """
+    config = config if config is not None else current_app.config
+    ttl = config['ACCESS_TOKEN_TTL'] if tipo == 'access' else config['REFRESH_TOKEN_TTL']
+    agora = int(time.time())
+    claims = {
+        'sub': str(user_id),
+        'usr': username,
+        'role': role,
+        'typ': tipo,
+        'iat': agora,
+        'exp': agora + ttl,
+        'jti': uuid.uuid4().hex,  # Identificador usado na lista de revogação
+    }
+    if sessao is not None:
+        claims['sid'] = sessao
+    payload = _b64_codificar(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    mensagem = _CABECALHO_CODIFICADO + b'.' + payload
+    assinatura = _b64_codificar(_assinar(mensagem, config['SECRET_KEY']))
+    return (mensagem + b'.' + assinatura).decode('ascii'), claims
+
+
+def emitir_tokens(user_id, username, role, config=None, sessao=None):
+    """Emite o par token de acesso + token de renovação no formato devolvido pelo login."""
+    token, claims = emitir_token(user_id, username, role, 'access', config, sessao)
+    refresh_token, refresh_claims = emitir_token(user_id, username, role, 'refresh', config, sessao)
+    return {
+        "token": token,
+        "expires_at": datetime.fromtimestamp(claims['exp']).isoformat(), # Formato ISO 8601
+        "refresh_token": refresh_token,
+        "refresh_expires_at": datetime.fromtimestamp(refresh_claims['exp']).isoformat(),
+        "role": role
+    }
+
+
+def verificar_token(token, tipo='access', aceitar_expirado=False, config=None):
+    """
+    Valida a assinatura, o tipo e a expiração de um token sem consultar o banco de dados.
+    Devolve as claims; levanta TokenInvalido ou TokenExpirado.
+    """
+    config = config if config is not None else current_app.config
+    try:
+        cabecalho, payload, assinatura = token.encode('ascii').split(b'.')
+        esperada = _assinar(cabecalho + b'.' + payload, config['SECRET_KEY'])
+        if not hmac.compare_digest(_b64_decodificar(assinatura), esperada):
+            raise TokenInvalido("Assinatura inválida")
+        if json.loads(_b64_decodificar(cabecalho)) != _CABECALHO:
+            raise TokenInvalido("Cabeçalho não suportado")
+        claims = json.loads(_b64_decodificar(payload))
+    except (ValueError, UnicodeEncodeError):
+        raise TokenInvalido("Token mal formatado")
+
+    if claims.get('typ') != tipo:
+        raise TokenInvalido("Tipo de token inválido")
+    if not aceitar_expirado and claims['exp'] < time.time():
+        raise TokenExpirado("Token expirado")
+    return claims
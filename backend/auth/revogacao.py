@@ -0,0 +1,145 @@
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Margem ao reler revogações: cobre transações que fizeram commit depois da última leitura
+MARGEM_SYNC = timedelta(seconds=5)
+
+SQL_REVOGADOS_ATIVOS = "SELECT jti, expira_em FROM tokens_revogados WHERE expira_em > NOW()"
+SQL_REVOGADOS_DESDE = "SELECT jti, expira_em FROM tokens_revogados WHERE revogado_em >= %s"
+SQL_REVOGAR = "INSERT IGNORE INTO tokens_revogados (jti, expira_em) VALUES (%s, %s)"
+
+
+class ListaRevogacao:
+    """
+    Lista em memória dos IDs (jti) de tokens revogados no logout.
+
+    É carregada do banco de dados ao arrancar e depois sincronizada de forma
+    incremental a cada 'intervalo' segundos, para que um logout feito noutro
+    processo (worker) também seja respeitado aqui. Só guarda tokens ainda não
+    expirados, por isso o tamanho fica limitado pelo tempo de vida dos tokens.
+    O acesso ao banco passa pelo UserRepository ('repositorio').
+    """
+
+    def __init__(self, intervalo=15, repositorio=None):
+        self.intervalo = intervalo
+        self._repositorio = repositorio
+        self._revogados = {}  # jti -> expiração (timestamp)
+        self._ultimo_sync = 0.0
+        self._ultima_revogacao = None  # hora do banco na última sincronização
+        self._lock = threading.Lock()
+
+    def _purgar_expirados(self):
+        agora = time.time()
+        for jti in [jti for jti, expira in self._revogados.items() if expira < agora]:
+            del self._revogados[jti]
+
+    # A parte em memória é partilhada com ListaRevogacaoAsync; só o acesso ao banco muda
+
+    def _desde_sincronizacao(self):
+        """Primeira leitura (None): todos os tokens ainda válidos; depois, só as revogações recentes."""
+        if self._ultima_revogacao is None:
+            return None
+        return self._ultima_revogacao - MARGEM_SYNC
+
+    def _consulta_sincronizacao(self):
+        desde = self._desde_sincronizacao()
+        if desde is None:
+            return SQL_REVOGADOS_ATIVOS, ()
+        return SQL_REVOGADOS_DESDE, (desde,)
+
+    def _aplicar_sincronizacao(self, agora_banco, linhas):
+        with self._lock:
+            for jti, expira_em in linhas:
+                self._revogados[jti] = expira_em.timestamp()
+            self._ultima_revogacao = agora_banco
+            self._purgar_expirados()
+            self._ultimo_sync = time.monotonic()
+
+    def _reservar_sincronizacao(self):
+        """Indica se esta thread deve sincronizar (apenas uma o faz; as outras usam a lista atual)."""
+        with self._lock:
+            sincronizar = time.monotonic() - self._ultimo_sync > self.intervalo
+            if sincronizar:
+                self._ultimo_sync = time.monotonic()
+            return sincronizar
+
+    def _revogar_em_memoria(self, claims):
+        with self._lock:
+            self._revogados[claims['jti']] = claims['exp']
+        return claims['jti'], datetime.fromtimestamp(claims['exp'])
+
+    def sincronizar(self):
+        """Lê do banco as revogações feitas desde a última sincronização."""
+        agora_banco, linhas = self._repositorio.ler_revogacoes(self._desde_sincronizacao())
+        self._aplicar_sincronizacao(agora_banco, linhas)
+
+    def revogado(self, jti):
+        if self._reservar_sincronizacao():
+            try:
+                self.sincronizar()
+            except Exception as e:
+                # Sem acesso ao banco, continua com a lista que já tem em memória
+                logger.error(f"Erro ao sincronizar a lista de revogação: {e}")
+        return jti in self._revogados
+
+    def revogar(self, claims):
+        """Revoga um token: em memória de imediato e no banco para os outros processos."""
+        self._repositorio.revogar_token(*self._revogar_em_memoria(claims))
+
+
+class ListaRevogacaoAsync(ListaRevogacao):
+    """
+    Variante da lista de revogação para a API assíncrona: o mesmo estado em
+    memória, mas as leituras e escritas no banco usam o pool aiomysql devolvido
+    por 'obter_pool' e não bloqueiam o event loop.
+    """
+
+    def __init__(self, obter_pool, intervalo=15):
+        super().__init__(intervalo)
+        self._obter_pool = obter_pool
+
+    async def sincronizar(self):
+        async with self._obter_pool().acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute("SELECT NOW()")
+                agora_banco = (await cursor.fetchone())[0]
+                await cursor.execute(*self._consulta_sincronizacao())
+                linhas = await cursor.fetchall()
+        self._aplicar_sincronizacao(agora_banco, linhas)
+
+    async def revogado(self, jti):
+        if self._reservar_sincronizacao():
+            try:
+                await self.sincronizar()
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar a lista de revogação: {e}")
+        return jti in self._revogados
+
+    async def revogar(self, claims):
+        params = self._revogar_em_memoria(claims)
+        async with self._obter_pool().acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(SQL_REVOGAR, params)
+            await conn.commit()
+
+
+def init_app(app):
+    """Cria a lista de revogação e carrega-a do banco de dados, se disponível."""
+    lista = ListaRevogacao(intervalo=app.config['TOKEN_DENYLIST_REFRESH'], repositorio=app.extensions['repo_users'])
+    app.extensions['lista_revogacao'] = lista
+    try:
+        with app.app_context():
+            lista.sincronizar()
+    except Exception as e:
+        app.logger.error(f"Erro ao carregar a lista de revogação no arranque: {e}")
+    return lista
+
+
+def get_lista_revogacao():
+    return current_app.extensions['lista_revogacao']
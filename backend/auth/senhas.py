@@ -0,0 +1,166 @@
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from flask import current_app
+
+from metricas import registo
+
+
+class ServicoSobrecarregado(Exception):
+    """A fila de hashing está cheia; o pedido deve ser recusado com 503."""
+
+
+# Funções de módulo (e não métodos) para poderem ser enviadas aos processos do pool
+def _gerar_hash(senha, rounds):
+    return bcrypt.hashpw(senha, bcrypt.gensalt(rounds=rounds))
+
+
+def _verificar(senha, hash_armazenado):
+    return bcrypt.checkpw(senha, hash_armazenado)
+
+
+def custo_do_hash(hash_armazenado):
+    """Extrai o custo (log2 das iterações) de um hash bcrypt no formato $2b$12$..."""
+    try:
+        return int(hash_armazenado.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class GestorSenhas:
+    """
+    Executa o bcrypt num pool dedicado, fora das threads que servem pedidos.
+
+    O número de operações em curso ou em espera é limitado: quando a fila enche
+    (ex.: pico de logins no início do semestre) a operação falha de imediato com
+    ServicoSobrecarregado, em vez de acumular pedidos à espera de CPU.
+    O pool é criado sob demanda, por isso cada processo (worker) tem o seu.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_pendentes=32, timeout=10, tipo='process'):
+        self.rounds = rounds
+        self.workers = workers
+        self.timeout = timeout
+        self.tipo = tipo
+        self._max_pendentes = max_pendentes
+        self._vagas = threading.BoundedSemaphore(workers + max_pendentes)
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # O pool do processo pai não sobrevive ao fork: cada worker cria o seu sob demanda
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def _apos_fork(self):
+        self._executor = None
+        self._lock = threading.Lock()
+        self._vagas = threading.BoundedSemaphore(self.workers + self._max_pendentes)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.tipo == 'thread':
+                    # O bcrypt liberta o GIL, por isso threads também usam vários núcleos
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+                else:
+                    # Os processos do pool nascem do forkserver e não por fork do worker:
+                    # um fork herdaria as threads do worker (logs, limpeza, pool MySQL) e
+                    # os locks que elas tivessem adquiridos nesse instante
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context('forkserver')
+                    )
+            return self._executor
+
+    def _descartar_executor(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _submeter(self, funcao, *args):
+        if not self._vagas.acquire(blocking=False):
+            registo.incrementar('bcrypt_rejeicoes_total')
+            raise ServicoSobrecarregado("Fila de hashing de senhas cheia")
+        try:
+            futuro = self._get_executor().submit(funcao, *args)
+        except BrokenProcessPool:
+            self._vagas.release()
+            self._descartar_executor()
+            raise
+        inicio = time.perf_counter()
+        operacao = funcao.__name__.lstrip('_')
+
+        def concluido(_):
+            self._vagas.release()
+            registo.observar('bcrypt_duracao_segundos', time.perf_counter() - inicio, operacao=operacao)
+
+        futuro.add_done_callback(concluido)
+        return futuro
+
+    def _executar(self, funcao, *args):
+        futuro = self._submeter(funcao, *args)
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TimeoutError:
+            registo.incrementar('bcrypt_rejeicoes_total')
+            raise ServicoSobrecarregado("Tempo de espera do hashing de senhas esgotado")
+        except BrokenProcessPool:
+            # Um processo do pool morreu: o próximo pedido cria um pool novo
+            self._descartar_executor()
+            raise
+
+    async def _executar_async(self, funcao, *args):
+        """Como _executar, mas espera pelo resultado sem bloquear o event loop."""
+        futuro = self._submeter(funcao, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(futuro), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            registo.incrementar('bcrypt_rejeicoes_total')
+            raise ServicoSobrecarregado("Tempo de espera do hashing de senhas esgotado")
+        except BrokenProcessPool:
+            self._descartar_executor()
+            raise
+
+    def gerar_hash(self, senha):
+        """Gera o hash bcrypt da senha com o custo configurado (BCRYPT_ROUNDS)."""
+        return self._executar(_gerar_hash, senha.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def verificar(self, senha, hash_armazenado):
+        return self._executar(_verificar, senha.encode('utf-8'), hash_armazenado.encode('utf-8'))
+
+    async def gerar_hash_async(self, senha):
+        return (await self._executar_async(_gerar_hash, senha.encode('utf-8'), self.rounds)).decode('utf-8')
+
+    async def verificar_async(self, senha, hash_armazenado):
+        return await self._executar_async(_verificar, senha.encode('utf-8'), hash_armazenado.encode('utf-8'))
+
+    def precisa_atualizar(self, hash_armazenado):
+        """Indica se o hash foi gerado com um custo diferente do configurado."""
+        return custo_do_hash(hash_armazenado) != self.rounds
+
+    def encerrar(self):
+        self._descartar_executor()
+
+
+def init_app(app):
+    """Cria o gestor de hashing de senhas a partir da configuração."""
+    gestor = GestorSenhas(
+        rounds=app.config['BCRYPT_ROUNDS'],
+        workers=app.config['BCRYPT_WORKERS'],
+        max_pendentes=app.config['BCRYPT_MAX_PENDING'],
+        timeout=app.config['BCRYPT_TIMEOUT'],
+        tipo=app.config['BCRYPT_EXECUTOR'],
+    )
+    app.extensions['senhas'] = gestor
+    return gestor
+
+
+def get_senhas():
+    return current_app.extensions['senhas']
@@ -0,0 +1,122 @@
+import os
+import uuid
+import hashlib
+import logging
+import weakref
+import threading
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+# Pausa entre lotes da limpeza: as transações dos pedidos passam à frente
+PAUSA_ENTRE_LOTES = 0.1
+
+SQL_CRIAR_SESSAO = "INSERT INTO sessoes (token_hash, user_id, criada_em, expira_em) VALUES (%s, %s, %s, %s)"
+# 'token_expiry' é o nome esperado pelo TokenCache (ver auth/token_cache.py)
+SQL_OBTER_SESSAO = """
+    SELECT u.id, u.username, u.role, s.expira_em AS token_expiry
+    FROM sessoes s JOIN users u ON u.id = s.user_id
+    WHERE s.token_hash = %s
+"""
+SQL_TERMINAR_SESSAO = "DELETE FROM sessoes WHERE token_hash = %s"
+
+
+def nova_sessao():
+    """Segredo de uma nova sessão, levado na claim 'sid' dos tokens emitidos no login."""
+    return uuid.uuid4().hex
+
+
+def hash_sessao(segredo):
+    """Chave da sessão na tabela 'sessoes': SHA-256 do segredo ('sid' ou token opaco antigo)."""
+    return hashlib.sha256(segredo.encode('utf-8')).hexdigest()
+
+
+class LimpezaSessoes:
+    """
+    Thread de fundo que apaga as sessões expiradas (e as revogações de tokens já
+    expirados) a cada 'intervalo' segundos, em lotes de até 'lote' linhas.
+
+    A autenticação só lê a tabela 'sessoes': uma sessão expirada é recusada pela
+    data e fica para esta limpeza. Cada lote é uma transação curta, por isso a
+    limpeza nunca bloqueia muitas linhas de uma vez. A thread é criada no primeiro
+    pedido de cada processo (não existe no mestre do gunicorn); no MySQL, os
+    processos dividem as linhas entre si (SKIP LOCKED) em vez de esperarem uns pelos outros.
+    """
+
+    def __init__(self, repositorio, intervalo=300, lote=1000):
+        self.intervalo = intervalo
+        self.lote = lote
+        self._repositorio = repositorio
+        self._thread = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+        # A thread do processo pai não existe num worker criado por fork
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def _apos_fork(self):
+        self._thread = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Arranca a thread deste processo, se ainda não existir."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name='limpeza-sessoes', daemon=True)
+                self._thread.start()
+
+    def _executar(self):
+        while not self._parar.wait(self.intervalo):
+            try:
+                self.limpar()
+            except Exception as e:
+                # O banco pode estar indisponível: tenta de novo no próximo intervalo
+                logger.error(f"Erro na limpeza de sessões expiradas: {e}")
+
+    def limpar(self):
+        """Apaga, lote a lote, todas as linhas expiradas; devolve {tabela: linhas apagadas}."""
+        apagadas = {}
+        for tabela in self._repositorio.TABELAS_EXPIRAVEIS:
+            total = 0
+            while not self._parar.is_set():
+                quantidade = self._repositorio.apagar_expirados(tabela, self.lote)
+                total += quantidade
+                if quantidade < self.lote:
+                    break
+                self._parar.wait(PAUSA_ENTRE_LOTES)
+            apagadas[tabela] = total
+        if any(apagadas.values()):
+            logger.info(f"Limpeza de expirados: {', '.join(f'{n} em {t}' for t, n in apagadas.items())}")
+        return apagadas
+
+    def encerrar(self):
+        self._parar.set()
+
+
+def init_app(app):
+    """
+    Cria a limpeza de sessões expiradas (SESSION_SWEEP_INTERVAL, SESSION_SWEEP_BATCH),
+    arrancada pelo primeiro pedido de cada processo. Com SESSION_SWEEP_INTERVAL=0
+    não arranca (ex.: a limpeza corre noutra instância da API).
+    """
+    limpeza = LimpezaSessoes(
+        app.extensions['repo_users'],
+        intervalo=app.config['SESSION_SWEEP_INTERVAL'],
+        lote=app.config['SESSION_SWEEP_BATCH'],
+    )
+    app.extensions['limpeza_sessoes'] = limpeza
+
+    if limpeza.intervalo > 0:
+        @app.before_request
+        def iniciar_limpeza():
+            limpeza.iniciar()
+    return limpeza
+
+
+def get_limpeza_sessoes():
+    return current_app.extensions['limpeza_sessoes']
@@ -0,0 +1,89 @@
+import time
+import threading
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class TokenCache:
+    """
+    Cache LRU em memória de tokens já validados, com TTL curto.
+
+    Cada entrada expira no que vier primeiro: o TTL do cache ou o 'token_expiry'
+    da sessão do token. O TTL curto limita o tempo em que outro processo (worker)
+    pode continuar a aceitar um token que já foi invalidado noutro.
+    """
+
+    def __init__(self, max_size=1024, ttl=30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # token -> (user, expira_em)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, token):
+        """Devolve o utilizador associado ao token, ou None se não estiver em cache."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[token]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token, user):
+        """Guarda um utilizador validado. 'user' deve conter id, username, role e token_expiry."""
+        expires_at = time.time() + self.ttl
+        if user.get('token_expiry'):
+            expires_at = min(expires_at, user['token_expiry'].timestamp())
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def evict(self, token):
+        """Remove um token do cache (ex.: no logout)."""
+        with self._lock:
+            self._entries.pop(token, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'tamanho': len(self._entries),
+                'capacidade': self.max_size,
+                'ttl_segundos': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+def init_app(app):
+    """Cria o cache de tokens da aplicação a partir da configuração."""
+    cache = TokenCache(
+        max_size=app.config['TOKEN_CACHE_SIZE'],
+        ttl=app.config['TOKEN_CACHE_TTL'],
+    )
+    app.extensions['token_cache'] = cache
+    return cache
+
+
+def get_token_cache():
+    return current_app.extensions['token_cache']
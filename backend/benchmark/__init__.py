@@ -0,0 +1,13 @@
+"""
+Benchmarks HTTP repetíveis da API.
+
+Arranca a aplicação (app.py) contra um banco local, por omissão um ficheiro
+SQLite (ver repositorios/), semeia-o com N alunos e utilizadores e executa
+cargas mistas (login, leituras autenticadas, escritas de admin) com níveis
+fixos de concorrência. O relatório JSON tem o débito e as latências
+p50/p95/p99 por endpoint e pode ser comparado entre commits:
+
+    python -m benchmark executar --alunos 10000 --saida base.json
+    python -m benchmark executar --alunos 10000 --saida novo.json
+    python -m benchmark comparar base.json novo.json --tolerancia 0.10
+"""
@@ -0,0 +1,137 @@
+import os
+import secrets
+import sys
+import json
+import argparse
+import tempfile
+
+from benchmark.cargas import CARGAS
+from benchmark import relatorio
+
+
+def _lista_inteiros(texto):
+    return [int(valor) for valor in texto.split(',') if valor.strip()]
+
+
+def _lista_cargas(texto):
+    cargas = [valor.strip() for valor in texto.split(',') if valor.strip()]
+    desconhecidas = [carga for carga in cargas if carga not in CARGAS]
+    if desconhecidas:
+        raise argparse.ArgumentTypeError(f"cargas desconhecidas: {', '.join(desconhecidas)} (use {', '.join(CARGAS)})")
+    return cargas
+
+
+def configurar_ambiente(args):
+    """
+    Configuração da aplicação lida por config.py: tem de ser definida antes de
+    importar app.py, que cria a aplicação ao ser importado.
+    """
+    os.environ['STORAGE_BACKEND'] = args.storage
+    if args.storage == 'sqlite':
+        os.environ['SQLITE_PATH'] = args.banco
+    if args.bcrypt_rounds is not None:
+        os.environ['BCRYPT_ROUNDS'] = str(args.bcrypt_rounds)
+    # Os logs de acesso e INFO pesariam nas medições
+    os.environ.setdefault('LOG_ACCESS', '0')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    # Os tokens emitidos só servem durante a execução: uma chave aleatória basta
+    os.environ.setdefault('SECRET_KEY', secrets.token_hex(32))
+
+
+def executar(args):
+    if args.storage == 'sqlite' and not args.banco:
+        args.banco = os.path.join(tempfile.mkdtemp(prefix='benchmark-'), 'escola.db')
+    configurar_ambiente(args)
+
+    from app import app
+    from benchmark.dados import semear
+    from benchmark.executor import ServidorLocal, executar_nivel
+
+    total_alunos = semear(app, args.alunos, args.utilizadores)
+    configuracao = {
+        'storage': args.storage,
+        'banco': args.banco,
+        'alunos': total_alunos,
+        'utilizadores': args.utilizadores,
+        'bcrypt_rounds': app.config['BCRYPT_ROUNDS'],
+        'cargas': args.cargas,
+        'concorrencia': args.concorrencia,
+        'duracao_s': args.duracao,
+        'aquecimento_s': args.aquecimento,
+        'semente': args.semente,
+        'url': args.url,
+    }
+
+    def executar_niveis(url):
+        resultados = []
+        for carga in args.cargas:
+            for concorrencia in args.concorrencia:
+                print(f"Carga '{carga}' com concorrência {concorrencia}...", file=sys.stderr)
+                resultado = executar_nivel(
+                    url, carga, concorrencia, args.duracao, args.aquecimento,
+                    total_alunos, args.utilizadores, args.semente
+                )
+                relatorio.imprimir(resultado)
+                resultados.append(resultado)
+        return resultados
+
+    if args.url:
+        # Servidor externo (ex.: gunicorn) a usar o mesmo banco que foi semeado aqui
+        resultados = executar_niveis(args.url.rstrip('/'))
+    else:
+        with ServidorLocal(app) as servidor:
+            resultados = executar_niveis(servidor.url)
+
+    relatorio.gravar(relatorio.montar_relatorio(configuracao, resultados), args.saida)
+    print(f"\nRelatório gravado em {args.saida}")
+    return 0
+
+
+def comparar(args):
+    with open(args.base, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.novo, encoding='utf-8') as f:
+        novo = json.load(f)
+    regressoes = relatorio.comparar(base, novo, tolerancia=args.tolerancia, min_pedidos=args.min_pedidos)
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima da tolerância de {args.tolerancia:.0%}")
+        return 1
+    print("\nSem regressões.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description="Benchmarks HTTP da API")
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    p_executar = subparsers.add_parser('executar', help="Semeia o banco, executa as cargas e grava o relatório JSON")
+    p_executar.add_argument('--alunos', type=int, default=10000, help="Alunos no banco (ex.: 10000, 1000000, 10000000)")
+    p_executar.add_argument('--utilizadores', type=int, default=50, help="Utilizadores usados na carga de login")
+    p_executar.add_argument('--storage', choices=('sqlite', 'mysql'), default='sqlite',
+                            help="Motor do banco (mysql usa DB_HOST, DB_USER, ... do ambiente)")
+    p_executar.add_argument('--banco', help="Ficheiro SQLite (reutilizado entre execuções; por omissão, um temporário)")
+    p_executar.add_argument('--cargas', type=_lista_cargas, default=list(CARGAS),
+                            help=f"Cargas separadas por vírgulas ({', '.join(CARGAS)})")
+    p_executar.add_argument('--concorrencia', type=_lista_inteiros, default=[1, 8, 32],
+                            help="Níveis de concorrência separados por vírgulas")
+    p_executar.add_argument('--duracao', type=float, default=20, help="Segundos medidos por nível")
+    p_executar.add_argument('--aquecimento', type=float, default=3, help="Segundos descartados no início de cada nível")
+    p_executar.add_argument('--bcrypt-rounds', type=int, help="Custo do bcrypt (por omissão, o de BCRYPT_ROUNDS)")
+    p_executar.add_argument('--semente', default='escola', help="Semente dos geradores aleatórios dos workers")
+    p_executar.add_argument('--url', help="Usa um servidor já em execução em vez de arrancar um local")
+    p_executar.add_argument('--saida', default='benchmark.json', help="Ficheiro do relatório JSON")
+    p_executar.set_defaults(funcao=executar)
+
+    p_comparar = subparsers.add_parser('comparar', help="Compara dois relatórios; termina com 1 se houver regressões")
+    p_comparar.add_argument('base')
+    p_comparar.add_argument('novo')
+    p_comparar.add_argument('--tolerancia', type=float, default=0.10, help="Variação aceite no p95 e no débito")
+    p_comparar.add_argument('--min-pedidos', type=int, default=50, help="Ignora endpoints com menos pedidos")
+    p_comparar.set_defaults(funcao=comparar)
+
+    args = parser.parse_args(argv)
+    return args.funcao(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
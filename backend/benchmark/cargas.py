@@ -0,0 +1,96 @@
+"""
+Cargas do benchmark: cada uma é uma lista de (peso, operação). Uma operação
+recebe o contexto do worker e devolve (endpoint, método, caminho, corpo, token),
+em que 'endpoint' é o rótulo usado no relatório.
+"""
+import json
+
+from benchmark.dados import utilizador, SENHA, CURSOS
+
+PREFIXO = '/api/v1'
+
+
+class Contexto:
+    """Estado de um worker: gerador aleatório próprio (repetível), tokens e alunos que criou."""
+
+    def __init__(self, rng, total_alunos, utilizadores, token_admin, token_user):
+        self.rng = rng
+        self.total_alunos = total_alunos
+        self.utilizadores = utilizadores
+        self.token_admin = token_admin
+        self.token_user = token_user
+        self.criados = []
+        self.sequencia = 0
+
+    def aluno_aleatorio(self):
+        return self.rng.randint(1, max(self.total_alunos, 1))
+
+
+def login(ctx):
+    username = utilizador(ctx.rng.randrange(ctx.utilizadores))
+    return 'POST /auth/login', 'POST', f"{PREFIXO}/auth/login", {'username': username, 'password': SENHA}, None
+
+
+def listar_pagina(ctx):
+    # Páginas OFFSET até à 1000.ª: as mais profundas medem o custo do OFFSET
+    paginas = max(min(ctx.total_alunos // 20, 1000), 1)
+    return ('GET /alunos?page', 'GET',
+            f"{PREFIXO}/alunos/?page={ctx.rng.randint(1, paginas)}&per_page=20", None, ctx.token_user)
+
+
+def listar_cursor(ctx):
+    return ('GET /alunos?after_id', 'GET',
+            f"{PREFIXO}/alunos/?after_id={ctx.rng.randint(0, ctx.total_alunos)}&per_page=20&count=none",
+            None, ctx.token_user)
+
+
+def obter(ctx):
+    return 'GET /alunos/<id>', 'GET', f"{PREFIXO}/alunos/{ctx.aluno_aleatorio()}", None, ctx.token_user
+
+
+def pesquisar(ctx):
+    termo = ctx.rng.choice(('ana', 'silva', 'engenharia', 'medicina', '1000', 'aluno12'))
+    return 'GET /alunos/search', 'GET', f"{PREFIXO}/alunos/search?q={termo}&limit=20", None, ctx.token_user
+
+
+def cadastrar(ctx):
+    ctx.sequencia += 1
+    chave = f"{ctx.rng.getrandbits(40):x}{ctx.sequencia}"
+    corpo = {
+        'nome': f"Bench {chave}",
+        'matricula': str(9 * 10 ** 15 + ctx.rng.getrandbits(48)),
+        'curso': ctx.rng.choice(CURSOS),
+        'email': f"novo{chave}@bench.local",
+    }
+    return 'POST /alunos', 'POST', f"{PREFIXO}/alunos/", corpo, ctx.token_admin
+
+
+def editar(ctx):
+    return ('PATCH /alunos/<id>', 'PATCH', f"{PREFIXO}/alunos/{ctx.aluno_aleatorio()}",
+            {'curso': ctx.rng.choice(CURSOS)}, ctx.token_admin)
+
+
+def excluir(ctx):
+    # Só remove alunos criados por este worker, para não esvaziar os dados semeados
+    if not ctx.criados:
+        return cadastrar(ctx)
+    return 'DELETE /alunos/<id>', 'DELETE', f"{PREFIXO}/alunos/{ctx.criados.pop()}", None, ctx.token_admin
+
+
+def registar_resposta(ctx, endpoint, estado, corpo):
+    """Guarda os IDs dos alunos criados, usados depois pelas exclusões."""
+    if endpoint == 'POST /alunos' and estado == 201:
+        ctx.criados.append(json.loads(corpo)['id'])
+
+
+CARGAS = {
+    # Pico de logins (ex.: início do semestre): mede o pool de bcrypt
+    'login': [(1, login)],
+    # Leituras autenticadas de utilizadores normais
+    'leitura': [(4, listar_pagina), (3, listar_cursor), (6, obter), (2, pesquisar)],
+    # Escritas de administrador
+    'escrita': [(3, cadastrar), (4, editar), (2, excluir)],
+    # Tráfego típico: sobretudo leituras, algumas escritas e logins ocasionais
+    'misto': [(1, login), (4, listar_pagina), (3, listar_cursor), (8, obter), (2, pesquisar),
+              (1, cadastrar), (1, editar), (1, excluir)],
+}
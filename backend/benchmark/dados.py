@@ -0,0 +1,57 @@
+import time
+import logging
+
+from repositorios import Duplicado
+
+logger = logging.getLogger(__name__)
+
+NOMES = ('Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Hugo', 'Isabela', 'João',
+         'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Tiago', 'Vitória', 'Yuri')
+APELIDOS = ('Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira', 'Almeida', 'Ribeiro')
+CURSOS = ('Análise e Desenvolvimento de Sistemas', 'Engenharia Civil', 'Administração', 'Direito',
+          'Medicina', 'Pedagogia', 'Ciência da Computação', 'Enfermagem')
+
+# Senha de todos os utilizadores criados pelo benchmark
+SENHA = 'benchmark'
+ADMIN = 'bench_admin'
+
+TAMANHO_LOTE = 5000
+
+
+def aluno(numero):
+    """Valores determinísticos (nome, matricula, curso, email) do aluno número 'numero'."""
+    nome = f"{NOMES[numero % len(NOMES)]} {APELIDOS[(numero // len(NOMES)) % len(APELIDOS)]}"
+    return (nome, str(100000000 + numero), CURSOS[numero % len(CURSOS)], f"aluno{numero}@bench.local")
+
+
+def utilizador(numero):
+    return f"bench_user_{numero}"
+
+
+def semear(app, alunos, utilizadores):
+    """
+    Garante pelo menos 'alunos' alunos e 'utilizadores' utilizadores (mais o admin).
+    Um banco já semeado (--banco reutilizado) só recebe as linhas em falta.
+    """
+    repo_alunos = app.extensions['repo_alunos']
+    repo_users = app.extensions['repo_users']
+
+    existentes = repo_alunos.contar()
+    if existentes < alunos:
+        inicio = time.perf_counter()
+        erros = []
+        for base in range(existentes, alunos, TAMANHO_LOTE):
+            fim = min(base + TAMANHO_LOTE, alunos)
+            repo_alunos.inserir_lote([(numero, aluno(numero)) for numero in range(base, fim)], erros)
+        logger.warning(f"{alunos - existentes} alunos semeados em {time.perf_counter() - inicio:.1f}s")
+
+    # Um único hash para todos: o custo do bcrypt é medido no login, não aqui
+    password_hash = app.extensions['senhas'].gerar_hash(SENHA)
+    contas = [(ADMIN, 'admin')] + [(utilizador(numero), 'user') for numero in range(utilizadores)]
+    for username, role in contas:
+        try:
+            repo_users.criar(username, password_hash, role)
+        except Duplicado:
+            pass
+
+    return repo_alunos.contar()
@@ -0,0 +1,173 @@
+import json
+import time
+import random
+import threading
+import http.client
+from urllib.parse import urlsplit
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+from benchmark.cargas import CARGAS, Contexto, registar_resposta, PREFIXO
+from benchmark.dados import ADMIN, SENHA, utilizador
+from benchmark.relatorio import resumir_endpoint
+
+
+class HandlerKeepAlive(WSGIRequestHandler):
+    # HTTP/1.1: as conexões dos workers são reutilizadas, como atrás do gunicorn
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+class ServidorLocal:
+    """Serve a aplicação numa thread, numa porta livre de 127.0.0.1."""
+
+    def __init__(self, app):
+        self._servidor = make_server('127.0.0.1', 0, app, threaded=True, request_handler=HandlerKeepAlive)
+        self.url = f"http://127.0.0.1:{self._servidor.server_port}"
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='benchmark-servidor', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._thread.join()
+
+
+class Cliente:
+    """Conexão HTTP persistente de um worker (reaberta automaticamente se o servidor a fechar)."""
+
+    def __init__(self, url):
+        partes = urlsplit(url)
+        self._conn = http.client.HTTPConnection(partes.hostname, partes.port, timeout=60)
+
+    def pedido(self, metodo, caminho, corpo=None, token=None):
+        cabecalhos = {}
+        dados = None
+        if corpo is not None:
+            dados = json.dumps(corpo).encode('utf-8')
+            cabecalhos['Content-Type'] = 'application/json'
+        if token:
+            cabecalhos['Authorization'] = f"Bearer {token}"
+        try:
+            self._conn.request(metodo, caminho, body=dados, headers=cabecalhos)
+            resposta = self._conn.getresponse()
+            return resposta.status, resposta.read()
+        except (OSError, http.client.HTTPException):
+            self._conn.close()
+            raise
+
+    def fechar(self):
+        self._conn.close()
+
+
+def obter_token(url, username):
+    cliente = Cliente(url)
+    try:
+        estado, corpo = cliente.pedido('POST', f"{PREFIXO}/auth/login", {'username': username, 'password': SENHA})
+    finally:
+        cliente.fechar()
+    if estado != 200:
+        raise RuntimeError(f"Login de '{username}' falhou com {estado}: {corpo[:200]!r}")
+    return json.loads(corpo)['token']
+
+
+class Amostras:
+    """Latências e códigos de estado por endpoint, recolhidos por um único worker (sem locks)."""
+
+    def __init__(self):
+        self.latencias = {}
+        self.estados = {}
+        self.erros = {}
+
+    def registar(self, endpoint, latencia, estado):
+        self.latencias.setdefault(endpoint, []).append(latencia)
+        estados = self.estados.setdefault(endpoint, {})
+        estados[estado] = estados.get(estado, 0) + 1
+        if estado == 'excecao' or estado >= 400:
+            self.erros[endpoint] = self.erros.get(endpoint, 0) + 1
+
+    def juntar(self, outra):
+        for endpoint, latencias in outra.latencias.items():
+            self.latencias.setdefault(endpoint, []).extend(latencias)
+        for endpoint, estados in outra.estados.items():
+            destino = self.estados.setdefault(endpoint, {})
+            for estado, total in estados.items():
+                destino[estado] = destino.get(estado, 0) + total
+        for endpoint, total in outra.erros.items():
+            self.erros[endpoint] = self.erros.get(endpoint, 0) + total
+
+
+def _worker(url, operacoes, pesos, ctx, inicio_medicao, fim, amostras):
+    cliente = Cliente(url)
+    try:
+        while True:
+            agora = time.perf_counter()
+            if agora >= fim:
+                break
+            endpoint, metodo, caminho, corpo, token = ctx.rng.choices(operacoes, weights=pesos)[0](ctx)
+            inicio = time.perf_counter()
+            try:
+                estado, resposta = cliente.pedido(metodo, caminho, corpo, token)
+            except (OSError, http.client.HTTPException):
+                estado, resposta = 'excecao', b''
+            latencia = time.perf_counter() - inicio
+            if estado != 'excecao':
+                registar_resposta(ctx, endpoint, estado, resposta)
+            # Os pedidos do aquecimento não entram no relatório
+            if inicio >= inicio_medicao:
+                amostras.registar(endpoint, latencia, estado)
+    finally:
+        cliente.fechar()
+
+
+def executar_nivel(url, carga, concorrencia, duracao, aquecimento, total_alunos, utilizadores, semente):
+    """
+    Executa uma carga com 'concorrencia' workers (um pedido de cada vez por worker)
+    durante aquecimento + duracao segundos e devolve o resultado do nível.
+    """
+    pesos = [peso for peso, _ in CARGAS[carga]]
+    operacoes = [operacao for _, operacao in CARGAS[carga]]
+    token_admin = obter_token(url, ADMIN)
+    token_user = obter_token(url, utilizador(0))
+
+    inicio_medicao = time.perf_counter() + aquecimento
+    fim = inicio_medicao + duracao
+    amostras_workers = []
+    threads = []
+    for numero in range(concorrencia):
+        # Gerador próprio por worker: a sequência de pedidos é a mesma em cada execução
+        ctx = Contexto(random.Random(f"{semente}-{carga}-{concorrencia}-{numero}"),
+                       total_alunos, utilizadores, token_admin, token_user)
+        amostras = Amostras()
+        amostras_workers.append(amostras)
+        threads.append(threading.Thread(
+            target=_worker, args=(url, operacoes, pesos, ctx, inicio_medicao, fim, amostras),
+            name=f"benchmark-worker-{numero}", daemon=True
+        ))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = Amostras()
+    for amostras in amostras_workers:
+        total.juntar(amostras)
+
+    endpoints = {
+        endpoint: resumir_endpoint(latencias, total.estados[endpoint], total.erros.get(endpoint, 0), duracao)
+        for endpoint, latencias in sorted(total.latencias.items())
+    }
+    pedidos = sum(dados['pedidos'] for dados in endpoints.values())
+    return {
+        'carga': carga,
+        'concorrencia': concorrencia,
+        'duracao_s': duracao,
+        'pedidos': pedidos,
+        'throughput_rps': round(pedidos / duracao, 2),
+        'erros': sum(dados['erros'] for dados in endpoints.values()),
+        'endpoints': endpoints,
+    }
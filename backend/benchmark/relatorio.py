@@ -0,0 +1,122 @@
+import os
+import sys
+import json
+import math
+import platform
+import subprocess
+from datetime import datetime
+
+VERSAO_RELATORIO = 1
+
+
+def percentil(ordenadas, fracao):
+    """Percentil pelo método do posto mais próximo sobre uma lista já ordenada."""
+    if not ordenadas:
+        return None
+    posto = max(math.ceil(fracao * len(ordenadas)), 1)
+    return ordenadas[min(posto, len(ordenadas)) - 1]
+
+
+def resumir_endpoint(latencias, estados, erros, duracao):
+    """Resumo de um endpoint: débito, erros, códigos de estado e latências em ms."""
+    ordenadas = sorted(latencias)
+    pedidos = len(ordenadas)
+    return {
+        'pedidos': pedidos,
+        'throughput_rps': round(pedidos / duracao, 2) if duracao else 0.0,
+        'erros': erros,
+        'estados': {str(estado): total for estado, total in sorted(estados.items(), key=lambda item: str(item[0]))},
+        'latencia_ms': {
+            'p50': _ms(percentil(ordenadas, 0.50)),
+            'p95': _ms(percentil(ordenadas, 0.95)),
+            'p99': _ms(percentil(ordenadas, 0.99)),
+            'media': _ms(sum(ordenadas) / pedidos if pedidos else None),
+            'max': _ms(ordenadas[-1] if ordenadas else None),
+        },
+    }
+
+
+def _ms(segundos):
+    return round(segundos * 1000, 3) if segundos is not None else None
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def montar_relatorio(configuracao, resultados):
+    return {
+        'versao_relatorio': VERSAO_RELATORIO,
+        'commit': commit_atual(),
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'configuracao': configuracao,
+        'resultados': resultados,
+    }
+
+
+def gravar(relatorio, caminho):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2)
+
+
+def imprimir(resultado, saida=sys.stdout):
+    """Tabela legível de um nível (carga x concorrência)."""
+    print(f"\n== {resultado['carga']} | concorrência {resultado['concorrencia']} | "
+          f"{resultado['throughput_rps']} pedidos/s | {resultado['erros']} erros", file=saida)
+    print(f"{'endpoint':<24}{'pedidos':>9}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>7}", file=saida)
+    for endpoint, dados in resultado['endpoints'].items():
+        latencia = dados['latencia_ms']
+        print(f"{endpoint:<24}{dados['pedidos']:>9}{dados['throughput_rps']:>10}"
+              f"{_fmt(latencia['p50']):>10}{_fmt(latencia['p95']):>10}{_fmt(latencia['p99']):>10}{dados['erros']:>7}",
+              file=saida)
+
+
+def _fmt(valor):
+    return '-' if valor is None else f"{valor:.2f}"
+
+
+def comparar(base, novo, tolerancia=0.10, min_pedidos=50, saida=sys.stdout):
+    """
+    Compara dois relatórios endpoint a endpoint (mesma carga e concorrência).
+    É uma regressão um p95 acima de (1 + tolerancia) vezes o da base ou um débito
+    abaixo de (1 - tolerancia) vezes o da base; endpoints com menos de
+    'min_pedidos' pedidos em qualquer dos relatórios são ignorados (ruído).
+    Devolve a lista de regressões encontradas.
+    """
+    indice_base = {(r['carga'], r['concorrencia']): r for r in base['resultados']}
+    regressoes = []
+    print(f"base {base.get('commit')} ({base.get('data')}) -> novo {novo.get('commit')} ({novo.get('data')})", file=saida)
+    for resultado in novo['resultados']:
+        anterior = indice_base.get((resultado['carga'], resultado['concorrencia']))
+        if anterior is None:
+            continue
+        for endpoint, dados in resultado['endpoints'].items():
+            dados_base = anterior['endpoints'].get(endpoint)
+            if not dados_base or min(dados['pedidos'], dados_base['pedidos']) < min_pedidos:
+                continue
+            p95_base, p95_novo = dados_base['latencia_ms']['p95'], dados['latencia_ms']['p95']
+            rps_base, rps_novo = dados_base['throughput_rps'], dados['throughput_rps']
+            problemas = []
+            if p95_base and p95_novo > p95_base * (1 + tolerancia):
+                problemas.append(f"p95 {p95_base:.2f} -> {p95_novo:.2f} ms")
+            if rps_base and rps_novo < rps_base * (1 - tolerancia):
+                problemas.append(f"débito {rps_base} -> {rps_novo} pedidos/s")
+            estado = 'REGRESSÃO' if problemas else 'ok'
+            print(f"[{estado:>9}] {resultado['carga']:<8} c={resultado['concorrencia']:<4} {endpoint:<24}"
+                  f" p95 {_fmt(p95_base)} -> {_fmt(p95_novo)} ms, {rps_base} -> {rps_novo} pedidos/s", file=saida)
+            if problemas:
+                regressoes.append({
+                    'carga': resultado['carga'],
+                    'concorrencia': resultado['concorrencia'],
+                    'endpoint': endpoint,
+                    'problemas': problemas,
+                })
+    return regressoes
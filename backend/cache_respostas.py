@@ -0,0 +1,204 @@
+import time
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class BackendCache(ABC):
+    """
+    Interface dos backends do cache de respostas.
+
+    Cada entrada tem um TTL e uma lista de etiquetas (tags); as escritas invalidam
+    as etiquetas afetadas (ex.: 'aluno:5', 'alunos:lista') em vez de limpar tudo.
+    Um backend partilhado entre processos (ex.: Redis) só precisa de implementar
+    estes métodos.
+
+    Uma leitura pode terminar depois de uma escrita concorrente ter invalidado as
+    suas etiquetas: quem lê obtém marca() antes de consultar o banco e passa-a a
+    guardar(..., desde=marca), que descarta o valor se alguma das etiquetas foi
+    invalidada entretanto.
+    """
+
+    @abstractmethod
+    def obter(self, chave):
+        """Devolve o valor guardado, ou None se não existir ou tiver expirado."""
+
+    @abstractmethod
+    def marca(self):
+        """Marca das invalidações até agora, a obter antes da leitura que vai ser guardada."""
+
+    @abstractmethod
+    def guardar(self, chave, valor, tags=(), desde=None):
+        """
+        Guarda o valor, marcado com as etiquetas 'tags'. Com 'desde' (uma marca()),
+        não guarda nada se alguma das etiquetas foi invalidada depois dessa marca.
+        """
+
+    @abstractmethod
+    def invalidar(self, *tags):
+        """Remove todas as entradas marcadas com qualquer uma das etiquetas."""
+
+    @abstractmethod
+    def limpar(self):
+        """Remove todas as entradas."""
+
+    @abstractmethod
+    def estatisticas(self):
+        """Contadores do backend, devolvidos por GET /api/v1/alunos/cache."""
+
+
+class CacheNulo(BackendCache):
+    """Backend que não guarda nada (cache desativado)."""
+
+    def obter(self, chave):
+        return None
+
+    def marca(self):
+        return 0
+
+    def guardar(self, chave, valor, tags=(), desde=None):
+        pass
+
+    def invalidar(self, *tags):
+        pass
+
+    def limpar(self):
+        pass
+
+    def estatisticas(self):
+        return {'backend': 'nenhum'}
+
+
+class CacheMemoriaLRU(BackendCache):
+    """
+    Cache LRU em memória do processo, com TTL por entrada e invalidação por etiqueta.
+
+    Cada invalidar() avança um relógio e regista-o nas etiquetas invalidadas; só as
+    'max_geracoes' etiquetas invalidadas mais recentemente são lembradas, e uma marca
+    mais antiga do que a última esquecida é tratada como invalidada (nunca guarda
+    um valor possivelmente desatualizado).
+    """
+
+    def __init__(self, max_size=2048, ttl=60, max_geracoes=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_geracoes = max_geracoes or 4 * max_size
+        self._entradas = OrderedDict()  # chave -> (valor, expira_em, tags)
+        self._por_tag = {}  # tag -> conjunto de chaves
+        self._relogio = 0  # Avança a cada invalidar()
+        self._geracoes = OrderedDict()  # tag -> relógio da última invalidação
+        self._esquecida = 0  # Maior relógio já retirado de _geracoes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidacoes = 0
+        self.descartadas = 0
+
+    def _remover(self, chave):
+        # Chamado com o lock adquirido
+        _, _, tags = self._entradas.pop(chave)
+        for tag in tags:
+            chaves = self._por_tag.get(tag)
+            if chaves is not None:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[tag]
+
+    def obter(self, chave):
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                self.misses += 1
+                return None
+            if entrada[1] <= time.monotonic():
+                self._remover(chave)
+                self.misses += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.hits += 1
+            return entrada[0]
+
+    def marca(self):
+        with self._lock:
+            return self._relogio
+
+    def _invalidada_desde(self, tags, marca):
+        # Chamado com o lock adquirido
+        return marca < self._esquecida or any(self._geracoes.get(tag, 0) > marca for tag in tags)
+
+    def guardar(self, chave, valor, tags=(), desde=None):
+        tags = frozenset(tags)
+        with self._lock:
+            if desde is not None and self._invalidada_desde(tags, desde):
+                # Lido antes de uma escrita que já invalidou estas etiquetas
+                self.descartadas += 1
+                return
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (valor, time.monotonic() + self.ttl, tags)
+            for tag in tags:
+                self._por_tag.setdefault(tag, set()).add(chave)
+            while len(self._entradas) > self.max_size:
+                self._remover(next(iter(self._entradas)))
+                self.evictions += 1
+
+    def invalidar(self, *tags):
+        with self._lock:
+            self._relogio += 1
+            for tag in tags:
+                self._geracoes[tag] = self._relogio
+                self._geracoes.move_to_end(tag)
+            while len(self._geracoes) > self.max_geracoes:
+                _, relogio = self._geracoes.popitem(last=False)
+                self._esquecida = max(self._esquecida, relogio)
+            for tag in tags:
+                for chave in list(self._por_tag.get(tag, ())):
+                    self._remover(chave)
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_tag.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'backend': 'memoria',
+                'tamanho': len(self._entradas),
+                'capacidade': self.max_size,
+                'ttl_segundos': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidacoes': self.invalidacoes,
+                'descartadas': self.descartadas,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+BACKENDS = {
+    'memoria': lambda app: CacheMemoriaLRU(
+        max_size=app.config['RESPONSE_CACHE_SIZE'],
+        ttl=app.config['RESPONSE_CACHE_TTL'],
+    ),
+    'nenhum': lambda app: CacheNulo(),
+}
+
+
+def init_app(app):
+    """Cria o cache de respostas com o backend configurado em RESPONSE_CACHE_BACKEND."""
+    nome = app.config['RESPONSE_CACHE_BACKEND']
+    if nome not in BACKENDS:
+        raise ValueError(f"RESPONSE_CACHE_BACKEND inválido: {nome} (opções: {', '.join(BACKENDS)})")
+    cache = BACKENDS[nome](app)
+    app.extensions['cache_respostas'] = cache
+    return cache
+
+
+def get_cache_respostas():
+    return current_app.extensions['cache_respostas']
@@ -0,0 +1,165 @@
+import zlib
+import logging
+
+from flask import request
+
+from metricas import registo
+
+# Codificações opcionais: só são anunciadas se o pacote estiver instalado
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Tipos que valem a pena comprimir; ficheiros já comprimidos (ex.: application/gzip) ficam de fora
+TIPOS_COMPRIMIVEIS = frozenset((
+    'application/json',
+    'application/vnd.escola.colunar+json',
+    'application/msgpack',
+    'application/x-msgpack',
+    'application/x-ndjson',
+    'application/x-json-stream',
+    'text/csv',
+    'text/plain',
+    'text/html',
+))
+
+
+def _compressor_gzip(nivel):
+    # wbits=31: formato gzip (cabeçalho e CRC32), não zlib cru
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, 31)
+    return compressor.compress, compressor.flush
+
+
+def _compressor_zstd(nivel):
+    compressor = zstandard.ZstdCompressor(level=nivel).compressobj()
+    return compressor.compress, compressor.flush
+
+
+def _compressor_brotli(nivel):
+    compressor = brotli.Compressor(quality=nivel)
+    return compressor.process, compressor.finish
+
+
+def _etag_codificado(etag, codificacao, fraco):
+    """Valor do cabeçalho ETag da versão comprimida, tal como o cliente o devolve."""
+    return f'{"W/" if fraco else ""}"{etag}-{codificacao}"'
+
+
+class Compressao:
+    """
+    Comprime as respostas segundo o Accept-Encoding do cliente (gzip e, se os
+    pacotes estiverem instalados, zstd e br).
+
+    Respostas em memória abaixo de 'tamanho_minimo' bytes seguem sem compressão:
+    o ganho não compensa o CPU. Respostas em streaming são comprimidas bloco a
+    bloco, sem juntar o corpo em memória.
+    """
+
+    def __init__(self, codificacoes=('zstd', 'br', 'gzip'), tamanho_minimo=1024,
+                 nivel_gzip=6, nivel_zstd=3, nivel_brotli=4):
+        fabricas = {
+            'gzip': lambda: _compressor_gzip(nivel_gzip),
+            'zstd': (lambda: _compressor_zstd(nivel_zstd)) if zstandard else None,
+            'br': (lambda: _compressor_brotli(nivel_brotli)) if brotli else None,
+        }
+        desconhecidas = [nome for nome in codificacoes if nome not in fabricas]
+        if desconhecidas:
+            raise ValueError(f"COMPRESSION_ENCODINGS inválido: {', '.join(desconhecidas)} (opções: {', '.join(fabricas)})")
+        indisponiveis = [nome for nome in codificacoes if fabricas[nome] is None]
+        if indisponiveis:
+            logger.info(f"Compressão {', '.join(indisponiveis)} indisponível (pacote não instalado)")
+        # Ordem de preferência do servidor, usada para desempatar q-values iguais
+        self.fabricas = {nome: fabricas[nome] for nome in codificacoes if fabricas[nome] is not None}
+        self.tamanho_minimo = tamanho_minimo
+
+    def escolher_codificacao(self):
+        """Melhor codificação aceite pelo cliente, ou None (identity)."""
+        if not self.fabricas:
+            return None
+        return request.accept_encodings.best_match(list(self.fabricas))
+
+    def comprimir_resposta(self, response):
+        if (response.status_code < 200 or response.status_code in (204, 206)
+                or response.direct_passthrough   # send_file: ficheiros e pedidos Range
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in TIPOS_COMPRIMIVEIS):
+            return response
+
+        # O corpo depende do Accept-Encoding: caches intermédias não podem misturar versões
+        response.vary.add('Accept-Encoding')
+        codificacao = self.escolher_codificacao()
+        if codificacao is not None and response.status_code == 304:
+            # O 304 repete o ETag que o cliente guardou: o da versão comprimida, se foi essa
+            etag, fraco = response.get_etag()
+            if etag and request.if_none_match.contains_raw(_etag_codificado(etag, codificacao, fraco)):
+                response.set_etag(f"{etag}-{codificacao}", weak=fraco)
+        if codificacao is None or response.status_code == 304 or request.method == 'HEAD':
+            return response
+
+        if response.is_streamed:
+            original = response.response
+            response.response = self._comprimir_stream(original, codificacao)
+            # Fecha o iterável original (ex.: liberta a conexão de um cursor em streaming)
+            if hasattr(original, 'close'):
+                response.call_on_close(original.close)
+            response.headers.pop('Content-Length', None)
+        else:
+            dados = response.get_data()
+            if len(dados) < self.tamanho_minimo:
+                return response
+            comprimir, terminar = self.fabricas[codificacao]()
+            comprimidos = comprimir(dados) + terminar()
+            registo.incrementar('http_compressao_bytes_total', len(dados), codificacao=codificacao, fase='original')
+            registo.incrementar('http_compressao_bytes_total', len(comprimidos), codificacao=codificacao, fase='comprimido')
+            # set_data atualiza o Content-Length
+            response.set_data(comprimidos)
+
+        # Bytes diferentes, ETag forte diferente: "aluno-1-v3" passa a "aluno-1-v3-gzip".
+        # As rotas tiram o sufixo antes de comparar (ver routes/comum.py, etag_sem_codificacao)
+        etag, fraco = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{codificacao}", weak=fraco)
+        response.headers['Content-Encoding'] = codificacao
+        return response
+
+    def _comprimir_stream(self, blocos, codificacao):
+        comprimir, terminar = self.fabricas[codificacao]()
+        original = comprimido = 0
+        try:
+            for bloco in blocos:
+                if isinstance(bloco, str):
+                    bloco = bloco.encode('utf-8')
+                original += len(bloco)
+                saida = comprimir(bloco)
+                if saida:
+                    comprimido += len(saida)
+                    yield saida
+            saida = terminar()
+            comprimido += len(saida)
+            yield saida
+        finally:
+            registo.incrementar('http_compressao_bytes_total', original, codificacao=codificacao, fase='original')
+            registo.incrementar('http_compressao_bytes_total', comprimido, codificacao=codificacao, fase='comprimido')
+
+
+def init_app(app):
+    """Comprime as respostas de todas as rotas (COMPRESSION_*)."""
+    compressao = Compressao(
+        codificacoes=app.config['COMPRESSION_ENCODINGS'],
+        tamanho_minimo=app.config['COMPRESSION_MIN_SIZE'],
+        nivel_gzip=app.config['COMPRESSION_LEVEL'],
+        nivel_zstd=app.config['COMPRESSION_ZSTD_LEVEL'],
+        nivel_brotli=app.config['COMPRESSION_BROTLI_LEVEL'],
+    )
+    # Registado depois do log e das métricas: corre antes deles, que medem também a compressão
+    app.after_request(compressao.comprimir_resposta)
+    app.extensions['compressao'] = compressao
+    return compressao
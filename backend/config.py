@@ -0,0 +1,110 @@
+import os
+
+
+# Só com FLASK_DEBUG=1: em qualquer outro arranque a SECRET_KEY tem de vir do ambiente,
+# porque quem a conhece pode assinar tokens de qualquer utilizador (incluindo admin)
+CHAVE_DESENVOLVIMENTO = 'dev-key-segura'
+
+
+def chave_secreta():
+    """SECRET_KEY do ambiente; sem ela, a aplicação recusa-se a arrancar fora do modo de depuração."""
+    chave = os.environ.get('SECRET_KEY')
+    if chave:
+        return chave
+    if os.environ.get('FLASK_DEBUG', '').lower() in ('1', 'true', 'yes'):
+        return CHAVE_DESENVOLVIMENTO
+    raise RuntimeError(
+        "SECRET_KEY não definida: defina-a no ambiente (ex.: openssl rand -hex 32) "
+        "ou use FLASK_DEBUG=1 em desenvolvimento"
+    )
+
+
+def carregar_configuracao():
+    """
+    Configuração da aplicação lida do ambiente, com valores padrão para o Docker Compose.
+    Usada por create_app() (app.py) e por create_app_async() (app_async.py).
+    """
+    return dict(
+        SECRET_KEY=chave_secreta(),   # Assina os tokens de acesso e de renovação
+        MAX_CONTENT_LENGTH=16 * 1024 * 1024,   # Limite de 16MB para uploads
+        JSON_SORT_KEYS=False,   # Mantém ordem dos campos no JSON (mais legível para depuração)
+        # Logs (ver log_estruturado.py): JSON por linha, escritos por uma thread dedicada
+        LOG_LEVEL=os.environ.get("LOG_LEVEL", "INFO").upper(),
+        LOG_INFO_SAMPLE_RATE=float(os.environ.get("LOG_INFO_SAMPLE_RATE", 1.0)),   # Fração dos pedidos com eventos INFO guardados
+        LOG_QUEUE_SIZE=int(os.environ.get("LOG_QUEUE_SIZE", 10000)),   # Eventos em espera; acima disto são descartados
+        LOG_ACCESS=os.environ.get("LOG_ACCESS", "1").lower() in ("1", "true", "yes"),   # Uma linha por pedido, com latência
+        # Métricas no formato Prometheus em GET /metrics (ver metricas.py)
+        METRICS_ENABLED=os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true", "yes"),
+        METRICS_TOKEN=os.environ.get("METRICS_TOKEN", ""),   # Se definido, o scraper envia 'Authorization: Bearer <token>'
+        # Compressão das respostas negociada pelo Accept-Encoding (ver compressao.py)
+        COMPRESSION_ENABLED=os.environ.get("COMPRESSION_ENABLED", "1").lower() in ("1", "true", "yes"),
+        COMPRESSION_ENCODINGS=tuple(   # Preferência do servidor; zstd e br só com os pacotes zstandard/brotli
+            nome.strip() for nome in os.environ.get("COMPRESSION_ENCODINGS", "zstd,br,gzip").lower().split(",") if nome.strip()
+        ),
+        COMPRESSION_MIN_SIZE=int(os.environ.get("COMPRESSION_MIN_SIZE", 1024)),   # Bytes; respostas menores seguem sem compressão
+        COMPRESSION_LEVEL=int(os.environ.get("COMPRESSION_LEVEL", 6)),   # Nível do gzip (1-9)
+        COMPRESSION_ZSTD_LEVEL=int(os.environ.get("COMPRESSION_ZSTD_LEVEL", 3)),   # Nível do zstd (1-22)
+        COMPRESSION_BROTLI_LEVEL=int(os.environ.get("COMPRESSION_BROTLI_LEVEL", 4)),   # Qualidade do brotli (0-11)
+        # Banco de dados: lê do ambiente, com valores padrão para Docker Compose
+        DB_HOST=os.environ.get("DB_HOST", "db"), # 'db' é o nome do serviço no docker-compose
+        DB_USER=os.environ.get("DB_USER", "user"),
+        DB_PASSWORD=os.environ.get("DB_PASSWORD", "senha"),
+        DB_NAME=os.environ.get("DB_NAME", "escola"),
+        # Réplicas de leitura (ver replicas.py): os pedidos GET leem de uma réplica saudável
+        DB_REPLICA_HOSTS=tuple(   # 'host' ou 'host:porta', separados por vírgulas; vazio desativa
+            host.strip() for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host.strip()
+        ),
+        DB_REPLICA_POOL_SIZE=int(os.environ.get("DB_REPLICA_POOL_SIZE", os.environ.get("DB_POOL_SIZE", 10))),   # Por réplica
+        DB_REPLICA_MAX_LAG=float(os.environ.get("DB_REPLICA_MAX_LAG", 5)),   # Segundos de atraso tolerados
+        DB_REPLICA_CHECK_INTERVAL=float(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5)),   # Segundos entre verificações
+        DB_REPLICA_CONNECT_TIMEOUT=int(os.environ.get("DB_REPLICA_CONNECT_TIMEOUT", 2)),   # Segundos para ligar (e ler) numa réplica
+        # Após uma escrita, as leituras do mesmo utilizador vão ao primário durante N segundos
+        DB_PRIMARY_AFTER_WRITE=float(os.environ.get("DB_PRIMARY_AFTER_WRITE", os.environ.get("DB_REPLICA_MAX_LAG", 5))),
+        # Motor de armazenamento dos repositórios (ver repositorios/): 'mysql' ou 'sqlite'
+        STORAGE_BACKEND=os.environ.get("STORAGE_BACKEND", "mysql").lower(),
+        SQLITE_PATH=os.environ.get("SQLITE_PATH", "escola.db"),   # Ficheiro do SQLite, ou ':memory:' (um só processo)
+        # Pool de conexões partilhado por todas as rotas
+        DB_POOL_SIZE=int(os.environ.get("DB_POOL_SIZE", 10)),   # Máximo de conexões abertas por processo
+        DB_POOL_TIMEOUT=float(os.environ.get("DB_POOL_TIMEOUT", 5)),   # Segundos à espera de uma conexão livre
+        DB_POOL_MAX_LIFETIME=int(os.environ.get("DB_POOL_MAX_LIFETIME", 1800)),   # Recicla conexões após 30 min
+        DB_POOL_PING_INTERVAL=int(os.environ.get("DB_POOL_PING_INTERVAL", 30)),   # Faz ping se ociosa há mais de 30s
+        # Aplica as migrações de esquema pendentes ao criar a aplicação ('flask db-migrate' faz o mesmo)
+        DB_AUTO_MIGRATE=os.environ.get("DB_AUTO_MIGRATE", "1").lower() in ("1", "true", "yes"),
+        DB_MIGRATE_RETRIES=int(os.environ.get("DB_MIGRATE_RETRIES", 8)),   # Tentativas no arranque se o MySQL ainda não responder
+        DB_MIGRATE_RETRY_DELAY=float(os.environ.get("DB_MIGRATE_RETRY_DELAY", 1)),   # Segundos antes da 2.ª tentativa; duplica a cada falha (máx. 30s)
+        # Cache de tokens opacos validados (evita consultar 'sessoes' em cada pedido autenticado)
+        TOKEN_CACHE_SIZE=int(os.environ.get("TOKEN_CACHE_SIZE", 1024)),   # Máximo de tokens em memória
+        TOKEN_CACHE_TTL=int(os.environ.get("TOKEN_CACHE_TTL", 30)),   # TTL curto mantém os workers consistentes
+        # Tokens assinados (HMAC-SHA256 com a SECRET_KEY)
+        ACCESS_TOKEN_TTL=int(os.environ.get("ACCESS_TOKEN_TTL", 15 * 60)),   # Tokens de acesso de curta duração
+        REFRESH_TOKEN_TTL=int(os.environ.get("REFRESH_TOKEN_TTL", 7 * 24 * 3600)),   # Tokens de renovação
+        TOKEN_DENYLIST_REFRESH=int(os.environ.get("TOKEN_DENYLIST_REFRESH", 15)),   # Sincroniza logouts de outros workers
+        # Limpeza em segundo plano das sessões expiradas (ver auth/sessoes.py)
+        SESSION_SWEEP_INTERVAL=int(os.environ.get("SESSION_SWEEP_INTERVAL", 300)),   # Segundos entre limpezas; 0 desativa
+        SESSION_SWEEP_BATCH=int(os.environ.get("SESSION_SWEEP_BATCH", 1000)),   # Linhas apagadas por transação
+        # Hashing de senhas (bcrypt) fora das threads que servem pedidos
+        BCRYPT_ROUNDS=int(os.environ.get("BCRYPT_ROUNDS", 12)),   # Custo; hashes antigos são atualizados no login
+        BCRYPT_EXECUTOR=os.environ.get("BCRYPT_EXECUTOR", "process"),   # 'process' ou 'thread'
+        BCRYPT_WORKERS=int(os.environ.get("BCRYPT_WORKERS", os.cpu_count() or 2)),   # Hashes em paralelo
+        BCRYPT_MAX_PENDING=int(os.environ.get("BCRYPT_MAX_PENDING", 32)),   # Fila máxima antes de responder 503
+        BCRYPT_TIMEOUT=float(os.environ.get("BCRYPT_TIMEOUT", 10)),   # Segundos à espera de um resultado
+        # Total de alunos em cache: reconciliado com COUNT(*) a cada N segundos
+        ALUNOS_COUNT_RECONCILE=int(os.environ.get("ALUNOS_COUNT_RECONCILE", 60)),
+        # Cache de respostas das rotas GET de alunos, invalidado pelas escritas
+        RESPONSE_CACHE_BACKEND=os.environ.get("RESPONSE_CACHE_BACKEND", "memoria"),   # 'memoria' ou 'nenhum'
+        RESPONSE_CACHE_SIZE=int(os.environ.get("RESPONSE_CACHE_SIZE", 2048)),   # Máximo de respostas em memória
+        RESPONSE_CACHE_TTL=int(os.environ.get("RESPONSE_CACHE_TTL", 15)),   # Limita o atraso entre workers
+        # Importação em massa: alunos por INSERT multi-linha (um commit por lote)
+        ALUNOS_BULK_CHUNK_SIZE=int(os.environ.get("ALUNOS_BULK_CHUNK_SIZE", 500)),
+        # Multi-get (GET /alunos/?ids= e POST /alunos/lookup): máximo de chaves por pedido
+        ALUNOS_LOOKUP_MAX_KEYS=int(os.environ.get("ALUNOS_LOOKUP_MAX_KEYS", 100)),
+        # Exportações em segundo plano da tabela de alunos
+        EXPORTS_DIR=os.environ.get("EXPORTS_DIR", "exports"),   # Diretório dos ficheiros gerados
+        EXPORTS_MAX_WORKERS=int(os.environ.get("EXPORTS_MAX_WORKERS", 2)),   # Exportações simultâneas por processo
+        EXPORTS_CHUNK_SIZE=int(os.environ.get("EXPORTS_CHUNK_SIZE", 5000)),   # Linhas lidas do servidor por bloco
+        EXPORTS_RETENTION=int(os.environ.get("EXPORTS_RETENTION", 86400)),   # Segundos até apagar uma exportação terminada (0: nunca)
+        EXPORTS_STALE_TIMEOUT=int(os.environ.get("EXPORTS_STALE_TIMEOUT", 900)),   # Segundos sem progresso até dar uma exportação em execução como falhada (as pendentes esperam até EXPORTS_RETENTION)
+        # API assíncrona (app_async.py): conexões do pool aiomysql partilhadas por todos os pedidos
+        DB_ASYNC_POOL_MIN=int(os.environ.get("DB_ASYNC_POOL_MIN", 1)),
+        DB_ASYNC_POOL_SIZE=int(os.environ.get("DB_ASYNC_POOL_SIZE", 20)),   # Pedidos acima disto esperam por uma conexão
+    )
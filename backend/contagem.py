@@ -0,0 +1,57 @@
+import time
+import threading
+
+from flask import current_app
+
+
+class ContadorAlunos:
+    """
+    Total de alunos mantido em memória para evitar um COUNT(*) em cada listagem.
+
+    O valor é ajustado de forma incremental pelas rotas que inserem ou removem
+    alunos e reconciliado com um COUNT(*) real quando fica mais antigo que
+    'reconcile_interval' segundos, o que corrige desvios causados por outros
+    processos (workers) ou por alterações feitas fora da API.
+    """
+
+    def __init__(self, reconcile_interval=60):
+        self.reconcile_interval = reconcile_interval
+        self._total = None
+        self._reconciled_at = 0.0
+        self._lock = threading.Lock()
+
+    def obter(self):
+        """Devolve o total em cache, ou None se estiver desconhecido ou precisar de reconciliação."""
+        with self._lock:
+            if self._total is None:
+                return None
+            if time.monotonic() - self._reconciled_at > self.reconcile_interval:
+                return None
+            return self._total
+
+    def definir(self, total):
+        """Regista um total exato obtido com COUNT(*)."""
+        with self._lock:
+            self._total = total
+            self._reconciled_at = time.monotonic()
+
+    def ajustar(self, delta):
+        """Soma 'delta' ao total em cache (ex.: +1 ao cadastrar, -1 ao excluir)."""
+        with self._lock:
+            if self._total is not None:
+                self._total = max(0, self._total + delta)
+
+    def invalidar(self):
+        with self._lock:
+            self._total = None
+
+
+def init_app(app):
+    """Cria o contador de alunos da aplicação a partir da configuração."""
+    contador = ContadorAlunos(reconcile_interval=app.config['ALUNOS_COUNT_RECONCILE'])
+    app.extensions['contador_alunos'] = contador
+    return contador
+
+
+def get_contador():
+    return current_app.extensions['contador_alunos']
@@ -0,0 +1,228 @@
+import os
+import time
+import queue
+import weakref
+import threading
+import logging
+
+import mysql.connector
+from mysql.connector import errors
+from flask import current_app
+
+from metricas import registo, tipo_consulta
+
+logger = logging.getLogger(__name__)
+
+
+class CursorMedido:
+    """Envolve um cursor MySQL e regista a contagem e a duração de cada comando executado."""
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return self._raw.__exit__(*exc)
+
+    def _medir(self, metodo, operacao, *args, **kwargs):
+        tipo = tipo_consulta(operacao)
+        inicio = time.perf_counter()
+        try:
+            return metodo(operacao, *args, **kwargs)
+        except Exception:
+            registo.incrementar('db_erros_total', tipo=tipo)
+            raise
+        finally:
+            registo.observar('db_consulta_duracao_segundos', time.perf_counter() - inicio, tipo=tipo)
+            registo.incrementar('db_consultas_total', tipo=tipo)
+
+    def execute(self, operacao, *args, **kwargs):
+        return self._medir(self._raw.execute, operacao, *args, **kwargs)
+
+    def executemany(self, operacao, *args, **kwargs):
+        return self._medir(self._raw.executemany, operacao, *args, **kwargs)
+
+
+class PooledConnection:
+    """
+    Envolve uma conexão MySQL emprestada do pool.
+    Chamar close() devolve a conexão ao pool em vez de fechar o socket,
+    por isso as rotas continuam a usar o mesmo padrão try/finally: conn.close().
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._returned = False
+
+    def __getattr__(self, name):
+        # Delega cursor(), commit(), rollback() etc. para a conexão real
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return CursorMedido(self._raw.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._returned:
+            return
+        self._returned = True
+        self._pool._release(self._raw, self._created_at)
+
+
+class ConnectionPool:
+    """
+    Pool de conexões MySQL com tamanho limitado, verificação de saúde ao emprestar
+    e tempo máximo de vida por conexão.
+
+    As conexões são abertas sob demanda (nenhuma conexão é criada em create_app()),
+    para que a aplicação arranque mesmo que o MySQL ainda não esteja disponível.
+    """
+
+    def __init__(self, connect_args, size=10, timeout=5, max_lifetime=1800, ping_interval=30):
+        self.connect_args = connect_args
+        self.size = size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+
+        self._idle = queue.LifoQueue()  # LIFO: reutiliza a conexão mais "quente"
+        self._slots = threading.BoundedSemaphore(size)  # Limita o total de conexões abertas
+        self._herdadas = []  # Conexões do processo pai, mantidas apenas para não serem fechadas aqui
+
+        # Cada worker criado por fork (gunicorn com preload_app) começa com um pool vazio
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def _apos_fork(self):
+        """
+        Corre no processo filho logo após o fork. As conexões ociosas herdadas
+        partilham o socket com o processo pai: fechá-las enviaria COM_QUIT e
+        derrubaria a conexão do pai, por isso são apenas postas de lado.
+        """
+        while True:
+            try:
+                self._herdadas.append(self._idle.get_nowait()[0])
+            except queue.Empty:
+                break
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _connect(self):
+        registo.incrementar('db_conexoes_abertas_total')
+        return mysql.connector.connect(**self.connect_args)
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def get_connection(self):
+        """Empresta uma conexão saudável do pool (ou abre uma nova se houver vaga)."""
+        inicio = time.perf_counter()
+        obtida = self._slots.acquire(timeout=self.timeout)
+        registo.observar('db_pool_espera_segundos', time.perf_counter() - inicio)
+        if not obtida:
+            registo.incrementar('db_pool_esgotado_total')
+            raise errors.PoolError("Pool de conexões esgotado: nenhuma conexão disponível")
+
+        try:
+            while True:
+                try:
+                    raw, created_at, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+
+                now = time.monotonic()
+                # Recicla conexões que ultrapassaram o tempo máximo de vida
+                if self.max_lifetime and now - created_at > self.max_lifetime:
+                    self._discard(raw)
+                    continue
+                # Só faz ping se a conexão esteve ociosa tempo suficiente para poder ter caído
+                if now - last_used > self.ping_interval and not raw.is_connected():
+                    logger.warning("Conexão ociosa inválida descartada do pool")
+                    self._discard(raw)
+                    continue
+                return PooledConnection(self, raw, created_at)
+
+            return PooledConnection(self, self._connect(), time.monotonic())
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, raw, created_at):
+        try:
+            # Garante que nenhuma transação pendente vaze para o próximo pedido. Sem ping
+            # aqui (seria uma ida ao servidor por pedido): uma conexão que caiu é apanhada
+            # pelo ping ao emprestar, depois de ping_interval, ou pelo max_lifetime
+            if raw.in_transaction:
+                raw.rollback()
+            self._idle.put((raw, created_at, time.monotonic()))
+        except Exception:
+            self._discard(raw)
+        finally:
+            self._slots.release()
+
+    def estatisticas(self):
+        """Conexões ociosas e emprestadas neste processo (valores aproximados, lidos sem lock)."""
+        return {
+            'tamanho': self.size,
+            'ociosas': self._idle.qsize(),
+            'em_uso': self.size - self._slots._value,  # Vagas do semáforo ainda livres
+        }
+
+    def close_all(self):
+        """Fecha todas as conexões ociosas (no encerramento e no processo mestre antes do fork)."""
+        while True:
+            try:
+                raw, _, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(raw)
+
+
+def argumentos_conexao(config, host=None, porta=None):
+    """Argumentos de mysql.connector.connect(): o primário (DB_HOST) ou outro servidor, como uma réplica."""
+    connect_args = {
+        'host': host or config['DB_HOST'],
+        'user': config['DB_USER'],
+        'password': config['DB_PASSWORD'],
+        'database': config['DB_NAME'],
+        # As leituras avulsas não abrem transação (nem precisam de COMMIT); as escritas
+        # abrem-na explicitamente (ver repositorios/mysql.py, BancoMySQL)
+        'autocommit': True,
+    }
+    if porta:
+        connect_args['port'] = porta
+    return connect_args
+
+
+def init_app(app):
+    """Cria o pool de conexões da aplicação a partir da configuração."""
+    pool = ConnectionPool(
+        argumentos_conexao(app.config),
+        size=app.config['DB_POOL_SIZE'],
+        timeout=app.config['DB_POOL_TIMEOUT'],
+        max_lifetime=app.config['DB_POOL_MAX_LIFETIME'],
+        ping_interval=app.config['DB_POOL_PING_INTERVAL'],
+    )
+    app.extensions['db_pool'] = pool
+    return pool
+
+
+def get_pool():
+    return current_app.extensions['db_pool']
+
+
+def db_connection():
+    """Empresta uma conexão do pool da aplicação atual. Chame close() para devolvê-la."""
+    return get_pool().get_connection()
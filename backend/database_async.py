@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
+import aiomysql
+from quart import current_app
+
+logger = logging.getLogger(__name__)
+
+
+class PoolEsgotado(Exception):
+    """Nenhuma conexão ficou livre dentro de DB_POOL_TIMEOUT (equivalente ao PoolError do pool síncrono)."""
+
+
+def init_app(app):
+    """
+    Cria o pool aiomysql da API assíncrona quando o servidor arranca (precisa do
+    event loop) e fecha-o no encerramento. Ao contrário do pool síncrono, um
+    pedido à espera de uma conexão não ocupa uma thread: fica suspenso no loop.
+    """
+    @app.before_serving
+    async def abrir_pool():
+        app.extensions['db_pool_async'] = await aiomysql.create_pool(
+            host=app.config['DB_HOST'],
+            user=app.config['DB_USER'],
+            password=app.config['DB_PASSWORD'],
+            db=app.config['DB_NAME'],
+            minsize=app.config['DB_ASYNC_POOL_MIN'],
+            maxsize=app.config['DB_ASYNC_POOL_SIZE'],
+            pool_recycle=app.config['DB_POOL_MAX_LIFETIME'],   # Recicla conexões antigas, como o pool síncrono
+            autocommit=False,
+            charset='utf8mb4',
+        )
+
+    @app.after_serving
+    async def fechar_pool():
+        pool = app.extensions.pop('db_pool_async', None)
+        if pool is not None:
+            pool.close()
+            await pool.wait_closed()
+
+
+def get_pool_async():
+    return current_app.extensions['db_pool_async']
+
+
+@asynccontextmanager
+async def db_connection_async():
+    """
+    Empresta uma conexão do pool assíncrono durante o bloco 'async with'.
+    Uma transação deixada aberta é desfeita antes de a conexão voltar ao pool.
+    """
+    pool = get_pool_async()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=current_app.config['DB_POOL_TIMEOUT'])
+    except asyncio.TimeoutError:
+        raise PoolEsgotado("Pool de conexões esgotado: nenhuma conexão disponível")
+    try:
+        yield conn
+    finally:
+        try:
+            if conn.get_transaction_status():
+                await conn.rollback()
+        except Exception:
+            # Conexão partida: o pool descarta-a ao ser devolvida fechada
+            conn.close()
+        pool.release(conn)
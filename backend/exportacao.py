@@ -0,0 +1,233 @@
+import os
+import csv
+import gzip
+import json
+import uuid
+import logging
+import weakref
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from routes.comum import CAMPOS_ALUNO
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+# Estados de uma tarefa que ainda não terminou
+ESTADOS_ATIVOS = ('pendente', 'em_execucao')
+
+
+class GestorExportacoes:
+    """
+    Executa exportações da tabela 'alunos' em segundo plano.
+
+    Cada tarefa lê a tabela em blocos de 'chunk_size' linhas (AlunoRepository.iterar_alunos;
+    no MySQL, um cursor não-bufferizado) e escreve diretamente para disco, por isso nem o
+    worker do pedido nem a memória do processo ficam presos à exportação.
+    O estado de cada tarefa é guardado num ficheiro JSON ao lado do ficheiro
+    exportado, para que qualquer processo no mesmo servidor o possa consultar.
+
+    A tarefa em execução atualiza 'atualizado_em' a cada bloco: se o processo que a
+    executava morrer, o estado deixa de mudar e, passados 'timeout' segundos, quem o
+    consultar marca-a como 'erro'. Uma tarefa pendente não progride enquanto espera
+    na fila (com todos os workers ocupados), por isso só é dada como perdida ao fim
+    de 'retencao' segundos. As tarefas terminadas há mais de 'retencao' segundos são
+    apagadas (estado e ficheiro) sempre que uma nova exportação começa.
+    """
+
+    def __init__(self, diretorio, max_workers=2, chunk_size=5000, retencao=86400, timeout=900):
+        self.diretorio = diretorio
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.retencao = retencao
+        self.timeout = timeout
+        self._executor = None
+        self._lock = threading.Lock()
+
+        # As threads do processo pai não existem num worker criado por fork
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def _apos_fork(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Criado sob demanda para não arrancar threads antes de serem necessárias
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='exportacao')
+            return self._executor
+
+    def _caminho_estado(self, job_id):
+        return os.path.join(self.diretorio, f"{job_id}.json")
+
+    def _guardar_estado(self, job):
+        # Escrita atómica: quem consulta nunca lê um JSON incompleto
+        caminho = self._caminho_estado(job['id'])
+        with open(caminho + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(caminho + '.tmp', caminho)
+
+    def iniciar(self, app, formato, comprimir, criado_por=None):
+        """Regista uma nova exportação e agenda-a; devolve o estado inicial da tarefa."""
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.limpar()
+        job_id = uuid.uuid4().hex
+        agora = datetime.now().isoformat()
+        extensao = FORMATOS[formato][1] + ('.gz' if comprimir else '')
+        job = {
+            'id': job_id,
+            'estado': 'pendente',
+            'formato': formato,
+            'gzip': comprimir,
+            'ficheiro': f"alunos-{job_id}.{extensao}",
+            'linhas': 0,
+            'bytes': 0,
+            'criado_por': criado_por,
+            'criado_em': agora,
+            'atualizado_em': agora,
+            'concluido_em': None,
+            'erro': None,
+        }
+        self._guardar_estado(job)
+        self._get_executor().submit(self._executar, app, job)
+        return job
+
+    def obter(self, job_id):
+        """Devolve o estado de uma tarefa, ou None se não existir."""
+        # O ID vem do URL: aceita apenas o formato gerado por uuid4().hex
+        if len(job_id) != 32 or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        try:
+            with open(self._caminho_estado(job_id), encoding='utf-8') as f:
+                job = json.load(f)
+        except FileNotFoundError:
+            return None
+        return self._verificar_validade(job)
+
+    def _verificar_validade(self, job):
+        """Marca como 'erro' uma tarefa parada; devolve None (e apaga-a) se já expirou."""
+        agora = datetime.now()
+        if job['estado'] in ESTADOS_ATIVOS:
+            # Estados gravados antes de existir 'atualizado_em' usam a data de criação
+            ultimo_sinal = datetime.fromisoformat(job.get('atualizado_em') or job['criado_em'])
+            limite = self.timeout if job['estado'] == 'em_execucao' else self.retencao
+            if limite and agora - ultimo_sinal > timedelta(seconds=limite):
+                logger.warning(f"Exportação {job['id']} ({job['estado']}) parada há mais de {limite}s: marcada como falhada")
+                job['estado'] = 'erro'
+                job['erro'] = "Exportação interrompida (sem progresso)"
+                job['concluido_em'] = agora.isoformat()
+                self._remover(self.caminho_ficheiro(job) + '.part')
+                self._guardar_estado(job)
+            return job
+        if self.retencao and agora - datetime.fromisoformat(job['concluido_em']) > timedelta(seconds=self.retencao):
+            self._remover(self.caminho_ficheiro(job))
+            self._remover(self._caminho_estado(job['id']))
+            return None
+        return job
+
+    def limpar(self):
+        """Apaga as tarefas expiradas e marca as paradas como falhadas; devolve quantas apagou."""
+        apagadas = 0
+        try:
+            nomes = os.listdir(self.diretorio)
+        except FileNotFoundError:
+            return 0
+        for nome in nomes:
+            job_id, extensao = os.path.splitext(nome)
+            if extensao != '.json':
+                continue
+            try:
+                if self.obter(job_id) is None:
+                    apagadas += 1
+            except (OSError, ValueError, KeyError) as e:
+                # Estado ilegível ou apagado por outro processo ao mesmo tempo
+                logger.warning(f"Estado da exportação {job_id} ignorado na limpeza: {e}")
+        if apagadas:
+            logger.info(f"Limpeza de exportações: {apagadas} apagada(s)")
+        return apagadas
+
+    @staticmethod
+    def _remover(caminho):
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+    def caminho_ficheiro(self, job):
+        return os.path.join(self.diretorio, job['ficheiro'])
+
+    def _abrir_destino(self, caminho, comprimir):
+        if comprimir:
+            return gzip.open(caminho, 'wt', encoding='utf-8', newline='')
+        return open(caminho, 'w', encoding='utf-8', newline='')
+
+    def _executar(self, app, job):
+        # Esperou na fila mais do que a retenção e já foi dada como perdida: não a retoma
+        atual = self.obter(job['id'])
+        if atual is None or atual['estado'] != 'pendente':
+            return
+        job['estado'] = 'em_execucao'
+        job['atualizado_em'] = datetime.now().isoformat()
+        self._guardar_estado(job)
+
+        destino = self.caminho_ficheiro(job)
+        temporario = destino + '.part'
+        try:
+            with self._abrir_destino(temporario, job['gzip']) as f:
+                writer = None
+                if job['formato'] == 'csv':
+                    writer = csv.writer(f)
+                    writer.writerow(CAMPOS_ALUNO)
+
+                for linhas in app.extensions['repo_alunos'].iterar_alunos(self.chunk_size):
+                    if writer:
+                        writer.writerows(linhas)
+                    else:
+                        f.writelines(
+                            json.dumps(dict(zip(CAMPOS_ALUNO, linha)), ensure_ascii=False) + '\n'
+                            for linha in linhas
+                        )
+                    job['linhas'] += len(linhas)
+                    # Sinal de vida (ver _verificar_validade) e progresso para quem consulta
+                    job['atualizado_em'] = datetime.now().isoformat()
+                    self._guardar_estado(job)
+
+            os.replace(temporario, destino)
+            job['estado'] = 'concluido'
+            job['bytes'] = os.path.getsize(destino)
+            logger.info(f"Exportação {job['id']} concluída: {job['linhas']} alunos")
+        except Exception as e:
+            logger.exception(f"Erro na exportação {job['id']}")
+            job['estado'] = 'erro'
+            job['erro'] = str(e)
+            if os.path.exists(temporario):
+                os.remove(temporario)
+        finally:
+            job['concluido_em'] = job['atualizado_em'] = datetime.now().isoformat()
+            self._guardar_estado(job)
+
+
+def init_app(app):
+    """Cria o gestor de exportações da aplicação a partir da configuração."""
+    gestor = GestorExportacoes(
+        app.config['EXPORTS_DIR'],
+        max_workers=app.config['EXPORTS_MAX_WORKERS'],
+        chunk_size=app.config['EXPORTS_CHUNK_SIZE'],
+        retencao=app.config['EXPORTS_RETENTION'],
+        timeout=app.config['EXPORTS_STALE_TIMEOUT'],
+    )
+    app.extensions['exportacoes'] = gestor
+    return gestor
+
+
+def get_exportacoes():
+    return current_app.extensions['exportacoes']
@@ -0,0 +1,60 @@
+"""
+Configuração do gunicorn, o servidor usado em produção (ver Dockerfile):
+
+    gunicorn --config gunicorn.conf.py app:app
+
+- preload_app: create_app() corre uma vez no processo mestre (migrações, lista de
+  revogação) e os workers são criados por fork, partilhando essa memória;
+- cada worker tem o seu pool de conexões e os seus executores, recriados após o
+  fork (ver os os.register_at_fork em database.py, auth/senhas.py, auth/sessoes.py e exportacao.py);
+- SIGHUP relê esta configuração e substitui os workers de forma gradual;
+  SIGTERM para de aceitar ligações e espera até graceful_timeout pelos pedidos em curso;
+- max_requests recicla cada worker após N pedidos (com jitter para não reiniciarem todos juntos).
+
+Com preload_app o código da aplicação só é recarregado reiniciando o mestre
+(ou com SIGUSR2 seguido de SIGTERM ao mestre antigo).
+"""
+import os
+
+bind = f"{os.environ.get('FLASK_HOST', '0.0.0.0')}:{os.environ.get('FLASK_PORT', 5000)}"
+
+# Processos e threads: o bcrypt e a serialização de JSON usam CPU, o resto espera pelo MySQL
+workers = int(os.environ.get("GUNICORN_WORKERS", os.cpu_count() or 2))
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))   # Não deve exceder DB_POOL_SIZE
+
+preload_app = True
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 5000))   # 0 desativa a reciclagem
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 500))
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))   # Worker sem resposta é reiniciado
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))   # Tempo para drenar pedidos
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """Fecha as conexões que o mestre abriu em create_app() antes de criar os workers."""
+    app = server.app.wsgi()
+    app.extensions['db_pool'].close_all()
+    if app.extensions.get('db_replicas'):
+        app.extensions['db_replicas'].close_all()
+    server.log.info("Conexões do processo mestre fechadas; a iniciar os workers")
+
+
+def post_fork(server, worker):
+    server.log.info(f"Worker {worker.pid} iniciado")
+
+
+def worker_exit(server, worker):
+    """Fecha as conexões, o pool de hashing e a limpeza de sessões do worker que termina (reciclagem ou shutdown)."""
+    app = server.app.wsgi()
+    app.extensions['limpeza_sessoes'].encerrar()
+    app.extensions['db_pool'].close_all()
+    if app.extensions.get('db_replicas'):
+        app.extensions['db_replicas'].close_all()
+    app.extensions['senhas'].encerrar()
@@ -0,0 +1,212 @@
+import os
+import sys
+import copy
+import json
+import time
+import uuid
+import zlib
+import queue
+import atexit
+import random
+import logging
+import weakref
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from flask import g, request, has_request_context
+
+# Campos extra que as rotas podem passar em logger.info(..., extra={...}) e que vão para o JSON
+CAMPOS_EXTRA = ('request_id', 'rota', 'metodo', 'status', 'latencia_ms')
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por evento: fácil de filtrar e agregar (jq, Loki, ELK)."""
+
+    def format(self, record):
+        evento = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+        }
+        for campo in CAMPOS_EXTRA:
+            valor = getattr(record, campo, None)
+            if valor is not None:
+                evento[campo] = valor
+        evento['origem'] = f"{record.pathname}:{record.lineno}"
+        if record.exc_text:
+            evento['excecao'] = record.exc_text
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+class FiltroContextoPedido(logging.Filter):
+    """
+    Acrescenta o request id e a rota do pedido atual ao registo. Corre na thread
+    do pedido (antes de o registo entrar na fila), onde o contexto Flask existe.
+    """
+
+    def filter(self, record):
+        if has_request_context():
+            if getattr(record, 'request_id', None) is None:
+                record.request_id = g.get('request_id')
+            if getattr(record, 'rota', None) is None:
+                record.rota = request.url_rule.rule if request.url_rule else request.path
+                record.metodo = request.method
+        return True
+
+
+class FiltroAmostragem(logging.Filter):
+    """
+    Guarda apenas uma fração ('taxa') dos eventos INFO/DEBUG; avisos e erros passam sempre.
+    A decisão é feita por request id, por isso um pedido amostrado fica com todos
+    os seus eventos (e um pedido descartado não deixa linhas soltas).
+    """
+
+    def __init__(self, taxa):
+        super().__init__()
+        self.taxa = taxa
+
+    def filter(self, record):
+        if self.taxa >= 1 or record.levelno >= logging.WARNING:
+            return True
+        request_id = getattr(record, 'request_id', None)
+        if request_id:
+            return zlib.crc32(request_id.encode('utf-8')) / 0xFFFFFFFF < self.taxa
+        return random.random() < self.taxa
+
+
+class HandlerFila(QueueHandler):
+    """
+    QueueHandler que nunca bloqueia a thread do pedido: se a fila estiver cheia
+    (disco lento), o evento é descartado e contado em vez de esperar.
+    """
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def prepare(self, record):
+        # A mensagem e a exceção são formatadas aqui; os argumentos originais não
+        # atravessam a fila (podem não ser seguros de usar noutra thread)
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+class PipelineLogs:
+    """Fila + thread de escrita (QueueListener): a escrita em disco sai das threads dos pedidos."""
+
+    def __init__(self, handlers, tamanho_fila, taxa_amostragem):
+        self.handlers = handlers
+        self.tamanho_fila = tamanho_fila
+        self.handler_fila = HandlerFila(queue.Queue(tamanho_fila))
+        self.handler_fila.addFilter(FiltroContextoPedido())
+        self.handler_fila.addFilter(FiltroAmostragem(taxa_amostragem))
+        self.listener = None
+        self._lock = threading.Lock()
+
+        # A thread de escrita não sobrevive ao fork (workers do gunicorn): cada processo inicia a sua
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def iniciar(self):
+        with self._lock:
+            if self.listener is None:
+                self.listener = QueueListener(self.handler_fila.queue, *self.handlers, respect_handler_level=True)
+                self.listener.start()
+
+    def parar(self):
+        """Escreve os eventos que ainda estão na fila e termina a thread de escrita."""
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def _apos_fork(self):
+        self._lock = threading.Lock()
+        self.handler_fila.queue = queue.Queue(self.tamanho_fila)
+        self.listener = None
+        self.iniciar()
+
+
+def iniciar_pipeline(app):
+    """
+    Substitui os handlers do logger raiz por um único handler de fila; os handlers
+    reais (ficheiro rotativo e stdout, ambos em JSON) correm na thread do listener.
+    """
+    formatador = FormatadorJSON()
+
+    # Cria o diretório 'logs' se não existir
+    os.makedirs('logs', exist_ok=True)
+    file_handler = RotatingFileHandler(
+        'logs/api.log',
+        maxBytes=1024 * 1024 * 10,   # 10MB
+        backupCount=7,
+        encoding='utf-8'
+    )
+    file_handler.setFormatter(formatador)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatador)
+
+    pipeline = PipelineLogs(
+        [file_handler, stream_handler],
+        tamanho_fila=app.config['LOG_QUEUE_SIZE'],
+        taxa_amostragem=app.config['LOG_INFO_SAMPLE_RATE'],
+    )
+
+    raiz = logging.getLogger()
+    for handler in raiz.handlers[:]:
+        raiz.removeHandler(handler)
+    raiz.addHandler(pipeline.handler_fila)
+    raiz.setLevel(app.config['LOG_LEVEL'])
+
+    # O logger da aplicação passa a usar o pipeline através do logger raiz
+    for handler in app.logger.handlers[:]:
+        app.logger.removeHandler(handler)
+    app.logger.propagate = True
+
+    pipeline.iniciar()
+    atexit.register(pipeline.parar)
+    app.extensions['logs'] = pipeline
+    return pipeline
+
+
+def init_app(app):
+    """Configura o pipeline de logs e regista um evento de acesso por pedido (com latência)."""
+    pipeline = iniciar_pipeline(app)
+    acesso = logging.getLogger('acesso')
+
+    @app.before_request
+    def marcar_inicio():
+        # Reutiliza o id enviado por um proxy/cliente para correlacionar os logs
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.inicio_pedido = time.perf_counter()
+
+    @app.after_request
+    def registar_pedido(resposta):
+        inicio = g.get('inicio_pedido')
+        if inicio is not None:
+            resposta.headers['X-Request-ID'] = g.request_id
+            if app.config['LOG_ACCESS']:
+                acesso.info(
+                    f"{request.method} {request.path} {resposta.status_code}",
+                    extra={
+                        'status': resposta.status_code,
+                        'latencia_ms': round((time.perf_counter() - inicio) * 1000, 2),
+                    }
+                )
+        return resposta
+
+    app.logger.info('Aplicação iniciada')
+    return pipeline
@@ -0,0 +1,197 @@
+import os
+import time
+import bisect
+import weakref
+import threading
+
+from flask import g, request
+
+# Limites (em segundos) dos histogramas de latência
+LIMITES_LATENCIA = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Metricas:
+    """
+    Registo de métricas do processo, exportado no formato de texto do Prometheus.
+
+    Cada thread escreve apenas no seu próprio "shard" (um dicionário criado na
+    primeira utilização), por isso registar um pedido ou uma consulta não
+    adquire nenhum lock. A exportação soma os shards de todas as threads.
+    Com vários workers (gunicorn), cada processo expõe as suas próprias métricas.
+    """
+
+    def __init__(self):
+        self._definicoes = {}  # nome -> (tipo, ajuda, limites)
+        self._gauges = {}  # nome -> (ajuda, funcao que devolve [(rotulos, valor)])
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # Só usado ao criar um shard e ao exportar
+
+        # Um worker criado por fork começa com contadores a zero
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def _apos_fork(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def contador(self, nome, ajuda):
+        self._definicoes[nome] = ('counter', ajuda, None)
+
+    def histograma(self, nome, ajuda, limites=LIMITES_LATENCIA):
+        self._definicoes[nome] = ('histogram', ajuda, tuple(limites))
+
+    def gauge(self, nome, ajuda, funcao):
+        """Gauge calculado no momento da exportação; 'funcao' devolve uma lista de (rotulos, valor)."""
+        self._gauges[nome] = (ajuda, funcao)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def incrementar(self, nome, valor=1, **rotulos):
+        shard = self._shard()
+        chave = (nome, tuple(sorted(rotulos.items())))
+        shard[chave] = shard.get(chave, 0) + valor
+
+    def observar(self, nome, valor, **rotulos):
+        limites = self._definicoes[nome][2]
+        shard = self._shard()
+        chave = (nome, tuple(sorted(rotulos.items())))
+        serie = shard.get(chave)
+        if serie is None:
+            # Contagem por intervalo (não cumulativa), seguida da soma dos valores
+            serie = shard[chave] = [0] * (len(limites) + 1) + [0.0]
+        serie[bisect.bisect_left(limites, valor)] += 1
+        serie[-1] += valor
+
+    def _somar_shards(self):
+        with self._lock:
+            shards = list(self._shards)
+        total = {}
+        for shard in shards:
+            # list() copia os itens de uma vez, sem iterar o dicionário enquanto outra thread o altera
+            for chave, valor in list(shard.items()):
+                if isinstance(valor, list):
+                    acumulado = total.setdefault(chave, [0] * len(valor))
+                    for i, parcela in enumerate(valor):
+                        acumulado[i] += parcela
+                else:
+                    total[chave] = total.get(chave, 0) + valor
+        return total
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (version 0.0.4)."""
+        series = {}
+        for (nome, rotulos), valor in self._somar_shards().items():
+            series.setdefault(nome, []).append((rotulos, valor))
+
+        linhas = []
+        for nome, (tipo, ajuda, limites) in self._definicoes.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} {tipo}")
+            for rotulos, valor in sorted(series.get(nome, ())):
+                if tipo == 'histogram':
+                    acumulado = 0
+                    for limite, parcela in zip(limites + ('+Inf',), valor):
+                        acumulado += parcela
+                        linhas.append(f"{nome}_bucket{_rotulos(rotulos, le=limite)} {acumulado}")
+                    linhas.append(f"{nome}_sum{_rotulos(rotulos)} {valor[-1]}")
+                    linhas.append(f"{nome}_count{_rotulos(rotulos)} {acumulado}")
+                else:
+                    linhas.append(f"{nome}{_rotulos(rotulos)} {valor}")
+        for nome, (ajuda, funcao) in self._gauges.items():
+            linhas.append(f"# HELP {nome} {ajuda}")
+            linhas.append(f"# TYPE {nome} gauge")
+            for rotulos, valor in funcao():
+                linhas.append(f"{nome}{_rotulos(tuple(sorted(rotulos.items())))} {valor}")
+        return "\n".join(linhas) + "\n"
+
+
+def _rotulos(rotulos, **extra):
+    pares = list(rotulos) + list(extra.items())
+    if not pares:
+        return ""
+    texto = ",".join(
+        f'{chave}="{str(valor).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for chave, valor in pares
+    )
+    return "{" + texto + "}"
+
+
+# Registo único do processo, usado também por database.py e auth/senhas.py
+registo = Metricas()
+
+registo.contador('http_pedidos_total', "Pedidos HTTP concluídos, por endpoint, método e código de estado.")
+registo.histograma('http_pedido_duracao_segundos', "Latência dos pedidos HTTP, por endpoint e método.")
+registo.contador('db_consultas_total', "Comandos SQL executados, por tipo (SELECT, INSERT, ...).")
+registo.histograma('db_consulta_duracao_segundos', "Duração dos comandos SQL, por tipo.")
+registo.contador('db_erros_total', "Comandos SQL que levantaram erro, por tipo.")
+registo.contador('db_conexoes_abertas_total', "Conexões MySQL novas abertas pelo pool.")
+registo.contador('db_leituras_total', "Pedidos GET com leituras no banco, por destino (replica, primario) e motivo.")
+registo.contador('db_pool_esgotado_total', "Pedidos que não obtiveram conexão dentro de DB_POOL_TIMEOUT.")
+registo.histograma('db_pool_espera_segundos', "Tempo à espera de uma conexão do pool.")
+registo.histograma('bcrypt_duracao_segundos', "Duração das operações bcrypt (incluindo a fila), por operação.",
+                   limites=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+registo.contador('http_compressao_bytes_total', "Bytes das respostas comprimidas, antes e depois, por codificação.")
+registo.contador('bcrypt_rejeicoes_total', "Operações bcrypt recusadas com 503 (fila cheia ou tempo esgotado).")
+
+
+def tipo_consulta(sql):
+    """Primeira palavra do comando SQL (rótulo de baixa cardinalidade)."""
+    palavra = sql.lstrip().split(None, 1)[0].upper() if sql and sql.strip() else ''
+    return palavra if palavra in ('SELECT', 'INSERT', 'UPDATE', 'DELETE') else 'OUTRO'
+
+
+def init_app(app):
+    """Mede cada pedido e expõe as métricas do processo em GET /metrics."""
+    def estado_pool():
+        estatisticas = app.extensions['db_pool'].estatisticas()
+        return [
+            ({'estado': 'ociosa'}, estatisticas['ociosas']),
+            ({'estado': 'em_uso'}, estatisticas['em_uso']),
+            ({'estado': 'maximo'}, estatisticas['tamanho']),
+        ]
+
+    registo.gauge('db_pool_conexoes', "Conexões do pool deste processo, por estado.", estado_pool)
+
+    roteador = app.extensions.get('db_replicas')
+    if roteador is not None:
+        registo.gauge('db_replica_disponivel', "1 se a réplica está na rotação de leituras, por réplica.", lambda: [
+            ({'replica': replica.nome}, int(replica.disponivel)) for replica in roteador.replicas
+        ])
+        registo.gauge('db_replica_atraso_segundos', "Atraso da réplica na última verificação, por réplica.", lambda: [
+            ({'replica': replica.nome}, replica.atraso) for replica in roteador.replicas if replica.atraso is not None
+        ])
+
+    @app.before_request
+    def iniciar_medicao():
+        g.inicio_metricas = time.perf_counter()
+
+    @app.after_request
+    def registar_medicao(resposta):
+        inicio = g.get('inicio_metricas')
+        if inicio is not None:
+            endpoint = request.endpoint or 'nao_encontrado'
+            registo.observar('http_pedido_duracao_segundos', time.perf_counter() - inicio,
+                             endpoint=endpoint, metodo=request.method)
+            registo.incrementar('http_pedidos_total',
+                                endpoint=endpoint, metodo=request.method, estado=resposta.status_code)
+        return resposta
+
+    @app.route('/metrics')
+    def exportar_metricas():
+        """Métricas deste processo no formato de texto do Prometheus."""
+        token = app.config['METRICS_TOKEN']
+        if token and request.headers.get('Authorization') != f"Bearer {token}":
+            return "Não autorizado\n", 401
+        return registo.exportar(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    app.extensions['metricas'] = registo
+    return registo
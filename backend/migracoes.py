@@ -0,0 +1,248 @@
+import time
+import logging
+
+import click
+import mysql.connector
+
+from database import db_connection
+
+logger = logging.getLogger(__name__)
+
+# Servidor ainda a arrancar ou inacessível; erros de SQL não se resolvem a tentar de novo
+ERROS_CONEXAO = (mysql.connector.InterfaceError, mysql.connector.OperationalError, mysql.connector.errors.PoolError)
+
+# Lock nomeado do MySQL: impede que vários processos (workers) apliquem migrações ao mesmo tempo
+NOME_LOCK = 'escola_migracoes'
+
+
+def _indice_existe(cursor, tabela, colunas):
+    """Indica se 'tabela' já tem um índice exatamente sobre 'colunas' (qualquer que seja o nome)."""
+    cursor.execute("""
+        SELECT index_name, column_name
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s
+        ORDER BY index_name, seq_in_index
+    """, (tabela,))
+    indices = {}
+    for nome, coluna in cursor.fetchall():
+        indices.setdefault(nome, []).append(coluna.lower())
+    return [c.lower() for c in colunas] in indices.values()
+
+
+def _criar_indice(cursor, tabela, nome, colunas, tipo='INDEX'):
+    """Cria o índice se ainda não existir um equivalente (tabelas criadas à mão podem já tê-lo)."""
+    if _indice_existe(cursor, tabela, colunas):
+        return
+    logger.info(f"Criando índice {nome} em {tabela}({', '.join(colunas)})")
+    cursor.execute(f"ALTER TABLE {tabela} ADD {tipo} {nome} ({', '.join(colunas)})")
+
+
+def _coluna_existe(cursor, tabela, coluna):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (tabela, coluna))
+    return cursor.fetchone() is not None
+
+
+def _v1_tabelas(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(50) NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            role VARCHAR(20) NOT NULL DEFAULT 'user',
+            token VARCHAR(64) NULL,
+            token_expiry DATETIME NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alunos (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            nome VARCHAR(100) NOT NULL,
+            matricula VARCHAR(20) NOT NULL,
+            curso VARCHAR(100) NOT NULL,
+            email VARCHAR(100) NOT NULL
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def _v2_indices(cursor):
+    # token_required e logout_user filtram por token em cada pedido autenticado
+    _criar_indice(cursor, 'users', 'idx_users_token', ['token'])
+    _criar_indice(cursor, 'users', 'uq_users_username', ['username'], 'UNIQUE INDEX')
+    # Unicidade usada pelo tratamento de IntegrityError e pelas pesquisas por prefixo
+    _criar_indice(cursor, 'alunos', 'uq_alunos_matricula', ['matricula'], 'UNIQUE INDEX')
+    _criar_indice(cursor, 'alunos', 'uq_alunos_email', ['email'], 'UNIQUE INDEX')
+    # Pesquisa textual em /search
+    _criar_indice(cursor, 'alunos', 'ft_alunos_nome_curso', ['nome', 'curso'], 'FULLTEXT INDEX')
+
+
+def _v3_versoes(cursor):
+    # Versão por linha: muda a cada UPDATE e dá origem ao ETag de cada aluno
+    if not _coluna_existe(cursor, 'alunos', 'versao'):
+        cursor.execute("ALTER TABLE alunos ADD COLUMN versao INT UNSIGNED NOT NULL DEFAULT 1")
+    # Versão por tabela: muda a cada escrita e dá origem ao ETag das listagens
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tabela_versoes (
+            tabela VARCHAR(64) PRIMARY KEY,
+            versao BIGINT UNSIGNED NOT NULL DEFAULT 1
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("INSERT IGNORE INTO tabela_versoes (tabela, versao) VALUES ('alunos', 1)")
+
+
+def _v4_tokens_revogados(cursor):
+    # Lista de revogação dos tokens assinados (logout); lida por cada processo ao arrancar
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tokens_revogados (
+            jti CHAR(32) PRIMARY KEY,
+            expira_em DATETIME NOT NULL,
+            revogado_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_tokens_revogados_revogado_em (revogado_em),
+            KEY idx_tokens_revogados_expira_em (expira_em)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+
+
+def _v5_indice_id_nome(cursor):
+    # Índice de cobertura das listagens com ?fields=id,nome (seletores): lidas por ordem
+    # de ID só a partir do índice, sem percorrer as linhas completas da chave primária
+    _criar_indice(cursor, 'alunos', 'idx_alunos_id_nome', ['id', 'nome'])
+
+
+def _v6_sessoes(cursor):
+    # Uma linha por login, indexada pelo SHA-256 do segredo da sessão (auth/sessoes.py):
+    # várias sessões por utilizador, e os logins deixam de escrever na tabela users
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS sessoes (
+            token_hash CHAR(64) PRIMARY KEY,
+            user_id INT NOT NULL,
+            criada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expira_em DATETIME NOT NULL,
+            KEY idx_sessoes_user_id (user_id),
+            KEY idx_sessoes_expira_em (expira_em)
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    if _coluna_existe(cursor, 'users', 'token'):
+        # Os tokens opacos ainda válidos passam para 'sessoes' e são aceites até expirarem
+        cursor.execute("""
+            INSERT IGNORE INTO sessoes (token_hash, user_id, expira_em)
+            SELECT SHA2(token, 256), id, token_expiry FROM users
+            WHERE token IS NOT NULL AND token_expiry > NOW()
+        """)
+    # As colunas users.token e token_expiry ficam: instâncias antigas ainda podem estar
+    # a usá-las durante a atualização. Saem na migração de contração 7
+
+
+def _v7_remover_users_token(cursor):
+    # Contração da 6: só depois de todas as instâncias usarem a tabela 'sessoes'
+    if _coluna_existe(cursor, 'users', 'token'):
+        # O índice idx_users_token sai com a coluna
+        cursor.execute("ALTER TABLE users DROP COLUMN token, DROP COLUMN token_expiry")
+
+
+# Lista ordenada de migrações: (versão, descrição, função que recebe um cursor).
+# Nunca altere uma migração já publicada; acrescente uma nova versão.
+MIGRACOES = [
+    (1, "Cria as tabelas users e alunos", _v1_tabelas),
+    (2, "Índices de token, username, matrícula, email e pesquisa textual", _v2_indices),
+    (3, "Versão por aluno e versão da tabela alunos (ETags)", _v3_versoes),
+    (4, "Lista de revogação de tokens assinados", _v4_tokens_revogados),
+    (5, "Índice de cobertura (id, nome) das listagens com projeção", _v5_indice_id_nome),
+    (6, "Tabela sessoes, substitui users.token", _v6_sessoes),
+]
+
+# Migrações de contração: removem o que uma versão anterior da API ainda usa, por isso
+# nunca correm no arranque. Aplicam-se à mão ('flask db-migrate --contrair') depois
+# de todas as instâncias estarem atualizadas.
+MIGRACOES_CONTRACAO = [
+    (7, "Remove users.token e users.token_expiry (substituídos por sessoes)", _v7_remover_users_token),
+]
+
+
+def aplicar_migracoes(conn, contrair=False):
+    """
+    Aplica as migrações pendentes (e, com 'contrair', as de MIGRACOES_CONTRACAO)
+    e devolve a lista de versões aplicadas agora.
+    """
+    lista = sorted(MIGRACOES + (MIGRACOES_CONTRACAO if contrair else []))
+    aplicadas_agora = []
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT GET_LOCK(%s, 60)", (NOME_LOCK,))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError("Não foi possível obter o lock de migrações")
+        try:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    versao INT PRIMARY KEY,
+                    descricao VARCHAR(255) NOT NULL,
+                    aplicada_em DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """)
+            cursor.execute("SELECT versao FROM schema_migrations")
+            ja_aplicadas = {versao for (versao,) in cursor.fetchall()}
+
+            for versao, descricao, migracao in lista:
+                if versao in ja_aplicadas:
+                    continue
+                logger.info(f"Aplicando migração {versao}: {descricao}")
+                migracao(cursor)
+                cursor.execute(
+                    "INSERT INTO schema_migrations (versao, descricao) VALUES (%s, %s)",
+                    (versao, descricao)
+                )
+                conn.commit()
+                aplicadas_agora.append(versao)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (NOME_LOCK,))
+            cursor.fetchone()
+    return aplicadas_agora
+
+
+def migrar(app, contrair=False):
+    """Aplica as migrações usando uma conexão do pool da aplicação."""
+    conn = None
+    try:
+        with app.app_context():
+            conn = db_connection()
+        versoes = aplicar_migracoes(conn, contrair)
+        if versoes:
+            logger.info(f"Migrações aplicadas: {versoes}")
+        return versoes
+    finally:
+        if conn:
+            conn.close()
+
+
+def migrar_com_tentativas(app, tentativas, espera, espera_maxima=30):
+    """
+    Aplica as migrações, esperando pelo MySQL: no primeiro arranque do Docker Compose
+    o servidor pode ainda estar a inicializar. Depois de 'tentativas' falhas de
+    conexão a exceção segue, e a aplicação não arranca sem o esquema.
+    """
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return migrar(app)
+        except ERROS_CONEXAO as e:
+            if tentativa == tentativas:
+                raise
+            logger.warning(f"Migrações: banco indisponível ({e}); nova tentativa {tentativa + 1}/{tentativas} em {espera:g}s")
+            time.sleep(espera)
+            espera = min(espera * 2, espera_maxima)
+
+
+def init_app(app):
+    """Regista o comando 'flask db-migrate' e, se configurado, migra ao arrancar."""
+    @app.cli.command('db-migrate')
+    @click.option('--contrair', is_flag=True, help="Aplica também as migrações de contração (remoções).")
+    def db_migrate_command(contrair):
+        """Cria/atualiza o esquema do banco de dados."""
+        versoes = migrar(app, contrair)
+        click.echo(f"Migrações aplicadas: {versoes}" if versoes else "Esquema já está atualizado.")
+
+    # Com STORAGE_BACKEND=sqlite o esquema é criado pelo próprio repositório (repositorios/sqlite.py)
+    if app.config['DB_AUTO_MIGRATE'] and app.config['STORAGE_BACKEND'] == 'mysql':
+        # Sem as tabelas das migrações (ex.: sessoes) quase todas as rotas falhariam:
+        # é preferível não arrancar e deixar o orquestrador reiniciar o serviço
+        migrar_com_tentativas(app, app.config['DB_MIGRATE_RETRIES'], app.config['DB_MIGRATE_RETRY_DELAY'])
@@ -0,0 +1,257 @@
+import time
+import logging
+import threading
+import itertools
+from collections import OrderedDict
+
+from flask import current_app, request, g, has_request_context
+
+from database import ConnectionPool, argumentos_conexao
+from metricas import registo
+
+logger = logging.getLogger(__name__)
+
+# Métodos cujas leituras podem ir a uma réplica; os restantes usam sempre o primário
+METODOS_LEITURA = ('GET', 'HEAD')
+# Definido nas respostas aos pedidos que alteraram dados (ver marcar_escrita): durante a janela, as leituras deste cliente vão ao
+# primário em qualquer worker (o registo em memória só vale para o processo que escreveu)
+COOKIE_PRIMARIO = 'escola_primario'
+# Utilizadores com escritas recentes guardados por processo (os mais antigos saem primeiro)
+MAX_ESCRITAS_RECENTES = 10000
+
+
+class Replica:
+    """Uma réplica de leitura: o seu pool e o resultado da última verificação."""
+
+    def __init__(self, nome, pool):
+        self.nome = nome
+        self.pool = pool
+        self.disponivel = False
+        self.atraso = None  # Segundos atrás do primário, na última verificação
+        self.verificada_em = None  # time.monotonic() da última verificação
+
+
+class RoteadorLeituras:
+    """
+    Escolhe o pool de cada leitura: uma réplica saudável nos pedidos GET/HEAD,
+    o primário nas escritas, fora de pedidos (threads de fundo) e nas leituras de
+    um utilizador nos 'janela_escrita' segundos seguintes a uma escrita sua.
+
+    Cada réplica é verificada no máximo a cada 'intervalo' segundos, numa thread
+    lançada pelo pedido que a encontra desatualizada: nenhum pedido espera pela
+    réplica, todos usam o último resultado (uma réplica ainda não verificada fica
+    fora da rotação). Uma réplica inacessível, sem replicação ativa ou mais de
+    'atraso_maximo' segundos atrás do primário fica fora da rotação até à
+    verificação seguinte; sem réplicas disponíveis, as leituras vão ao primário.
+    """
+
+    def __init__(self, primario, replicas, atraso_maximo=5, intervalo=5, janela_escrita=5):
+        self.primario = primario
+        self.replicas = replicas
+        self.atraso_maximo = atraso_maximo
+        self.intervalo = intervalo
+        self.janela_escrita = janela_escrita
+        self._lock = threading.Lock()
+        self._proxima = itertools.count()
+        self._escritas = OrderedDict()  # user_id -> time.monotonic() da última escrita
+
+    def _reservar_verificacao(self, replica):
+        """Indica se esta thread deve verificar a réplica (apenas uma o faz por intervalo)."""
+        with self._lock:
+            agora = time.monotonic()
+            if replica.verificada_em is not None and agora - replica.verificada_em < self.intervalo:
+                return False
+            replica.verificada_em = agora
+            return True
+
+    def _ler_atraso(self, replica):
+        """Segundos de atraso da réplica (SHOW REPLICA STATUS), ou None se a replicação estiver parada."""
+        conn = replica.pool.get_connection()
+        try:
+            with conn.cursor(dictionary=True) as cursor:
+                cursor.execute("SHOW REPLICA STATUS")
+                estado = cursor.fetchone()
+        finally:
+            conn.close()
+        if estado is None:
+            raise RuntimeError("o servidor não está configurado como réplica")
+        return estado.get('Seconds_Behind_Source')
+
+    def verificar(self, replica):
+        anterior = replica.disponivel
+        try:
+            replica.atraso = self._ler_atraso(replica)
+            replica.disponivel = replica.atraso is not None and replica.atraso <= self.atraso_maximo
+            motivo = ("replicação parada" if replica.atraso is None
+                      else f"{replica.atraso}s de atraso (máximo {self.atraso_maximo}s)")
+        except Exception as e:
+            replica.atraso = None
+            replica.disponivel = False
+            motivo = str(e)
+        if replica.disponivel != anterior:
+            if replica.disponivel:
+                logger.info(f"Réplica {replica.nome} disponível para leituras ({replica.atraso}s de atraso)")
+            else:
+                logger.warning(f"Réplica {replica.nome} fora da rotação: {motivo}")
+
+    def _verificar_em_fundo(self, replica):
+        threading.Thread(
+            target=self.verificar, args=(replica,), name=f'verificacao-{replica.nome}', daemon=True
+        ).start()
+
+    def marcar_indisponivel(self, replica, erro):
+        """Tira a réplica da rotação até à próxima verificação (ex.: falhou ao abrir uma conexão)."""
+        with self._lock:
+            replica.verificada_em = time.monotonic()
+        if replica.disponivel:
+            logger.warning(f"Réplica {replica.nome} fora da rotação: {erro}")
+        replica.disponivel = False
+
+    def replica_disponivel(self):
+        """
+        Próxima réplica saudável (rotação circular), ou None se nenhuma servir.
+        As desatualizadas são verificadas em fundo, para os pedidos seguintes.
+        """
+        inicio = next(self._proxima)
+        for deslocamento in range(len(self.replicas)):
+            replica = self.replicas[(inicio + deslocamento) % len(self.replicas)]
+            if self._reservar_verificacao(replica):
+                self._verificar_em_fundo(replica)
+            if replica.disponivel:
+                return replica
+        return None
+
+    def registar_escrita(self, user_id):
+        with self._lock:
+            self._escritas[user_id] = time.monotonic()
+            self._escritas.move_to_end(user_id)
+            while len(self._escritas) > MAX_ESCRITAS_RECENTES:
+                self._escritas.popitem(last=False)
+
+    def _escreveu_recentemente(self, user_id):
+        with self._lock:
+            ultima = self._escritas.get(user_id)
+        return ultima is not None and time.monotonic() - ultima < self.janela_escrita
+
+    def replica_para_leitura(self):
+        """
+        Réplica que deve servir uma leitura do pedido atual, ou None para usar o primário.
+        A escolha é feita uma vez por pedido: todas as leituras do mesmo pedido (ex.: a
+        versão da tabela do ETag e as linhas) vêm do mesmo servidor.
+        """
+        if not has_request_context() or request.method not in METODOS_LEITURA:
+            return None
+        if 'replica_leitura' not in g:
+            g.replica_leitura = self._escolher()
+        replica = g.replica_leitura
+        # Se a réplica falhou a meio do pedido, as leituras seguintes vão ao primário
+        return replica if replica is not None and replica.disponivel else None
+
+    def fixado_no_primario(self):
+        """Se o cliente do pedido atual escreveu há pouco (cookie ou registo deste processo)."""
+        user_id = getattr(request, 'user_id', None)
+        return bool(request.cookies.get(COOKIE_PRIMARIO)) or (
+            user_id is not None and self._escreveu_recentemente(user_id)
+        )
+
+    def _escolher(self):
+        if self.fixado_no_primario():
+            registo.incrementar('db_leituras_total', destino='primario', motivo='escrita_recente')
+            return None
+        replica = self.replica_disponivel()
+        if replica is None:
+            registo.incrementar('db_leituras_total', destino='primario', motivo='sem_replica')
+            return None
+        registo.incrementar('db_leituras_total', destino='replica', motivo='get')
+        return replica
+
+    def estatisticas(self):
+        return [
+            {'replica': replica.nome, 'disponivel': replica.disponivel, 'atraso_segundos': replica.atraso}
+            for replica in self.replicas
+        ]
+
+    def close_all(self):
+        for replica in self.replicas:
+            replica.pool.close_all()
+
+
+def _host_porta(texto):
+    host, _, porta = texto.strip().partition(':')
+    return host, int(porta) if porta else None
+
+
+def init_app(app):
+    """
+    Cria os pools das réplicas de DB_REPLICA_HOSTS e o roteador de leituras usado por
+    repositorios/mysql.py (deve correr depois de database.init_app). Sem réplicas
+    configuradas, app.extensions['db_replicas'] fica None e tudo vai ao primário.
+    """
+    hosts = [host for host in app.config['DB_REPLICA_HOSTS'] if host]
+    if not hosts or app.config['STORAGE_BACKEND'] != 'mysql':
+        app.extensions['db_replicas'] = None
+        return None
+
+    replicas = []
+    for texto in hosts:
+        host, porta = _host_porta(texto)
+        connect_args = argumentos_conexao(app.config, host=host, porta=porta)
+        # Uma réplica inacessível falha depressa em vez de esperar pelo timeout TCP do sistema
+        connect_args['connection_timeout'] = app.config['DB_REPLICA_CONNECT_TIMEOUT']
+        pool = ConnectionPool(
+            connect_args,
+            size=app.config['DB_REPLICA_POOL_SIZE'],
+            timeout=app.config['DB_POOL_TIMEOUT'],
+            max_lifetime=app.config['DB_POOL_MAX_LIFETIME'],
+            ping_interval=app.config['DB_POOL_PING_INTERVAL'],
+        )
+        replicas.append(Replica(texto.strip(), pool))
+
+    roteador = RoteadorLeituras(
+        app.extensions['db_pool'],
+        replicas,
+        atraso_maximo=app.config['DB_REPLICA_MAX_LAG'],
+        intervalo=app.config['DB_REPLICA_CHECK_INTERVAL'],
+        janela_escrita=app.config['DB_PRIMARY_AFTER_WRITE'],
+    )
+
+    @app.after_request
+    def lembrar_escrita(resposta):
+        # O pedido alterou dados: as próximas leituras deste cliente vão ao primário
+        # (não basta ser um POST: o login e o /lookup não escrevem nos alunos)
+        if g.get('escrita_confirmada'):
+            user_id = getattr(request, 'user_id', None)
+            if user_id is not None:
+                roteador.registar_escrita(user_id)
+            resposta.set_cookie(
+                COOKIE_PRIMARIO, '1', max_age=max(int(roteador.janela_escrita), 1),
+                httponly=True, samesite='Lax'
+            )
+        return resposta
+
+    app.extensions['db_replicas'] = roteador
+    logger.info(f"Leituras GET distribuídas por {len(replicas)} réplica(s): {', '.join(hosts)}")
+    return roteador
+
+
+def marcar_escrita():
+    """
+    Chamado pelas rotas depois de confirmarem uma escrita nos dados: fixa no primário
+    as leituras seguintes do cliente (cookie COOKIE_PRIMARIO e registo do processo).
+    """
+    if has_request_context():
+        g.escrita_confirmada = True
+
+
+def get_roteador():
+    return current_app.extensions['db_replicas']
+
+
+def leitura_fixada_no_primario():
+    """
+    Se as leituras do pedido atual estão fixadas no primário por uma escrita recente.
+    Estes pedidos também ignoram o cache de respostas, que pode ter sido preenchido
+    a partir de uma réplica ainda sem a escrita. Sem réplicas, nada é fixado.
+    """
+    roteador = current_app.extensions.get('db_replicas')
+    return roteador is not None and roteador.fixado_no_primario()
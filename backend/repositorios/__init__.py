@@ -0,0 +1,41 @@
+"""
+Camada de acesso a dados: as rotas usam AlunoRepository e UserRepository em vez
+de escreverem SQL. O motor é escolhido por STORAGE_BACKEND em create_app():
+'mysql' (pool partilhado de database.py) ou 'sqlite' (ficheiro ou ':memory:'),
+útil para testes de integração e benchmarks sem um servidor MySQL.
+"""
+from flask import current_app
+
+from repositorios.base import AlunoRepository, UserRepository, ErroArmazenamento, Duplicado
+from repositorios.mysql import BancoMySQL, AlunoRepositoryMySQL, UserRepositoryMySQL
+from repositorios.sqlite import BancoSQLite, AlunoRepositorySQLite, UserRepositorySQLite
+
+BACKENDS = ('mysql', 'sqlite')
+
+
+def init_app(app):
+    """Cria os repositórios do motor configurado (deve correr depois de database.init_app e replicas.init_app)."""
+    backend = app.config['STORAGE_BACKEND']
+    if backend == 'mysql':
+        # Com réplicas configuradas (replicas.init_app), as leituras dos pedidos GET podem ir a uma delas
+        banco = BancoMySQL(app.extensions['db_pool'], roteador=app.extensions.get('db_replicas'))
+        alunos, users = AlunoRepositoryMySQL(banco), UserRepositoryMySQL(banco)
+    elif backend == 'sqlite':
+        banco = BancoSQLite(app.config['SQLITE_PATH'], timeout=app.config['DB_POOL_TIMEOUT'])
+        # O esquema do SQLite é criado aqui; as migrações de migracoes.py são só para o MySQL
+        banco.criar_esquema()
+        alunos, users = AlunoRepositorySQLite(banco), UserRepositorySQLite(banco)
+    else:
+        raise ValueError(f"STORAGE_BACKEND deve ser um de: {', '.join(BACKENDS)}")
+
+    app.extensions['repo_alunos'] = alunos
+    app.extensions['repo_users'] = users
+    return alunos, users
+
+
+def get_repo_alunos():
+    return current_app.extensions['repo_alunos']
+
+
+def get_repo_users():
+    return current_app.extensions['repo_users']
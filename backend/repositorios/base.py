@@ -0,0 +1,288 @@
+import logging
+from abc import ABC, abstractmethod
+from datetime import datetime
+from contextlib import contextmanager
+
+from routes.comum import (
+    SQL_INSERIR_ALUNO, SQL_CONTAR_ALUNOS, SQL_VERSAO_TABELA, SQL_INCREMENTAR_VERSAO_TABELA,
+    SQL_VERSAO_ALUNO, CAMPOS_ALUNO, sql_obter_aluno, sql_listar_apos_id, sql_listar_pagina, sql_obter_varios,
+    montar_atualizacao, montar_exclusao
+)
+from auth.sessoes import SQL_CRIAR_SESSAO, SQL_OBTER_SESSAO, SQL_TERMINAR_SESSAO
+
+logger = logging.getLogger(__name__)
+
+
+class ErroArmazenamento(Exception):
+    """Falha do banco de dados (conexão, SQL, pool esgotado), qualquer que seja o motor."""
+
+
+class Duplicado(ErroArmazenamento):
+    """Violação de unicidade: matrícula, email ou username já existentes."""
+
+
+@contextmanager
+def traduzir_erros(erro_integridade, erro_base):
+    """Converte as exceções do conector do motor em Duplicado/ErroArmazenamento."""
+    try:
+        yield
+    except erro_integridade as e:
+        raise Duplicado(str(e)) from e
+    except erro_base as e:
+        raise ErroArmazenamento(str(e)) from e
+
+
+class CursorRepositorio:
+    """
+    Cursor usado pelos repositórios: aceita sempre o marcador '%s' (o do MySQL),
+    convertendo-o para o do motor, e levanta apenas os erros deste módulo.
+    """
+
+    def __init__(self, raw, erro_integridade, erro_base, marcador='%s'):
+        self._raw = raw
+        self._erros = (erro_integridade, erro_base)
+        self._marcador = marcador
+
+    def __getattr__(self, name):
+        # rowcount, lastrowid, fetchone(), fetchall() etc. vêm do cursor real
+        return getattr(self._raw, name)
+
+    def _sql(self, query):
+        return query if self._marcador == '%s' else query.replace('%s', self._marcador)
+
+    def execute(self, query, params=()):
+        with traduzir_erros(*self._erros):
+            return self._raw.execute(self._sql(query), params)
+
+    def executemany(self, query, seq_params):
+        with traduzir_erros(*self._erros):
+            return self._raw.executemany(self._sql(query), seq_params)
+
+    def fetchone(self):
+        with traduzir_erros(*self._erros):
+            return self._raw.fetchone()
+
+    def fetchall(self):
+        with traduzir_erros(*self._erros):
+            return self._raw.fetchall()
+
+    def fetchmany(self, tamanho):
+        with traduzir_erros(*self._erros):
+            return self._raw.fetchmany(tamanho)
+
+
+class AlunoRepository(ABC):
+    """
+    Acesso à tabela 'alunos' usado pelas rotas. 'banco' fornece transacao(), um
+    context manager que empresta um CursorRepositorio (linhas como dicionários),
+    faz commit no fim do bloco e desfaz a transação se o bloco levantar uma exceção;
+    transacao(dictionary=False) devolve as linhas como tuplos. As consultas que só
+    leem usam leitura(), com a mesma interface, que o motor pode servir a partir de
+    uma réplica (ver replicas.py); as escritas usam sempre transacao(). Dentro de
+    instantaneo(), as chamadas a leitura() partilham uma conexão e um snapshot.
+    As consultas comuns aos dois motores estão aqui; as subclasses em
+    repositorios/mysql.py e repositorios/sqlite.py implementam as restantes.
+    """
+
+    def __init__(self, banco):
+        self.banco = banco
+
+    def instantaneo(self):
+        """Context manager: as leituras do bloco veem todas o mesmo estado da tabela."""
+        return self.banco.instantaneo()
+
+    def versao_tabela(self):
+        """Versão atual da tabela alunos (incrementada a cada escrita), usada no ETag das listagens."""
+        with self.banco.leitura() as cursor:
+            cursor.execute(SQL_VERSAO_TABELA)
+            linha = cursor.fetchone()
+        return linha['versao'] if linha else 0
+
+    def contar(self):
+        with self.banco.leitura() as cursor:
+            cursor.execute(SQL_CONTAR_ALUNOS)
+            return cursor.fetchone()['total']
+
+    def listar_apos_id(self, after_id, limite, campos=CAMPOS_ALUNO, tabular=False):
+        """
+        Paginação keyset: procura diretamente pela chave primária. 'campos' é a
+        projeção (?fields=); com 'tabular' as linhas são tuplos por essa ordem.
+        """
+        with self.banco.leitura(dictionary=not tabular) as cursor:
+            cursor.execute(sql_listar_apos_id(campos), (after_id, limite))
+            return cursor.fetchall()
+
+    def listar_pagina(self, limite, offset, campos=CAMPOS_ALUNO, tabular=False):
+        with self.banco.leitura(dictionary=not tabular) as cursor:
+            cursor.execute(sql_listar_pagina(campos), (limite, offset))
+            return cursor.fetchall()
+
+    @abstractmethod
+    def buscar(self, q, limite, posicao=None):
+        """
+        Pesquisa por relevância (ver consulta_busca em routes/comum.py); devolve até
+        limite + 1 linhas com a coluna 'relevancia', ordenadas por (relevancia DESC, id).
+        """
+
+    def obter(self, aluno_id, campos=CAMPOS_ALUNO):
+        """Devolve o aluno com os 'campos' pedidos (mais a coluna 'versao') ou None."""
+        with self.banco.leitura() as cursor:
+            cursor.execute(sql_obter_aluno(campos), (aluno_id,))
+            return cursor.fetchone()
+
+    def obter_varios(self, coluna, chaves, campos=CAMPOS_ALUNO, tabular=False):
+        """Lê numa única consulta os alunos cujo 'coluna' (id ou matricula) está em 'chaves', sem ordem definida."""
+        with self.banco.leitura(dictionary=not tabular) as cursor:
+            cursor.execute(sql_obter_varios(coluna, len(chaves), campos), chaves)
+            return cursor.fetchall()
+
+    def versao(self, aluno_id):
+        """Lê apenas a versão da linha (revalidação de ETag), ou None se o aluno não existir."""
+        with self.banco.leitura() as cursor:
+            cursor.execute(SQL_VERSAO_ALUNO, (aluno_id,))
+            linha = cursor.fetchone()
+        return linha['versao'] if linha else None
+
+    def inserir(self, valores):
+        """Insere um aluno (tuplo de valores_aluno) e devolve o ID; levanta Duplicado."""
+        with self.banco.transacao() as cursor:
+            cursor.execute(SQL_INSERIR_ALUNO, valores)
+            aluno_id = cursor.lastrowid
+            cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+        return aluno_id
+
+    def inserir_lote(self, lote, erros):
+        """
+        Insere um lote de (numero_linha, valores) numa única transação.
+        Se o lote tiver matrícula ou email duplicados, repete-o linha a linha para
+        identificar os registos rejeitados (acrescentados a 'erros') sem perder os
+        restantes. Devolve o número de alunos inseridos.
+        """
+        try:
+            with self.banco.transacao() as cursor:
+                cursor.executemany(SQL_INSERIR_ALUNO, [valores for _, valores in lote])
+                cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+            return len(lote)
+        except Duplicado:
+            pass
+
+        inseridos = 0
+        with self.banco.transacao() as cursor:
+            for numero, valores in lote:
+                try:
+                    cursor.execute(SQL_INSERIR_ALUNO, valores)
+                    inseridos += 1
+                except Duplicado as e:
+                    logger.warning(f"Linha {numero} rejeitada na importação: {e}")
+                    erros.append({'linha': numero, 'erro': "Matrícula ou email já cadastrados"})
+            if inseridos:
+                cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+        return inseridos
+
+    def atualizar(self, aluno_id, data, versao=None):
+        """
+        Altera apenas as colunas enviadas num único UPDATE (ver montar_atualizacao).
+        Devolve True se o aluno foi alterado, False se existe mas a versão não é
+        'versao' (If-Match) e None se não existe.
+        """
+        query, valores = montar_atualizacao(aluno_id, data, versao)
+        return self._escrita_condicional(aluno_id, query, valores, versao)
+
+    def excluir(self, aluno_id, versao=None):
+        """Remove o aluno num único DELETE; mesmo resultado que atualizar()."""
+        query, valores = montar_exclusao(aluno_id, versao)
+        return self._escrita_condicional(aluno_id, query, valores, versao)
+
+    def _escrita_condicional(self, aluno_id, query, valores, versao):
+        with self.banco.transacao() as cursor:
+            cursor.execute(query, valores)
+            if cursor.rowcount == 0:
+                # Só no caminho de erro: distingue aluno inexistente de conflito de versão
+                if versao is None:
+                    return None
+                cursor.execute(SQL_VERSAO_ALUNO, (aluno_id,))
+                return False if cursor.fetchone() else None
+            cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+            return True
+
+    def iterar_alunos(self, tamanho_bloco):
+        """
+        Gera todos os alunos por ordem de ID, em listas de tuplos (CAMPOS_ALUNO)
+        com até 'tamanho_bloco' linhas. Cada bloco é uma consulta keyset separada,
+        por isso nenhuma conexão fica presa durante toda a exportação.
+        """
+        ultimo_id = 0
+        while True:
+            linhas = self.listar_apos_id(ultimo_id, tamanho_bloco)
+            if not linhas:
+                return
+            yield [tuple(linha[coluna] for coluna in CAMPOS_ALUNO) for linha in linhas]
+            ultimo_id = linhas[-1]['id']
+
+
+class UserRepository(ABC):
+    """Acesso às tabelas 'users' e 'sessoes' e à lista de tokens revogados (ver AlunoRepository)."""
+
+    # Tabelas limpas por auth/sessoes.py: nome -> chave primária (todas têm a coluna expira_em)
+    TABELAS_EXPIRAVEIS = {'sessoes': 'token_hash', 'tokens_revogados': 'jti'}
+
+    def __init__(self, banco):
+        self.banco = banco
+
+    def criar(self, username, password_hash, role):
+        """Regista um utilizador; levanta Duplicado se o username já existir."""
+        with self.banco.transacao() as cursor:
+            cursor.execute(
+                "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
+                (username, password_hash, role)
+            )
+            return cursor.lastrowid
+
+    def obter_por_username(self, username):
+        with self.banco.leitura() as cursor:
+            cursor.execute("SELECT id, username, password_hash, role FROM users WHERE username = %s", (username,))
+            return cursor.fetchone()
+
+    def obter_por_id(self, user_id):
+        with self.banco.leitura() as cursor:
+            cursor.execute("SELECT id, username, role FROM users WHERE id = %s", (user_id,))
+            return cursor.fetchone()
+
+    def atualizar_hash(self, user_id, password_hash):
+        with self.banco.transacao() as cursor:
+            cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (password_hash, user_id))
+
+    # Sessões (auth/sessoes.py): uma linha por login, indexada pelo hash do segredo
+
+    def criar_sessao(self, token_hash, user_id, expira_em):
+        with self.banco.transacao() as cursor:
+            cursor.execute(SQL_CRIAR_SESSAO, (token_hash, user_id, datetime.now(), expira_em))
+
+    def obter_sessao(self, token_hash):
+        """Utilizador da sessão (id, username, role, token_expiry), ou None se a sessão não existir."""
+        with self.banco.leitura() as cursor:
+            cursor.execute(SQL_OBTER_SESSAO, (token_hash,))
+            return cursor.fetchone()
+
+    def terminar_sessao(self, token_hash):
+        """Apaga a sessão; devolve False se já não existia."""
+        with self.banco.transacao() as cursor:
+            cursor.execute(SQL_TERMINAR_SESSAO, (token_hash,))
+            return cursor.rowcount > 0
+
+    @abstractmethod
+    def apagar_expirados(self, tabela, lote):
+        """Apaga até 'lote' linhas expiradas de uma das TABELAS_EXPIRAVEIS; devolve quantas apagou."""
+
+    # Lista de revogação dos tokens assinados (auth/revogacao.py)
+
+    @abstractmethod
+    def ler_revogacoes(self, desde=None):
+        """
+        Devolve (agora, [(jti, expira_em), ...]) com a hora do banco: todos os tokens
+        revogados ainda válidos se 'desde' for None, senão os revogados desde 'desde'.
+        """
+
+    @abstractmethod
+    def revogar_token(self, jti, expira_em):
+        """Regista a revogação (ignorada se o jti já estiver revogado)."""
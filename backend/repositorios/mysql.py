@@ -0,0 +1,144 @@
+import threading
+from contextlib import contextmanager
+
+import mysql.connector
+
+from routes.comum import consulta_busca
+from auth.revogacao import SQL_REVOGADOS_ATIVOS, SQL_REVOGADOS_DESDE, SQL_REVOGAR
+from repositorios.base import (
+    AlunoRepository, UserRepository, CursorRepositorio, CAMPOS_ALUNO, traduzir_erros
+)
+
+ERROS_MYSQL = (mysql.connector.IntegrityError, mysql.connector.Error)
+
+
+class BancoMySQL:
+    """
+    Transações sobre as conexões do pool partilhado (database.ConnectionPool).
+    Com um roteador (replicas.RoteadorLeituras), leitura() pode usar uma réplica.
+
+    As conexões estão em autocommit: uma leitura avulsa é só o SELECT, sem COMMIT;
+    transacao() abre uma transação explícita, confirmada no fim do bloco, e
+    instantaneo() junta várias leituras numa só conexão e num só snapshot.
+    """
+
+    def __init__(self, pool, roteador=None):
+        self.pool = pool
+        self.roteador = roteador
+        self._local = threading.local()  # Conexão do instantaneo() em curso nesta thread
+
+    def transacao(self, **opcoes_cursor):
+        """Transação no primário: escritas e leituras que têm de ver o estado mais recente."""
+        return self._transacao(self.pool.get_connection, **opcoes_cursor)
+
+    def leitura(self, **opcoes_cursor):
+        """Leitura sem transação: numa réplica, se o roteador a escolher para o pedido atual."""
+        conn = getattr(self._local, 'conexao', None)
+        if conn is not None:
+            return self._cursor(conn, **opcoes_cursor)
+        return self._transacao(self._conectar_leitura, somente_leitura=True, **opcoes_cursor)
+
+    @contextmanager
+    def instantaneo(self):
+        """
+        As leituras feitas dentro do bloco (leitura()) usam a mesma conexão e o mesmo
+        snapshot: ex.: a versão da tabela do ETag e as linhas que ele identifica.
+        """
+        with traduzir_erros(*ERROS_MYSQL):
+            conn = self._conectar_leitura()
+        try:
+            with traduzir_erros(*ERROS_MYSQL):
+                conn.start_transaction(consistent_snapshot=True, readonly=True)
+            self._local.conexao = conn
+            try:
+                yield
+            finally:
+                self._local.conexao = None
+            with traduzir_erros(*ERROS_MYSQL):
+                conn.commit()
+        finally:
+            conn.close()
+
+    def _conectar_leitura(self):
+        replica = self.roteador.replica_para_leitura() if self.roteador else None
+        if replica is None:
+            return self.pool.get_connection()
+        try:
+            return replica.pool.get_connection()
+        except mysql.connector.Error as e:
+            # Réplica caiu desde a última verificação: esta leitura vai ao primário
+            self.roteador.marcar_indisponivel(replica, e)
+            return self.pool.get_connection()
+
+    @contextmanager
+    def _cursor(self, conn, **opcoes_cursor):
+        opcoes_cursor.setdefault('dictionary', True)
+        with conn.cursor(**opcoes_cursor) as raw:
+            yield CursorRepositorio(raw, *ERROS_MYSQL)
+
+    @contextmanager
+    def _transacao(self, conectar, somente_leitura=False, **opcoes_cursor):
+        with traduzir_erros(*ERROS_MYSQL):
+            conn = conectar()
+        try:
+            if not somente_leitura:
+                with traduzir_erros(*ERROS_MYSQL):
+                    conn.start_transaction()
+            with self._cursor(conn, **opcoes_cursor) as cursor:
+                yield cursor
+            if not somente_leitura:
+                with traduzir_erros(*ERROS_MYSQL):
+                    conn.commit()
+        finally:
+            # Devolve a conexão ao pool, que desfaz a transação se o bloco falhou
+            conn.close()
+
+
+class AlunoRepositoryMySQL(AlunoRepository):
+
+    def buscar(self, q, limite, posicao=None):
+        query, params = consulta_busca(q, limite, posicao)
+        with self.banco.leitura() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    def iterar_alunos(self, tamanho_bloco):
+        # Cursor não-bufferizado: as linhas são lidas do servidor à medida que são consumidas
+        with self.banco.transacao(dictionary=False, buffered=False) as cursor:
+            cursor.execute(f"SELECT {', '.join(CAMPOS_ALUNO)} FROM alunos ORDER BY id")
+            while True:
+                linhas = cursor.fetchmany(tamanho_bloco)
+                if not linhas:
+                    return
+                yield linhas
+
+
+class UserRepositoryMySQL(UserRepository):
+
+    def ler_revogacoes(self, desde=None):
+        with self.banco.transacao() as cursor:
+            cursor.execute("SELECT NOW() AS agora")
+            agora = cursor.fetchone()['agora']
+            if desde is None:
+                cursor.execute(SQL_REVOGADOS_ATIVOS)
+            else:
+                cursor.execute(SQL_REVOGADOS_DESDE, (desde,))
+            linhas = [(linha['jti'], linha['expira_em']) for linha in cursor.fetchall()]
+        return agora, linhas
+
+    def revogar_token(self, jti, expira_em):
+        with self.banco.transacao() as cursor:
+            cursor.execute(SQL_REVOGAR, (jti, expira_em))
+
+    def apagar_expirados(self, tabela, lote):
+        chave = self.TABELAS_EXPIRAVEIS[tabela]
+        with self.banco.transacao(dictionary=False) as cursor:
+            # SKIP LOCKED: outro processo a limpar ao mesmo tempo fica com outras linhas, sem esperas
+            cursor.execute(
+                f"SELECT {chave} FROM {tabela} WHERE expira_em < NOW() ORDER BY expira_em LIMIT %s FOR UPDATE SKIP LOCKED",
+                (lote,)
+            )
+            chaves = [linha[0] for linha in cursor.fetchall()]
+            if chaves:
+                cursor.execute(f"DELETE FROM {tabela} WHERE {chave} IN ({', '.join(['%s'] * len(chaves))})", chaves)
+        return len(chaves)
@@ -0,0 +1,224 @@
+import os
+import re
+import sqlite3
+import weakref
+import threading
+from datetime import datetime
+from contextlib import contextmanager, nullcontext
+
+from database import CursorMedido
+from routes.comum import escapar_like, PESO_MATRICULA, PESO_EMAIL
+from repositorios.base import AlunoRepository, UserRepository, CursorRepositorio, traduzir_erros
+
+ERROS_SQLITE = (sqlite3.IntegrityError, sqlite3.Error)
+
+# Mesmo esquema que migracoes.py (versão 6), no dialeto do SQLite
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password_hash TEXT NOT NULL,
+        role TEXT NOT NULL DEFAULT 'user'
+    );
+
+    CREATE TABLE IF NOT EXISTS alunos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT NOT NULL,
+        matricula TEXT NOT NULL UNIQUE,
+        curso TEXT NOT NULL,
+        email TEXT NOT NULL UNIQUE,
+        versao INTEGER NOT NULL DEFAULT 1
+    );
+    -- Cobre as listagens com ?fields=id,nome (migração 5 do MySQL)
+    CREATE INDEX IF NOT EXISTS idx_alunos_id_nome ON alunos (id, nome);
+
+    CREATE TABLE IF NOT EXISTS tabela_versoes (
+        tabela TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 1
+    );
+    INSERT OR IGNORE INTO tabela_versoes (tabela, versao) VALUES ('alunos', 1);
+
+    CREATE TABLE IF NOT EXISTS tokens_revogados (
+        jti TEXT PRIMARY KEY,
+        expira_em TIMESTAMP NOT NULL,
+        revogado_em TIMESTAMP NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_tokens_revogados_revogado_em ON tokens_revogados (revogado_em);
+    CREATE INDEX IF NOT EXISTS idx_tokens_revogados_expira_em ON tokens_revogados (expira_em);
+
+    CREATE TABLE IF NOT EXISTS sessoes (
+        token_hash TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        criada_em TIMESTAMP NOT NULL,
+        expira_em TIMESTAMP NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_sessoes_user_id ON sessoes (user_id);
+    CREATE INDEX IF NOT EXISTS idx_sessoes_expira_em ON sessoes (expira_em);
+"""
+
+
+def _linha_dict(cursor, linha):
+    return {coluna[0]: valor for coluna, valor in zip(cursor.description, linha)}
+
+
+class BancoSQLite:
+    """
+    Banco SQLite embutido, num ficheiro ou em memória (':memory:').
+
+    Com um ficheiro, cada thread usa a sua própria conexão (modo WAL: as leituras
+    não esperam pelas escritas). Em memória existe uma única conexão, partilhada e
+    protegida por um lock, e os dados pertencem a um só processo: serve para
+    testes e benchmarks, não para vários workers do gunicorn.
+    """
+
+    def __init__(self, caminho, timeout=5):
+        self.caminho = caminho
+        self.timeout = timeout
+        self.memoria = caminho == ':memory:'
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self._partilhada = self._abrir() if self.memoria else None
+
+        # As conexões não podem ser usadas no processo filho: cada worker abre as suas
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() and ref()._apos_fork())
+
+    def _apos_fork(self):
+        self._local = threading.local()
+        self._lock = threading.RLock()
+
+    def _abrir(self):
+        conn = sqlite3.connect(
+            self.caminho,
+            timeout=self.timeout,   # Espera por escritas de outras conexões em vez de falhar logo
+            detect_types=sqlite3.PARSE_DECLTYPES,   # Colunas TIMESTAMP voltam como datetime
+            check_same_thread=False,
+        )
+        conn.row_factory = _linha_dict
+        if not self.memoria:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conexao(self):
+        if self.memoria:
+            return self._partilhada
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = self._abrir()
+        return conn
+
+    @contextmanager
+    def transacao(self, dictionary=True):
+        with self._lock if self.memoria else nullcontext():
+            with traduzir_erros(*ERROS_SQLITE):
+                conn = self._conexao()
+            raw = conn.cursor()
+            if not dictionary:
+                # Tuplos, como o cursor do MySQL com dictionary=False
+                raw.row_factory = None
+            # Dentro de instantaneo(), quem termina a transação é o próprio instantaneo()
+            aninhada = getattr(self._local, 'instantaneo', False)
+            try:
+                yield CursorRepositorio(CursorMedido(raw), *ERROS_SQLITE, marcador='?')
+                if not aninhada:
+                    with traduzir_erros(*ERROS_SQLITE):
+                        conn.commit()
+            except BaseException:
+                if not aninhada:
+                    conn.rollback()
+                raise
+            finally:
+                raw.close()
+
+    # Um único ficheiro: as leituras usam as mesmas conexões que as escritas
+    leitura = transacao
+
+    @contextmanager
+    def instantaneo(self):
+        """Leituras do bloco numa só transação, como BancoMySQL.instantaneo()."""
+        with self._lock if self.memoria else nullcontext():
+            with traduzir_erros(*ERROS_SQLITE):
+                conn = self._conexao()
+                conn.execute("BEGIN")
+            self._local.instantaneo = True
+            try:
+                yield
+            finally:
+                self._local.instantaneo = False
+                # Só leituras: não há nada a confirmar
+                conn.rollback()
+
+    def criar_esquema(self):
+        with self._lock, traduzir_erros(*ERROS_SQLITE):
+            self._conexao().executescript(ESQUEMA)
+
+
+class AlunoRepositorySQLite(AlunoRepository):
+
+    def buscar(self, q, limite, posicao=None):
+        """
+        Sem índice FULLTEXT: cada palavra conta um ponto por cada coluna (nome,
+        curso) em que aparece no início de uma palavra, e a matrícula e o email
+        somam os mesmos pesos que na consulta MySQL. Percorre a tabela inteira.
+        """
+        termos = []
+        params = []
+        for palavra in re.findall(r'\w+', q, flags=re.UNICODE):
+            padrao = escapar_like(palavra)
+            for coluna in ('nome', 'curso'):
+                termos.append(f"({coluna} LIKE %s ESCAPE '\\' OR {coluna} LIKE %s ESCAPE '\\')")
+                params += [padrao + '%', '% ' + padrao + '%']
+        if q.isdigit():
+            termos.append(f"(matricula LIKE %s ESCAPE '\\') * {PESO_MATRICULA}")
+            params.append(escapar_like(q) + '%')
+        termos.append(f"(email LIKE %s ESCAPE '\\') * {PESO_EMAIL}")
+        params.append(escapar_like(q.lower()) + '%')
+
+        query = f"""
+            SELECT id, nome, matricula, curso, email, relevancia FROM (
+                SELECT id, nome, matricula, curso, email, {' + '.join(termos)} AS relevancia
+                FROM alunos
+            ) WHERE relevancia > 0
+        """
+        if posicao is not None:
+            query += " AND (relevancia < %s OR (relevancia = %s AND id > %s))"
+            params += [posicao['r'], posicao['r'], posicao['id']]
+        query += " ORDER BY relevancia DESC, id LIMIT %s"
+        params.append(limite + 1)
+
+        with self.banco.leitura() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+
+class UserRepositorySQLite(UserRepository):
+
+    def ler_revogacoes(self, desde=None):
+        # O banco corre neste processo: a hora do banco é a hora local
+        agora = datetime.now()
+        with self.banco.transacao() as cursor:
+            if desde is None:
+                cursor.execute("SELECT jti, expira_em FROM tokens_revogados WHERE expira_em > %s", (agora,))
+            else:
+                cursor.execute("SELECT jti, expira_em FROM tokens_revogados WHERE revogado_em >= %s", (desde,))
+            linhas = [(linha['jti'], linha['expira_em']) for linha in cursor.fetchall()]
+        return agora, linhas
+
+    def revogar_token(self, jti, expira_em):
+        with self.banco.transacao() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO tokens_revogados (jti, expira_em, revogado_em) VALUES (%s, %s, %s)",
+                (jti, expira_em, datetime.now())
+            )
+
+    def apagar_expirados(self, tabela, lote):
+        # Sem DELETE ... LIMIT na compilação padrão do SQLite: o lote é escolhido numa subconsulta
+        chave = self.TABELAS_EXPIRAVEIS[tabela]
+        with self.banco.transacao() as cursor:
+            cursor.execute(
+                f"DELETE FROM {tabela} WHERE {chave} IN "
+                f"(SELECT {chave} FROM {tabela} WHERE expira_em < %s ORDER BY expira_em LIMIT %s)",
+                (datetime.now(), lote)
+            )
+            return cursor.rowcount
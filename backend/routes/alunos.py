@@ -1,111 +1,232 @@
-import os
-from flask import Blueprint, request, jsonify, abort
+from flask import Blueprint, request, jsonify, abort, current_app, send_file, url_for
 from werkzeug.exceptions import HTTPException
 import logging
-import mysql.connector
+import os
+import io
+import csv
+import json
 
 # Importa os decoradores de autenticação do novo módulo auth.py
 from routes.auth import token_required, admin_required 
+# Acesso a dados pelo repositório do motor configurado (MySQL ou SQLite)
+from repositorios import get_repo_alunos, ErroArmazenamento, Duplicado
+from contagem import get_contador
+from exportacao import get_exportacoes, FORMATOS
+from cache_respostas import get_cache_respostas
+from replicas import leitura_fixada_no_primario, marcar_escrita
+# Validação, consultas e formatos partilhados com a variante assíncrona (routes_async/)
+from routes.comum import (
+    envelope_erro, validar_aluno, valores_aluno, CAMPOS_OBRIGATORIOS, modo_contagem as ler_modo_contagem,
+    etag_aluno, etag_listagem, etag_corresponde, versao_esperada, falha_escrita_condicional, campos_pedidos,
+    TAG_LISTA, TAG_BUSCA, tag_aluno, chave_cache, chave_cache_aluno,
+    parametros_listagem, parametros_busca, resultado_busca, corpo_listagem, corpo_aluno,
+    CHAVES_LOOKUP, chaves_lookup, resultado_lookup, TIPO_JSON, escolher_formato,
+    com_etag, nao_modificado, renderizar, resposta_do_cache
+)
 
-# Configuração básica de logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Blueprint para as rotas de alunos
 # O url_prefix definido aqui será usado no app.py ao registrar o blueprint
 alunos_bp = Blueprint('alunos', __name__, url_prefix='/api/v1/alunos/')
 
-# Configuração do banco de dados: lê do ambiente, com valores padrão para Docker Compose
-def db_connection():
-    return mysql.connector.connect(
-        host=os.environ.get("DB_HOST", "db"), # 'db' é o nome do serviço no docker-compose
-        user=os.environ.get("DB_USER", "user"),
-        password=os.environ.get("DB_PASSWORD", "senha"),
-        database=os.environ.get("DB_NAME", "escola")
-    )
-
 @alunos_bp.errorhandler(HTTPException)
 def handle_exception(e):
     """Handler global para exceções HTTP dentro do blueprint de alunos"""
     logger.error(f"Erro HTTP {e.code}: {e.description}")
-    return jsonify({
-        "sucesso": False,
-        "mensagem": e.description,
-        "codigo": e.code
-    }), e.code
+    return jsonify(envelope_erro(e.code, e.description)), e.code
 
 @alunos_bp.errorhandler(Exception)
 def handle_unexpected_error(e):
     """Handler para erros inesperados dentro do blueprint de alunos"""
     logger.exception("Erro inesperado no blueprint de alunos")
-    return jsonify({
-        "sucesso": False,
-        "mensagem": "Ocorreu um erro interno no servidor",
-        "codigo": 500
-    }), 500
-
-def validar_aluno(data, operacao='create'):
-    """Valida os dados do aluno conforme a operação (create/update)"""
-    campos_obrigatorios = ['nome', 'matricula', 'curso', 'email']
-    
-    if not data:
-        abort(400, description="Dados do aluno não fornecidos")
-    
-    if operacao == 'create':
-        for campo in campos_obrigatorios:
-            if campo not in data or not str(data[campo]).strip():
-                abort(400, description=f"Campo '{campo}' é obrigatório")
-    
-    # Validações específicas para campos se eles estiverem presentes
-    if 'email' in data and '@' not in data['email']:
-        abort(400, description="Email inválido")
-    
-    if 'matricula' in data and not str(data['matricula']).isdigit():
-        abort(400, description="Matrícula deve conter apenas números")
+    return jsonify(envelope_erro(500, "Ocorreu um erro interno no servidor")), 500
+
+def contar_alunos(repo, modo):
+    """
+    Devolve o total de alunos conforme o modo pedido:
+    - none: não calcula o total (devolve None);
+    - estimate: usa o total em cache, reconciliando-o se estiver desatualizado;
+    - exact: executa sempre COUNT(*) e atualiza o cache.
+    """
+    if modo == 'none':
+        return None
+
+    contador = get_contador()
+    if modo == 'estimate':
+        total = contador.obter()
+        if total is not None:
+            return total
+
+    total = repo.contar()
+    contador.definir(total)
+    return total
+
+def resposta_em_cache(chave, formato=None):
+    """Devolve a resposta guardada em cache (304 se o ETag corresponder), ou None."""
+    if leitura_fixada_no_primario():
+        # Logo após uma escrita do cliente, o cache pode ter uma leitura de réplica atrasada
+        return None
+    em_cache = get_cache_respostas().obter(chave)
+    if em_cache is None:
+        return None
+    return resposta_do_cache(current_app, em_cache, request.if_none_match, formato)
 
 # Rota para listar todos os alunos (pode ser pública ou exigir token, dependendo da necessidade)
 # Para esta demo, vamos exigir token para todas as operações CRUD
 @alunos_bp.route('/', methods=['GET'])
 @token_required # Agora exige um token válido para listar alunos
 def listar_alunos():
-    """Lista todos os alunos com paginação."""
-    conn = None 
+    """
+    Lista os alunos ordenados por ID, com dois modos de paginação:
+    - page/per_page (OFFSET), mantido para clientes antigos;
+    - cursor ou after_id (keyset), que procura diretamente pela chave primária
+      e não fica mais lento em páginas profundas.
+    Com ?fields=id,nome só essas colunas são lidas e devolvidas (o 'id' vem sempre).
+    Com ?ids=1,5,9 devolve apenas esses alunos (ver obter_varios_alunos).
+    O Accept escolhe entre o JSON habitual, o JSON colunar e o MessagePack.
+    """
+    formato = escolher_formato(request.accept_mimetypes)
+    if 'ids' in request.args:
+        return obter_varios_alunos(
+            'ids', request.args['ids'], campos_pedidos(request.args), formato,
+            chave=chave_cache('ids', request.args, formato)
+        )
+
+    per_page, after_id, page, campos = parametros_listagem(request.args)
+    modo_contagem = ler_modo_contagem(request.args)
+
+    # Pedidos com count=exact ignoram o cache: o cliente quer o total atual
+    chave = chave_cache('listar', request.args, formato) if modo_contagem != 'exact' else None
+    if chave:
+        em_cache = resposta_em_cache(chave, formato)
+        if em_cache:
+            return em_cache
+    # Antes da leitura: se uma escrita invalidar a lista entretanto, esta resposta não é guardada
+    marca = get_cache_respostas().marca()
+
+    repo = get_repo_alunos()
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        offset = (page - 1) * per_page
-
-        conn = db_connection()
-        with conn.cursor(dictionary=True) as cursor:
-            # Query para os dados dos alunos
-            cursor.execute("""
-                SELECT id, nome, matricula, curso, email 
-                FROM alunos 
-                LIMIT %s OFFSET %s
-            """, (per_page, offset))
-            alunos = cursor.fetchall()
-
-            # Query para o total de alunos (para paginação)
-            cursor.execute("SELECT COUNT(*) as total FROM alunos")
-            total = cursor.fetchone()['total']
-
-            return jsonify({
-                'sucesso': True,
-                'alunos': alunos,
-                'total': total,
-                'pagina': page,
-                'por_pagina': per_page
-            }), 200
-            
-    except mysql.connector.Error as err:
-        logger.error(f"Erro MySQL ao listar alunos: {err}")
+        if request.if_none_match:
+            # A versão da tabela é uma leitura de uma única linha: se o cliente já tiver
+            # esta listagem, responde 304 sem consultar nem serializar os alunos
+            etag = etag_listagem(repo.versao_tabela(), request.args, formato)
+            if etag_corresponde(request.if_none_match, etag):
+                return nao_modificado(current_app, etag, formato)
+
+        # Nos formatos tabulares as linhas seguem como tuplos do cursor, sem criar dicionários
+        tabular = formato != TIPO_JSON
+        # Uma conexão e um snapshot: o ETag é a versão da tabela que estas linhas e este total mostram
+        with repo.instantaneo():
+            etag = etag_listagem(repo.versao_tabela(), request.args, formato)
+            if after_id is not None:
+                # Keyset: busca uma linha extra para saber se existe próxima página
+                alunos = repo.listar_apos_id(after_id, per_page + 1, campos, tabular)
+                tem_mais = len(alunos) > per_page
+                alunos = alunos[:per_page]
+            else:
+                # Query para os dados dos alunos
+                alunos = repo.listar_pagina(per_page, (page - 1) * per_page, campos, tabular)
+                tem_mais = len(alunos) == per_page
+
+            # Total de alunos (para paginação), em cache salvo se o cliente pedir 'exact'
+            total = contar_alunos(repo, modo_contagem)
+
+        resposta = corpo_listagem(
+            alunos, tem_mais, total, modo_contagem, per_page,
+            pagina=page, colunas=campos if tabular else None
+        )
+        if chave:
+            get_cache_respostas().guardar(
+                chave, (resposta, etag),
+                tags=[TAG_LISTA] + [tag_aluno(aluno[0] if tabular else aluno['id']) for aluno in alunos],
+                desde=marca
+            )
+        return com_etag(renderizar(current_app, resposta, formato), etag), 200
+
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao listar alunos: {err}")
         abort(500, description=f"Erro no banco de dados ao listar alunos: {err}")
     except Exception as e:
         logger.exception("Erro inesperado ao listar alunos")
         abort(500, description="Erro ao listar alunos")
-    finally:
-        if conn:
-            conn.close()
+
+def obter_varios_alunos(tipo, valores, campos, formato, chave=None):
+    """
+    Multi-get: lê todos os alunos pedidos ('ids' ou 'matriculas') numa única
+    consulta IN (...), devolve-os pela ordem pedida e indica as chaves sem aluno.
+    Com 'chave', a resposta fica no cache até uma escrita num dos alunos ou na lista.
+    """
+    if chave:
+        em_cache = resposta_em_cache(chave, formato)
+        if em_cache:
+            return em_cache
+    marca = get_cache_respostas().marca()
+
+    chaves = chaves_lookup(valores, tipo, current_app.config['ALUNOS_LOOKUP_MAX_KEYS'])
+    coluna = CHAVES_LOOKUP[tipo]
+    tabular = formato != TIPO_JSON
+    try:
+        linhas = get_repo_alunos().obter_varios(coluna, chaves, campos, tabular)
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao obter vários alunos: {err}")
+        abort(500, description=f"Erro no banco de dados ao obter alunos: {err}")
+
+    resposta = resultado_lookup(linhas, chaves, coluna, campos, tabular)
+    if chave:
+        # TAG_LISTA: um aluno ainda inexistente pode ser criado entretanto
+        ids = [linha[0] for linha in resposta['rows']] if tabular else [aluno['id'] for aluno in resposta['alunos']]
+        get_cache_respostas().guardar(
+            chave, (resposta, None), tags=[TAG_LISTA] + [tag_aluno(i) for i in ids], desde=marca
+        )
+    return renderizar(current_app, resposta, formato), 200
+
+# Rota para obter vários alunos por ID ou matrícula num único pedido (exige token)
+@alunos_bp.route('/lookup', methods=['POST'])
+@token_required
+def procurar_alunos():
+    """
+    Corpo {"ids": [1, 5, 9]} ou {"matriculas": ["2023001", ...]}, com até
+    ALUNOS_LOOKUP_MAX_KEYS chaves; aceita ?fields= e o Accept como a listagem.
+    """
+    formato = escolher_formato(request.accept_mimetypes)
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="Corpo JSON com 'ids' ou 'matriculas' é obrigatório")
+    tipos = [tipo for tipo in CHAVES_LOOKUP if tipo in data]
+    if len(tipos) != 1:
+        abort(400, description="Envie exatamente um de 'ids' ou 'matriculas'")
+    return obter_varios_alunos(tipos[0], data[tipos[0]], campos_pedidos(request.args), formato)
+
+# Rota para pesquisar alunos por nome, curso, email ou matrícula (exige token)
+@alunos_bp.route('/search', methods=['GET'])
+@token_required
+def buscar_alunos():
+    """
+    Pesquisa alunos ordenados por relevância (ver consulta_busca em routes/comum.py):
+    nome e curso pelo índice FULLTEXT, matrícula e email por prefixo nos índices únicos.
+    A paginação usa um cursor sobre (relevancia, id), estável entre pedidos.
+    """
+    q, limite, posicao = parametros_busca(request.args)
+
+    chave = chave_cache('buscar', request.args)
+    em_cache = resposta_em_cache(chave)
+    if em_cache:
+        return em_cache
+    marca = get_cache_respostas().marca()
+
+    try:
+        alunos = get_repo_alunos().buscar(q, limite, posicao)
+        resposta = resultado_busca(alunos, q, limite)
+        get_cache_respostas().guardar(chave, (resposta, None), tags=[TAG_BUSCA], desde=marca)
+        return jsonify(resposta), 200
+
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao pesquisar alunos: {err}")
+        abort(500, description=f"Erro no banco de dados ao pesquisar alunos: {err}")
+    except Exception as e:
+        logger.exception("Erro inesperado ao pesquisar alunos")
+        abort(500, description="Erro ao pesquisar alunos")
 
 # Rota para cadastrar um novo aluno (exige token e privilégios de admin)
 @alunos_bp.route('/', methods=['POST'])
@@ -113,165 +234,324 @@ def listar_alunos():
 @admin_required # Apenas administradores podem cadastrar
 def cadastrar_aluno():
     """Cadastra um novo aluno."""
-    conn = None
     try:
         data = request.get_json()
         validar_aluno(data, 'create') # Valida dados para criação
         
-        conn = db_connection()
-        with conn.cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO alunos (nome, matricula, curso, email) 
-                VALUES (%s, %s, %s, %s)
-            """, (
-                data['nome'].strip(),
-                data['matricula'].strip(),
-                data['curso'].strip(),
-                data['email'].strip().lower()
-            ))
-            aluno_id = cursor.lastrowid
-            conn.commit()
-            
-            logger.info(f"Aluno cadastrado com ID: {aluno_id}")
-            return jsonify({
-                'sucesso': True,
-                'mensagem': 'Aluno cadastrado com sucesso',
-                'id': aluno_id
-            }), 201
+        aluno_id = get_repo_alunos().inserir(valores_aluno(data))
+        marcar_escrita()
+        get_contador().ajustar(+1)
+        get_cache_respostas().invalidar(TAG_LISTA, TAG_BUSCA)
+        
+        logger.info(f"Aluno cadastrado com ID: {aluno_id}")
+        return jsonify({
+            'sucesso': True,
+            'mensagem': 'Aluno cadastrado com sucesso',
+            'id': aluno_id
+        }), 201
             
-    except mysql.connector.IntegrityError as e:
+    except HTTPException:
+        raise
+    except Duplicado as e:
         logger.error(f"Erro de integridade ao cadastrar aluno: {str(e)}")
         abort(400, description="Matrícula ou email já cadastrados")
-    except mysql.connector.Error as err:
-        logger.error(f"Erro MySQL ao cadastrar aluno: {err}")
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao cadastrar aluno: {err}")
         abort(500, description=f"Erro no banco de dados ao cadastrar aluno: {err}")
     except Exception as e:
         logger.exception("Erro inesperado ao cadastrar aluno")
         abort(500, description="Erro ao cadastrar aluno")
+
+TIPOS_NDJSON = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+def ler_registos_bulk():
+    """
+    Gera (numero_linha, registo, erro) a partir do corpo do pedido, conforme o Content-Type:
+    - application/json: um array JSON de objetos;
+    - application/x-ndjson: um objeto JSON por linha, lido em streaming;
+    - text/csv: cabeçalho nome,matricula,curso,email, lido em streaming.
+    """
+    if request.mimetype in TIPOS_NDJSON:
+        stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8')
+        for numero, linha in enumerate(stream, start=1):
+            if not linha.strip():
+                continue
+            try:
+                yield numero, json.loads(linha), None
+            except ValueError:
+                yield numero, None, "JSON inválido"
+    elif request.mimetype == 'text/csv':
+        stream = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        for numero, registo in enumerate(csv.DictReader(stream), start=1):
+            yield numero, registo, None
+    else:
+        dados = request.get_json(silent=True)
+        if not isinstance(dados, list):
+            abort(400, description="Esperado um array JSON de alunos")
+        for numero, registo in enumerate(dados, start=1):
+            yield numero, registo, None
+
+# Rota para importar alunos em massa (exige token e privilégios de admin)
+@alunos_bp.route('/bulk', methods=['POST'])
+@token_required
+@admin_required # Apenas administradores podem importar
+def importar_alunos():
+    """
+    Importa vários alunos num único pedido (JSON, NDJSON ou CSV).
+    Cada registo é validado com validar_aluno; os inválidos ou duplicados são
+    reportados por linha sem interromper a importação dos restantes.
+    """
+    tamanho_lote = current_app.config['ALUNOS_BULK_CHUNK_SIZE']
+    erros = []
+    inseridos = 0
+    total_linhas = 0
+
+    repo = get_repo_alunos()
+    try:
+        lote = []
+        for numero, registo, erro in ler_registos_bulk():
+            total_linhas += 1
+            if erro is None:
+                if not isinstance(registo, dict):
+                    erro = "Registo deve ser um objeto com os campos do aluno"
+                elif not all(isinstance(registo.get(campo), str) and registo[campo].strip() for campo in CAMPOS_OBRIGATORIOS):
+                    # Ex.: uma linha CSV curta (colunas em falta chegam como None) ou um email numérico
+                    erro = f"Campos {', '.join(CAMPOS_OBRIGATORIOS)} devem ser texto não vazio"
+                else:
+                    try:
+                        validar_aluno(registo, 'create')
+                    except HTTPException as e:
+                        erro = e.description
+            if erro:
+                erros.append({'linha': numero, 'erro': erro})
+                continue
+
+            lote.append((numero, valores_aluno(registo)))
+            if len(lote) >= tamanho_lote:
+                inseridos += repo.inserir_lote(lote, erros)
+                lote = []
+
+        if lote:
+            inseridos += repo.inserir_lote(lote, erros)
+
+        logger.info(f"Importação em massa: {inseridos} de {total_linhas} alunos inseridos")
+        return jsonify({
+            'sucesso': not erros,
+            'mensagem': f"{inseridos} aluno(s) importado(s)",
+            'total_linhas': total_linhas,
+            'inseridos': inseridos,
+            'erros': sorted(erros, key=lambda erro: erro['linha'])
+        }), 200
+
+    except HTTPException:
+        raise
+    except UnicodeDecodeError:
+        abort(400, description="O corpo do pedido deve estar codificado em UTF-8")
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados na importação em massa: {err}")
+        abort(500, description=f"Erro no banco de dados ao importar alunos: {err}")
+    except Exception as e:
+        logger.exception("Erro inesperado na importação em massa")
+        abort(500, description="Erro ao importar alunos")
     finally:
-        if conn:
-            conn.close()
+        # Os lotes já confirmados permanecem, mesmo que um lote posterior falhe
+        if inseridos:
+            marcar_escrita()
+            get_contador().ajustar(inseridos)
+            get_cache_respostas().invalidar(TAG_LISTA, TAG_BUSCA)
+
+# Rota para iniciar uma exportação completa da tabela (exige token e privilégios de admin)
+@alunos_bp.route('/exports', methods=['POST'])
+@token_required
+@admin_required
+def iniciar_exportacao():
+    """
+    Agenda a exportação de todos os alunos em segundo plano.
+    Corpo opcional: {"formato": "csv" | "ndjson", "gzip": true | false}.
+    Devolve 202 com o ID da tarefa, que deve ser consultado até ficar 'concluido'.
+    """
+    data = request.get_json(silent=True) or {}
+    formato = data.get('formato', 'csv')
+    if formato not in FORMATOS:
+        abort(400, description=f"Formato deve ser um de: {', '.join(FORMATOS)}")
+
+    job = get_exportacoes().iniciar(
+        current_app._get_current_object(),
+        formato,
+        bool(data.get('gzip', False)),
+        criado_por=request.username
+    )
+    logger.info(f"Exportação {job['id']} agendada por '{request.username}'")
+    return jsonify({
+        'sucesso': True,
+        'exportacao': job,
+        'status_url': url_for('alunos.estado_exportacao', job_id=job['id'])
+    }), 202
+
+# Rota para consultar o estado de uma exportação
+@alunos_bp.route('/exports/<job_id>', methods=['GET'])
+@token_required
+@admin_required
+def estado_exportacao(job_id):
+    """Devolve o estado de uma exportação e, quando concluída, o URL de download."""
+    job = get_exportacoes().obter(job_id)
+    if not job:
+        abort(404, description="Exportação não encontrada")
+
+    resposta = {'sucesso': True, 'exportacao': job}
+    if job['estado'] == 'concluido':
+        resposta['download_url'] = url_for('alunos.download_exportacao', job_id=job_id)
+    return jsonify(resposta), 200
+
+# Rota para descarregar o ficheiro de uma exportação concluída (suporta Range)
+@alunos_bp.route('/exports/<job_id>/download', methods=['GET'])
+@token_required
+@admin_required
+def download_exportacao(job_id):
+    """Envia o ficheiro exportado; pedidos com Range permitem retomar downloads interrompidos."""
+    exportacoes = get_exportacoes()
+    job = exportacoes.obter(job_id)
+    if not job:
+        abort(404, description="Exportação não encontrada")
+    if job['estado'] != 'concluido':
+        abort(409, description=f"Exportação ainda não está disponível (estado: {job['estado']})")
+
+    mimetype = 'application/gzip' if job['gzip'] else FORMATOS[job['formato']][0]
+    return send_file(
+        os.path.abspath(exportacoes.caminho_ficheiro(job)),
+        mimetype=mimetype,
+        as_attachment=True,
+        download_name=job['ficheiro'],
+        conditional=True  # Ativa ETag, If-Modified-Since e pedidos Range
+    )
 
 # Rota para obter detalhes de um aluno específico (exige token)
 @alunos_bp.route('/<int:id>', methods=['GET'])
 @token_required 
 def obter_aluno(id):
-    """Obtém detalhes de um aluno específico."""
-    conn = None
+    """Obtém detalhes de um aluno específico (apenas os campos de ?fields=, se enviado)."""
+    campos = campos_pedidos(request.args)
+    chave = chave_cache_aluno(id, campos)
+    em_cache = resposta_em_cache(chave)
+    if em_cache:
+        return em_cache
+    marca = get_cache_respostas().marca()
+
+    repo = get_repo_alunos()
     try:
-        conn = db_connection()
-        with conn.cursor(dictionary=True) as cursor:
-            cursor.execute("""
-                SELECT id, nome, matricula, curso, email 
-                FROM alunos 
-                WHERE id = %s
-            """, (id,))
-            aluno = cursor.fetchone()
-            
-            if not aluno:
+        if request.if_none_match:
+            # Revalidação: lê apenas a versão da linha, sem serializar o aluno
+            versao = repo.versao(id)
+            if versao is None:
                 abort(404, description="Aluno não encontrado")
-                
-            return jsonify({
-                'sucesso': True,
-                'aluno': aluno
-            }), 200
+            etag = etag_aluno(id, versao, campos)
+            if etag_corresponde(request.if_none_match, etag):
+                return nao_modificado(current_app, etag)
+
+        aluno = repo.obter(id, campos)
+        
+        if not aluno:
+            abort(404, description="Aluno não encontrado")
+
+        resposta, etag = corpo_aluno(id, aluno, campos)
+        get_cache_respostas().guardar(chave, (resposta, etag), tags=[tag_aluno(id)], desde=marca)
+        return com_etag(jsonify(resposta), etag), 200
             
-    except mysql.connector.Error as err:
-        logger.error(f"Erro MySQL ao obter aluno {id}: {err}")
+    except HTTPException:
+        raise
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao obter aluno {id}: {err}")
         abort(500, description=f"Erro no banco de dados ao obter aluno: {err}")
     except Exception as e:
         logger.exception(f"Erro inesperado ao obter aluno {id}")
         abort(500, description="Erro ao obter aluno")
-    finally:
-        if conn:
-            conn.close()
 
 # Rota para atualizar os dados de um aluno (exige token e privilégios de admin)
-@alunos_bp.route('/<int:id>', methods=['PUT'])
+@alunos_bp.route('/<int:id>', methods=['PUT', 'PATCH'])
 @token_required
 @admin_required # Apenas administradores podem editar
 def editar_aluno(id):
-    """Atualiza os dados de um aluno."""
-    conn = None
+    """
+    Atualiza os dados de um aluno num único UPDATE: apenas as colunas enviadas
+    são alteradas (o cliente pode usar PATCH só com os campos modificados) e o
+    rowcount indica se o aluno existe, sem um SELECT prévio.
+    Com If-Match, a escrita só acontece se a versão da linha ainda for a do ETag.
+    """
     try:
         data = request.get_json()
         validar_aluno(data, 'update') # Valida dados para atualização
+        versao = versao_esperada(request.if_match, id)
         
-        conn = db_connection()
-        with conn.cursor() as cursor:
-            # Verifica se o aluno existe
-            cursor.execute("SELECT id FROM alunos WHERE id = %s", (id,))
-            if not cursor.fetchone():
-                abort(404, description="Aluno não encontrado")
-            
-            # Constrói a query de atualização dinamicamente
-            campos = []
-            valores = []
-            
-            # Itera sobre os campos esperados e adiciona-os à query se estiverem nos dados recebidos
-            for campo in ['nome', 'matricula', 'curso', 'email']:
-                if campo in data:
-                    campos.append(f"{campo} = %s")
-                    valores.append(data[campo].strip())
-            
-            if not campos:
-                abort(400, description="Nenhum dado fornecido para atualização")
-            
-            valores.append(id) # Adiciona o ID para a cláusula WHERE
-            query = f"UPDATE alunos SET {', '.join(campos)} WHERE id = %s"
-            
-            cursor.execute(query, valores)
-            conn.commit()
-            
-            logger.info(f"Aluno {id} atualizado")
-            return jsonify({
-                'sucesso': True,
-                'mensagem': 'Aluno atualizado com sucesso'
-            }), 200
+        atualizado = get_repo_alunos().atualizar(id, data, versao)
+        if not atualizado:
+            # False: o aluno existe mas mudou de versão (412); None: não existe (404)
+            falha_escrita_condicional(atualizado is False)
+        marcar_escrita()
+        # O aluno pode aparecer ou deixar de aparecer em pesquisas
+        get_cache_respostas().invalidar(tag_aluno(id), TAG_BUSCA)
+        
+        logger.info(f"Aluno {id} atualizado")
+        resposta = jsonify({
+            'sucesso': True,
+            'mensagem': 'Aluno atualizado com sucesso'
+        })
+        if versao is not None:
+            # A nova versão é conhecida: o cliente pode encadear outra escrita condicional
+            com_etag(resposta, etag_aluno(id, versao + 1))
+        return resposta, 200
             
-    except mysql.connector.IntegrityError as e:
+    except HTTPException:
+        raise
+    except Duplicado as e:
         logger.error(f"Erro de integridade ao atualizar aluno: {str(e)}")
         abort(400, description="Matrícula ou email já cadastrados")
-    except mysql.connector.Error as err:
-        logger.error(f"Erro MySQL ao atualizar aluno {id}: {err}")
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao atualizar aluno {id}: {err}")
         abort(500, description=f"Erro no banco de dados ao atualizar aluno: {err}")
     except Exception as e:
         logger.exception(f"Erro inesperado ao atualizar aluno {id}")
         abort(500, description="Erro ao atualizar aluno")
-    finally:
-        if conn:
-            conn.close()
 
 # Rota para remover um aluno do sistema (exige token e privilégios de admin)
 @alunos_bp.route('/<int:id>', methods=['DELETE'])
 @token_required
 @admin_required # Apenas administradores podem excluir
 def excluir_aluno(id):
-    """Remove um aluno do sistema."""
-    conn = None
+    """
+    Remove um aluno do sistema num único DELETE (o rowcount indica se existia).
+    Com If-Match, só remove se a versão da linha ainda for a do ETag.
+    """
     try:
-        conn = db_connection()
-        with conn.cursor() as cursor:
-            # Verifica se o aluno existe antes de tentar excluir
-            cursor.execute("SELECT id FROM alunos WHERE id = %s", (id,))
-            if not cursor.fetchone():
-                abort(404, description="Aluno não encontrado")
-            
-            cursor.execute("DELETE FROM alunos WHERE id = %s", (id,))
-            conn.commit()
-            
-            logger.info(f"Aluno {id} removido")
-            return jsonify({
-                'sucesso': True,
-                'mensagem': 'Aluno excluído com sucesso'
-            }), 200
+        versao = versao_esperada(request.if_match, id)
+
+        excluido = get_repo_alunos().excluir(id, versao)
+        if not excluido:
+            # False: o aluno existe mas mudou de versão (412); None: não existe (404)
+            falha_escrita_condicional(excluido is False)
+        marcar_escrita()
+        get_contador().ajustar(-1)
+        # Todas as listagens mudam (total e deslocamento das páginas)
+        get_cache_respostas().invalidar(tag_aluno(id), TAG_LISTA, TAG_BUSCA)
+        
+        logger.info(f"Aluno {id} removido")
+        return jsonify({
+            'sucesso': True,
+            'mensagem': 'Aluno excluído com sucesso'
+        }), 200
             
-    except mysql.connector.Error as err:
-        logger.error(f"Erro MySQL ao excluir aluno {id}: {err}")
+    except HTTPException:
+        raise
+    except ErroArmazenamento as err:
+        logger.error(f"Erro no banco de dados ao excluir aluno {id}: {err}")
         abort(500, description=f"Erro no banco de dados ao excluir aluno: {err}")
     except Exception as e:
         logger.exception(f"Erro inesperado ao excluir aluno {id}")
         abort(500, description="Erro ao excluir aluno")
-    finally:
-        if conn:
-            conn.close()
+
+# Rota para consultar as estatísticas do cache de respostas (exige token e privilégios de admin)
+@alunos_bp.route('/cache', methods=['GET'])
+@token_required
+@admin_required
+def estatisticas_cache():
+    """Expõe os contadores do cache de respostas (hits, misses, invalidações) deste processo."""
+    return jsonify(get_cache_respostas().estatisticas()), 200
@@ -1,25 +1,35 @@
-import os
-from flask import Blueprint, request, jsonify
-import mysql.connector
-import bcrypt
-import uuid
-from datetime import datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
 import logging
 from functools import wraps # Importado para uso com decoradores
 
+# Acesso a dados pelo repositório do motor configurado (MySQL ou SQLite)
+from repositorios import get_repo_users, Duplicado
+from auth.token_cache import get_token_cache
+from auth.senhas import get_senhas, ServicoSobrecarregado
+from auth.revogacao import get_lista_revogacao
+from auth.sessoes import hash_sessao
+from auth.jwt_handler import parece_jwt
+# Validação dos pedidos e dos tokens partilhada com a variante assíncrona (routes_async/)
+from auth.autenticacao import (
+    RecusaAutenticacao, MSG_TOKEN_INVALIDO, token_bearer, claims_de_acesso, validar_sessao_opaca,
+    identificar, exigir_admin, credenciais, abrir_sessao, claims_de_renovacao, renovar, claims_ou_nada
+)
+
 logger = logging.getLogger(__name__)
 
 # Define o Blueprint para as rotas de autenticação
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/v1/auth')
 
-# Função de conexão com o banco de dados (reutilizada de outros módulos)
-def db_connection():
-    return mysql.connector.connect(
-        host=os.environ.get("DB_HOST", "db"), # 'db' é o nome do serviço no docker-compose
-        user=os.environ.get("DB_USER", "user"),
-        password=os.environ.get("DB_PASSWORD", "senha"),
-        database=os.environ.get("DB_NAME", "escola")
-    )
+def servico_sobrecarregado():
+    """Resposta 503 imediata quando a fila de hashing de senhas está cheia."""
+    logger.warning("Fila de hashing de senhas cheia: pedido recusado com 503")
+    resposta = jsonify({"message": "Servidor ocupado. Tente novamente dentro de instantes."})
+    resposta.headers['Retry-After'] = '1'
+    return resposta, 503
+
+def recusar(e):
+    """Resposta {"message": ...} de uma RecusaAutenticacao."""
+    return jsonify({"message": e.mensagem}), e.codigo
 
 @auth_bp.route('/register', methods=['POST'])
 def register_user():
@@ -29,120 +39,145 @@ def register_user():
     Para esta demonstração, pode ser usada para criar o primeiro admin.
     """
     data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
+    try:
+        username, password = credenciais(data)
+    except RecusaAutenticacao as e:
+        return recusar(e)
     role = data.get('role', 'user') # Padrão para 'user', pode ser 'admin'
 
-    if not username or not password:
-        return jsonify({"message": "Nome de utilizador e senha são obrigatórios"}), 400
-
-    # Hashing da senha usando bcrypt
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-    conn = None
     try:
-        conn = db_connection()
-        with conn.cursor() as cursor:
-            cursor.execute(
-                "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
-                (username, hashed_password, role)
-            )
-            conn.commit()
-            logger.info(f"Utilizador '{username}' registado com sucesso com a função '{role}'.")
-            return jsonify({"message": "Utilizador registado com sucesso"}), 201
-    except mysql.connector.IntegrityError:
+        # Hashing da senha usando bcrypt, no pool dedicado e com o custo configurado
+        hashed_password = get_senhas().gerar_hash(password)
+
+        get_repo_users().criar(username, hashed_password, role)
+        logger.info(f"Utilizador '{username}' registado com sucesso com a função '{role}'.")
+        return jsonify({"message": "Utilizador registado com sucesso"}), 201
+    except Duplicado:
         # Erro de integridade ocorre se o username já existir (UNIQUE constraint)
         return jsonify({"message": "Nome de utilizador já existe"}), 409
+    except ServicoSobrecarregado:
+        return servico_sobrecarregado()
     except Exception as e:
         logger.exception("Erro ao registar utilizador:")
         return jsonify({"message": "Erro interno ao registar utilizador"}), 500
-    finally:
-        if conn:
-            conn.close()
 
 @auth_bp.route('/login', methods=['POST'])
 def login_user():
     """
     Rota para autenticar um utilizador e emitir um token de sessão.
     """
-    data = request.get_json()
-    username = data.get('username')
-    password = data.get('password')
-
-    if not username or not password:
-        return jsonify({"message": "Nome de utilizador e senha são obrigatórios"}), 400
+    try:
+        username, password = credenciais(request.get_json())
+    except RecusaAutenticacao as e:
+        return recusar(e)
 
-    conn = None
+    users = get_repo_users()
     try:
-        conn = db_connection()
-        with conn.cursor(dictionary=True) as cursor:
-            # Busca o utilizador pelo username
-            cursor.execute("SELECT id, username, password_hash, role FROM users WHERE username = %s", (username,))
-            user = cursor.fetchone()
-
-            # Verifica se o utilizador existe e se a senha está correta
-            if user and bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
-                # Gerar um token de sessão único
-                token = str(uuid.uuid4())
-                # Definir expiração do token (ex: 1 hora a partir de agora)
-                token_expiry = datetime.now() + timedelta(hours=1)
-
-                # Armazenar o token e a expiração no banco de dados para validação futura
-                cursor.execute(
-                    "UPDATE users SET token = %s, token_expiry = %s WHERE id = %s",
-                    (token, token_expiry, user['id'])
-                )
-                conn.commit()
-
-                logger.info(f"Utilizador '{username}' autenticado com sucesso. Token gerado.")
-                return jsonify({
-                    "message": "Login bem-sucedido",
-                    "token": token,
-                    "expires_at": token_expiry.isoformat(), # Formato ISO 8601
-                    "role": user['role']
-                }), 200
-            else:
-                return jsonify({"message": "Nome de utilizador ou senha inválidos"}), 401
+        # Busca o utilizador pelo username (a conexão é devolvida antes de o bcrypt correr)
+        user = users.obter_por_username(username)
+
+        senhas = get_senhas()
+        # Verifica se o utilizador existe e se a senha está correta
+        if not user or not senhas.verificar(password, user['password_hash']):
+            return jsonify({"message": "Nome de utilizador ou senha inválidos"}), 401
+
+        # Se o custo do bcrypt configurado mudou, regrava o hash com o novo custo
+        if senhas.precisa_atualizar(user['password_hash']):
+            users.atualizar_hash(user['id'], senhas.gerar_hash(password))
+            logger.info(f"Hash da senha de '{username}' atualizado para o custo {senhas.rounds}.")
+
+        # Tokens assinados: a validação em token_required não precisa do banco de dados.
+        # Cada login abre uma sessão nova (INSERT em 'sessoes'), sem tocar na linha do utilizador
+        token_hash, expira_em, corpo = abrir_sessao(user, current_app.config)
+        users.criar_sessao(token_hash, user['id'], expira_em)
+        logger.info(f"Utilizador '{username}' autenticado com sucesso. Token gerado.")
+        return jsonify(corpo), 200
+    except ServicoSobrecarregado:
+        return servico_sobrecarregado()
     except Exception as e:
         logger.exception("Erro durante o login:")
         return jsonify({"message": "Erro interno durante o login"}), 500
-    finally:
-        if conn:
-            conn.close()
+
+@auth_bp.route('/refresh', methods=['POST'])
+def refresh_token():
+    """
+    Rota para obter um novo token de acesso a partir de um token de renovação.
+    Corpo: {"refresh_token": "<token>"}. Os dados do utilizador são relidos do banco,
+    para que uma alteração de função (role) ou remoção do utilizador tenha efeito aqui;
+    a sessão do token (claim 'sid') tem de existir, ou seja, não ter terminado no logout.
+    """
+    try:
+        claims = claims_de_renovacao(request.get_json(silent=True), current_app.config)
+    except RecusaAutenticacao as e:
+        return recusar(e)
+    if get_lista_revogacao().revogado(claims['jti']):
+        return jsonify({"message": "Token de renovação revogado"}), 401
+
+    try:
+        users = get_repo_users()
+        if 'sid' in claims:
+            user = users.obter_sessao(hash_sessao(claims['sid']))
+        else:
+            # Tokens de renovação emitidos antes das sessões: aceites até expirarem
+            user = users.obter_por_id(int(claims['sub']))
+        return jsonify(renovar(claims, user, current_app.config)), 200
+    except RecusaAutenticacao as e:
+        return recusar(e)
+    except Exception as e:
+        logger.exception("Erro ao renovar token:")
+        return jsonify({"message": "Erro interno ao renovar token"}), 500
 
 @auth_bp.route('/logout', methods=['POST'])
 def logout_user():
     """
     Rota para invalidar o token de sessão de um utilizador.
     O token deve ser enviado no cabeçalho 'Authorization: Bearer <token>'.
+    Termina a sessão do token (os tokens de renovação dessa sessão deixam de servir);
+    um token de renovação sem sessão, se enviado no corpo ({"refresh_token": ...}), é revogado.
     """
-    auth_header = request.headers.get('Authorization')
-    if not auth_header or not auth_header.startswith('Bearer '):
-        return jsonify({"message": "Token de autenticação ausente ou mal formatado"}), 401
-    
-    token = auth_header.split(' ')[1] # Extrai o token da string "Bearer <token>"
+    try:
+        token = token_bearer(request.headers.get('Authorization'), "Token de autenticação ausente ou mal formatado")
+    except RecusaAutenticacao as e:
+        return recusar(e)
+
+    if parece_jwt(token):
+        claims = claims_ou_nada(token, 'access', current_app.config)
+        if claims is None:
+            return jsonify({"message": "Token inválido ou já expirado"}), 401
+        try:
+            lista = get_lista_revogacao()
+            lista.revogar(claims)
+            users = get_repo_users()
+            if 'sid' in claims:
+                users.terminar_sessao(hash_sessao(claims['sid']))
+            refresh = (request.get_json(silent=True) or {}).get('refresh_token')
+            # Já expirado ou inválido: nada a revogar
+            claims_refresh = claims_ou_nada(refresh, 'refresh', current_app.config) if refresh else None
+            if claims_refresh is not None:
+                if 'sid' in claims_refresh:
+                    users.terminar_sessao(hash_sessao(claims_refresh['sid']))
+                else:
+                    lista.revogar(claims_refresh)
+            logger.info("Token invalidado com sucesso.")
+            return jsonify({"message": "Logout bem-sucedido"}), 200
+        except Exception as e:
+            logger.exception("Erro durante o logout:")
+            return jsonify({"message": "Erro interno durante o logout"}), 500
+
+    # Tokens opacos emitidos antes dos tokens assinados, migrados de users.token para 'sessoes'
+    # Remove o token do cache imediatamente, mesmo que o DELETE falhe
+    get_token_cache().evict(token)
 
-    conn = None
     try:
-        conn = db_connection()
-        with conn.cursor() as cursor:
-            # Limpa o token e a expiração do utilizador correspondente no banco de dados
-            cursor.execute(
-                "UPDATE users SET token = NULL, token_expiry = NULL WHERE token = %s",
-                (token,)
-            )
-            conn.commit()
-            if cursor.rowcount > 0: # Verifica se alguma linha foi afetada (token encontrado e invalidado)
-                logger.info("Token invalidado com sucesso.")
-                return jsonify({"message": "Logout bem-sucedido"}), 200
-            else:
-                return jsonify({"message": "Token inválido ou já expirado"}), 401
+        # Apaga a sessão do token (guardada pelo hash)
+        if get_repo_users().terminar_sessao(hash_sessao(token)): # Sessão encontrada e terminada
+            logger.info("Token invalidado com sucesso.")
+            return jsonify({"message": "Logout bem-sucedido"}), 200
+        else:
+            return jsonify({"message": "Token inválido ou já expirado"}), 401
     except Exception as e:
         logger.exception("Erro durante o logout:")
         return jsonify({"message": "Erro interno durante o logout"}), 500
-    finally:
-        if conn:
-            conn.close()
 
 def token_required(f):
     """
@@ -151,45 +186,37 @@ def token_required(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header or not auth_header.startswith('Bearer '):
-            return jsonify({"message": "Token de autenticação é obrigatório"}), 401
-        
-        token = auth_header.split(' ')[1]
-        
-        conn = None
         try:
-            conn = db_connection()
-            with conn.cursor(dictionary=True) as cursor:
-                # Busca o utilizador pelo token válido e não expirado
-                cursor.execute(
-                    "SELECT id, username, role, token_expiry FROM users WHERE token = %s",
-                    (token,)
-                )
-                user = cursor.fetchone()
-
-                if not user:
-                    return jsonify({"message": "Token inválido ou não encontrado"}), 401
-                
-                # Verifica a expiração do token
-                if user['token_expiry'] and user['token_expiry'] < datetime.now():
-                    # Invalida o token expirado no BD
-                    cursor.execute("UPDATE users SET token = NULL, token_expiry = NULL WHERE id = %s", (user['id'],))
-                    conn.commit()
-                    return jsonify({"message": "Token expirado. Por favor, faça login novamente."}), 401
-
-                # Adiciona as informações do utilizador ao objeto request para uso posterior nas rotas protegidas
-                request.user_id = user['id']
-                request.user_role = user['role']
-                request.username = user['username']
-                
+            token = token_bearer(request.headers.get('Authorization'))
+
+            if parece_jwt(token):
+                # Token assinado: validação apenas com CPU, sem ida ao banco de dados
+                claims = claims_de_acesso(token, current_app.config)
+                if get_lista_revogacao().revogado(claims['jti']):
+                    raise RecusaAutenticacao(MSG_TOKEN_INVALIDO)
+                identificar(request, claims=claims)
                 return f(*args, **kwargs)
-        except Exception as e:
-            logger.exception("Erro na validação do token:")
-            return jsonify({"message": "Erro interno na validação do token"}), 500
-        finally:
-            if conn:
-                conn.close()
+
+            # Tokens opacos antigos (sessões migradas de users.token), aceites até expirarem
+            # Tokens validados recentemente não precisam de ir ao banco de dados
+            cache = get_token_cache()
+            user = cache.get(token)
+            if user is None:
+                try:
+                    # Busca o utilizador da sessão do token
+                    user = validar_sessao_opaca(get_repo_users().obter_sessao(hash_sessao(token)))
+                    cache.put(token, user)
+                except RecusaAutenticacao:
+                    raise
+                except Exception as e:
+                    logger.exception("Erro na validação do token:")
+                    return jsonify({"message": "Erro interno na validação do token"}), 500
+        except RecusaAutenticacao as e:
+            return recusar(e)
+
+        # Adiciona as informações do utilizador ao objeto request para uso posterior nas rotas protegidas
+        identificar(request, user=user)
+        return f(*args, **kwargs)
     return decorated
 
 def admin_required(f):
@@ -200,8 +227,17 @@ def admin_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
         # Verifica se 'user_role' foi definido pelo decorador 'token_required' e se é 'admin'
-        if not hasattr(request, 'user_role') or request.user_role != 'admin':
-            return jsonify({"message": "Acesso negado: Requer privilégios de administrador"}), 403
+        try:
+            exigir_admin(request)
+        except RecusaAutenticacao as e:
+            return recusar(e)
         return f(*args, **kwargs)
     return decorated
 
+
+@auth_bp.route('/token-cache', methods=['GET'])
+@token_required
+@admin_required
+def token_cache_stats():
+    """Expõe os contadores do cache de tokens (hits, misses, tamanho) deste processo."""
+    return jsonify(get_token_cache().stats()), 200
@@ -0,0 +1,492 @@
+"""
+Regras partilhadas pelas duas variantes da API: a síncrona (Flask, routes/) e a
+assíncrona (Quart, routes_async/). Tudo aqui é independente do framework:
+as funções recebem os argumentos do pedido em vez de usarem 'request', e os
+erros são levantados com o abort do werkzeug, tratado por ambos.
+"""
+import re
+import json
+import base64
+import hashlib
+from urllib.parse import urlencode
+
+from werkzeug.exceptions import abort
+
+# MessagePack é opcional: sem o pacote, só os formatos JSON são negociados
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def envelope_erro(codigo, mensagem):
+    """Corpo das respostas de erro das rotas de alunos."""
+    return {
+        "sucesso": False,
+        "mensagem": mensagem,
+        "codigo": codigo
+    }
+
+# Campos enviados no cadastro de um aluno (o id e a versão são gerados pelo banco)
+CAMPOS_OBRIGATORIOS = ('nome', 'matricula', 'curso', 'email')
+
+def validar_aluno(data, operacao='create'):
+    """Valida os dados do aluno conforme a operação (create/update)"""
+
+    if not data:
+        abort(400, description="Dados do aluno não fornecidos")
+
+    if operacao == 'create':
+        for campo in CAMPOS_OBRIGATORIOS:
+            # None (ex.: coluna em falta numa linha CSV) conta como campo não enviado
+            if data.get(campo) is None or (isinstance(data[campo], str) and not data[campo].strip()):
+                abort(400, description=f"Campo '{campo}' é obrigatório")
+
+    # Os campos enviados têm de ser texto (a matrícula 123 em JSON é recusada, como o email 123)
+    for campo in CAMPOS_OBRIGATORIOS:
+        if campo in data and not isinstance(data[campo], str):
+            abort(400, description=f"Campo '{campo}' deve ser texto")
+
+    # Validações específicas para campos se eles estiverem presentes
+    if 'email' in data and '@' not in data['email']:
+        abort(400, description="Email inválido")
+
+    if 'matricula' in data and not data['matricula'].strip().isdigit():
+        abort(400, description="Matrícula deve conter apenas números")
+
+def valores_aluno(data):
+    """Normaliza os campos de um aluno já validado para o INSERT."""
+    return (
+        data['nome'].strip(),
+        data['matricula'].strip(),
+        data['curso'].strip(),
+        data['email'].strip().lower()
+    )
+
+MODOS_CONTAGEM = ('none', 'estimate', 'exact')
+
+def modo_contagem(args):
+    """Lê e valida o parâmetro 'count' da listagem."""
+    modo = args.get('count', 'estimate')
+    if modo not in MODOS_CONTAGEM:
+        abort(400, description=f"Parâmetro 'count' deve ser um de: {', '.join(MODOS_CONTAGEM)}")
+    return modo
+
+# Consultas usadas pelas duas variantes (o conector síncrono e o aiomysql usam o mesmo paramstyle)
+SQL_INSERIR_ALUNO = "INSERT INTO alunos (nome, matricula, curso, email) VALUES (%s, %s, %s, %s)"
+SQL_CONTAR_ALUNOS = "SELECT COUNT(*) as total FROM alunos"
+SQL_VERSAO_TABELA = "SELECT versao FROM tabela_versoes WHERE tabela = 'alunos'"
+SQL_INCREMENTAR_VERSAO_TABELA = "UPDATE tabela_versoes SET versao = versao + 1 WHERE tabela = 'alunos'"
+SQL_VERSAO_ALUNO = "SELECT versao FROM alunos WHERE id = %s"
+# Campos que o cliente pode pedir em ?fields= (lista branca: também são os nomes das colunas)
+CAMPOS_ALUNO = ('id', 'nome', 'matricula', 'curso', 'email')
+
+def campos_pedidos(args):
+    """
+    Lê e valida ?fields=id,nome (projeção das leituras de alunos). Devolve os campos
+    pela ordem de CAMPOS_ALUNO, sempre com 'id' (usado no cursor e no cache), ou
+    CAMPOS_ALUNO se o parâmetro não for enviado.
+    """
+    texto = args.get('fields')
+    if texto is None:
+        return CAMPOS_ALUNO
+    pedidos = {campo.strip() for campo in texto.split(',') if campo.strip()}
+    if not pedidos:
+        abort(400, description="Parâmetro 'fields' está vazio")
+    invalidos = sorted(pedidos - set(CAMPOS_ALUNO))
+    if invalidos:
+        abort(400, description=f"Campos inválidos em 'fields': {', '.join(invalidos)} (use {', '.join(CAMPOS_ALUNO)})")
+    pedidos.add('id')
+    return tuple(campo for campo in CAMPOS_ALUNO if campo in pedidos)
+
+# As consultas de leitura recebem apenas colunas de CAMPOS_ALUNO (validadas por campos_pedidos):
+# com poucas colunas, o MySQL pode responder só a partir de um índice que as cubra
+def sql_obter_aluno(campos=CAMPOS_ALUNO):
+    return f"""
+    SELECT {', '.join(campos)}, versao
+    FROM alunos
+    WHERE id = %s
+"""
+
+def sql_listar_apos_id(campos=CAMPOS_ALUNO):
+    return f"""
+    SELECT {', '.join(campos)}
+    FROM alunos
+    WHERE id > %s
+    ORDER BY id
+    LIMIT %s
+"""
+
+def sql_listar_pagina(campos=CAMPOS_ALUNO):
+    return f"""
+    SELECT {', '.join(campos)}
+    FROM alunos
+    ORDER BY id
+    LIMIT %s OFFSET %s
+"""
+
+# Formatos das leituras de alunos em lote (listagem e multi-get), negociados pelo Accept.
+# Os formatos tabulares devolvem {"columns": [...], "rows": [[...], ...]}: os nomes das
+# colunas não se repetem em cada aluno e as linhas vêm diretamente dos tuplos do cursor.
+TIPO_JSON = 'application/json'
+TIPO_COLUNAR = 'application/vnd.escola.colunar+json'
+TIPOS_MSGPACK = ('application/msgpack', 'application/x-msgpack')
+# O JSON vem primeiro: é o escolhido sem Accept ou com */*
+FORMATOS_RESPOSTA = (TIPO_JSON, TIPO_COLUNAR) + (TIPOS_MSGPACK if msgpack else ())
+
+def escolher_formato(accept):
+    """
+    Formato da resposta a partir do Accept do pedido (request.accept_mimetypes).
+    Se nenhum formato disponível for pedido (ex.: o text/html de um navegador), responde
+    em JSON, como antes da negociação; 406 só se o cliente recusar o JSON (q=0).
+    """
+    if not accept:
+        # Sem Accept, o cliente aceita qualquer formato
+        return TIPO_JSON
+    formato = accept.best_match(FORMATOS_RESPOSTA)
+    if formato is not None:
+        return formato
+    if any(valor == TIPO_JSON and qualidade == 0 for valor, qualidade in accept):
+        abort(406, description=f"Formatos disponíveis: {', '.join(FORMATOS_RESPOSTA)}")
+    return TIPO_JSON
+
+def codificar_msgpack(corpo):
+    return msgpack.packb(corpo, use_bin_type=True)
+
+# Multi-get (GET /?ids= e POST /lookup): coluna procurada por cada tipo de chave
+CHAVES_LOOKUP = {'ids': 'id', 'matriculas': 'matricula'}
+
+def chaves_lookup(valores, tipo, maximo):
+    """
+    Valida as chaves de um multi-get ('ids' ou 'matriculas') e devolve-as sem
+    repetições, pela ordem pedida. Aceita uma lista ou um texto separado por vírgulas.
+    """
+    if isinstance(valores, str):
+        valores = [valor.strip() for valor in valores.split(',') if valor.strip()]
+    if not isinstance(valores, list) or not valores:
+        abort(400, description=f"'{tipo}' deve ser uma lista não vazia")
+    if len(valores) > maximo:
+        abort(400, description=f"No máximo {maximo} chaves por pedido em '{tipo}'")
+    chaves = []
+    for valor in valores:
+        texto = str(valor).strip()
+        if isinstance(valor, bool) or not texto.isdigit():
+            abort(400, description=f"Valor inválido em '{tipo}': {valor!r}")
+        chaves.append(int(texto) if tipo == 'ids' else texto)
+    return list(dict.fromkeys(chaves))
+
+def sql_obter_varios(coluna, quantidade, campos=CAMPOS_ALUNO):
+    """Um único SELECT ... WHERE coluna IN (...) para todas as chaves de um multi-get."""
+    colunas = campos if coluna in campos else campos + (coluna,)
+    marcadores = ', '.join(['%s'] * quantidade)
+    return f"SELECT {', '.join(colunas)} FROM alunos WHERE {coluna} IN ({marcadores})"
+
+def resultado_lookup(linhas, chaves, coluna, campos=CAMPOS_ALUNO, tabular=False):
+    """
+    Corpo da resposta de um multi-get: os alunos pela ordem das chaves pedidas
+    e as chaves sem aluno em 'nao_encontrados'. Com 'tabular', as linhas são os
+    tuplos de sql_obter_varios e o corpo usa 'columns'/'rows'.
+    """
+    if tabular:
+        posicao = campos.index(coluna) if coluna in campos else len(campos)
+        por_chave = {linha[posicao]: tuple(linha[:len(campos)]) for linha in linhas}
+    else:
+        por_chave = {linha[coluna]: linha for linha in linhas}
+    alunos = []
+    nao_encontrados = []
+    for chave in chaves:
+        aluno = por_chave.get(chave)
+        if aluno is None:
+            nao_encontrados.append(chave)
+            continue
+        if not tabular and coluna not in campos:
+            aluno = {campo: aluno[campo] for campo in campos}
+        alunos.append(aluno)
+    resposta = {'sucesso': True}
+    resposta.update({'columns': list(campos), 'rows': alunos} if tabular else {'alunos': alunos})
+    resposta['nao_encontrados'] = nao_encontrados
+    return resposta
+
+def parametros_listagem(args):
+    """
+    (por_pagina, after_id, pagina, campos) da listagem: com 'cursor' ou 'after_id' a
+    paginação é keyset e 'pagina' é None; senão é por OFFSET a partir de 'page'.
+    """
+    per_page = args.get('per_page', 10, type=int)
+    after_id = args.get('after_id', type=int)
+    if args.get('cursor'):
+        after_id = decodificar_cursor(args['cursor'])
+    page = args.get('page', 1, type=int) if after_id is None else None
+    return per_page, after_id, page, campos_pedidos(args)
+
+def corpo_aluno(aluno_id, aluno, campos=CAMPOS_ALUNO):
+    """(corpo, ETag) de GET /<id> a partir da linha lida (com a coluna 'versao', retirada do corpo)."""
+    etag = etag_aluno(aluno_id, aluno.pop('versao'), campos)
+    return {'sucesso': True, 'aluno': aluno}, etag
+
+def etag_aluno(aluno_id, versao, campos=CAMPOS_ALUNO):
+    """
+    ETag forte de um aluno, derivado da versão da linha. Com ?fields= o corpo é outro,
+    por isso o ETag leva também a projeção ("aluno-1-v3-p<hash>"); versao_esperada
+    lê a versão de qualquer um deles.
+    """
+    if campos == CAMPOS_ALUNO:
+        return f"aluno-{aluno_id}-v{versao}"
+    return f"aluno-{aluno_id}-v{versao}-p{hashlib.sha1(','.join(campos).encode('utf-8')).hexdigest()[:8]}"
+
+def etag_listagem(versao, args, formato=None):
+    """ETag forte de uma listagem: versão da tabela, parâmetros do pedido e formato negociado."""
+    parametros = urlencode(sorted(args.items(multi=True)))
+    if formato and formato != TIPO_JSON:
+        parametros += f"#{formato}"
+    return f"alunos-v{versao}-{hashlib.sha1(parametros.encode('utf-8')).hexdigest()[:16]}"
+
+# Sufixos que compressao.py acrescenta ao ETag das respostas comprimidas ("aluno-1-v3-gzip"):
+# os bytes enviados são outros, por isso o ETag forte também tem de ser outro
+CODIFICACOES_ETAG = ('gzip', 'zstd', 'br')
+
+def etag_sem_codificacao(etag):
+    """ETag do recurso, sem o sufixo da codificação com que a resposta foi comprimida."""
+    for codificacao in CODIFICACOES_ETAG:
+        if etag.endswith(f"-{codificacao}"):
+            return etag[:-len(codificacao) - 1]
+    return etag
+
+def etag_corresponde(etags, etag):
+    """Se o If-None-Match 'etags' contém 'etag', em qualquer codificação."""
+    return etags.star_tag or any(etag_sem_codificacao(enviado) == etag for enviado in etags.as_set())
+
+# Respostas das leituras: 'app' é a aplicação Flask ou Quart atual (current_app), que
+# fornece a classe de resposta e o serializador JSON
+def com_etag(resposta, etag):
+    """Anexa o ETag e obriga o cliente a revalidar (If-None-Match) antes de reutilizar a resposta."""
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    return resposta
+
+def nao_modificado(app, etag, formato=None):
+    """Resposta 304 sem corpo para um If-None-Match que ainda corresponde."""
+    resposta = app.response_class(status=304)
+    if formato:
+        resposta.vary.add('Accept')
+    return com_etag(resposta, etag)
+
+def renderizar(app, corpo, formato=None):
+    """
+    Serializa o corpo: JSON por omissão ou, nas rotas que negociam o formato
+    (escolher_formato), JSON colunar ou MessagePack.
+    """
+    if formato in TIPOS_MSGPACK:
+        resposta = app.response_class(codificar_msgpack(corpo), mimetype=formato)
+    else:
+        resposta = app.json.response(corpo)
+        if formato == TIPO_COLUNAR:
+            resposta.mimetype = TIPO_COLUNAR
+    if formato:
+        # O corpo depende do Accept: caches intermédias não podem misturar formatos
+        resposta.vary.add('Accept')
+    return resposta
+
+def resposta_do_cache(app, em_cache, if_none_match, formato=None):
+    """Resposta a partir de uma entrada (corpo, etag) do cache de respostas: 304 se o ETag corresponder."""
+    payload, etag = em_cache
+    if etag and etag_corresponde(if_none_match, etag):
+        return nao_modificado(app, etag, formato)
+    resposta = renderizar(app, payload, formato)
+    return (com_etag(resposta, etag) if etag else resposta), 200
+
+def versao_esperada(if_match, aluno_id):
+    """
+    Lê o If-Match de uma escrita (ETag devolvido por GET /<id>) e devolve a versão
+    que a linha deve ter, ou None se o pedido não usar controlo de concorrência.
+    Um ETag que não é deste aluno nunca pode corresponder: responde logo 412.
+    """
+    if not if_match or if_match.star_tag:
+        return None
+    for etag in if_match.as_set():
+        correspondencia = re.fullmatch(rf"aluno-{aluno_id}-v(\d+)(?:-p[0-9a-f]+)?", etag_sem_codificacao(etag))
+        if correspondencia:
+            return int(correspondencia.group(1))
+    abort(412, description="If-Match não corresponde a este aluno")
+
+def falha_escrita_condicional(existe):
+    """
+    Chamada quando um UPDATE/DELETE não afetou nenhuma linha: 'existe' indica se o
+    aluno ainda existe (lido com SQL_VERSAO_ALUNO). Se existe, a versão do If-Match
+    já não é a atual (412); senão, 404.
+    """
+    if existe:
+        abort(412, description="O aluno foi alterado por outro pedido; obtenha-o novamente e repita a operação")
+    abort(404, description="Aluno não encontrado")
+
+def montar_atualizacao(aluno_id, data, versao=None):
+    """Constrói o UPDATE que altera apenas as colunas enviadas (e a versão da linha)."""
+    campos = []
+    valores = []
+
+    # Itera sobre os campos esperados e adiciona-os à query se estiverem nos dados recebidos
+    for campo in ['nome', 'matricula', 'curso', 'email']:
+        if campo in data:
+            campos.append(f"{campo} = %s")
+            valores.append(data[campo].strip())
+
+    if not campos:
+        abort(400, description="Nenhum dado fornecido para atualização")
+
+    campos.append("versao = versao + 1") # Invalida o ETag do aluno
+    query = f"UPDATE alunos SET {', '.join(campos)} WHERE id = %s"
+    valores.append(aluno_id) # Adiciona o ID para a cláusula WHERE
+    if versao is not None:
+        query += " AND versao = %s"
+        valores.append(versao)
+    return query, valores
+
+def montar_exclusao(aluno_id, versao=None):
+    """Constrói o DELETE do aluno, condicionado à versão se o pedido usar If-Match."""
+    query = "DELETE FROM alunos WHERE id = %s"
+    valores = [aluno_id]
+    if versao is not None:
+        query += " AND versao = %s"
+        valores.append(versao)
+    return query, valores
+
+# Etiquetas do cache de respostas: cada escrita invalida apenas as entradas afetadas
+TAG_LISTA = 'alunos:lista'
+TAG_BUSCA = 'alunos:busca'
+
+def tag_aluno(aluno_id):
+    return f"aluno:{aluno_id}"
+
+def chave_cache_aluno(aluno_id, campos=CAMPOS_ALUNO):
+    """Chave do cache de GET /<id>: uma entrada por projeção, todas com a etiqueta do aluno."""
+    if campos == CAMPOS_ALUNO:
+        return tag_aluno(aluno_id)
+    return f"{tag_aluno(aluno_id)}?fields={','.join(campos)}"
+
+def chave_cache(rota, args, formato=None):
+    """Chave do cache de respostas: rota mais os parâmetros do pedido, em ordem estável (e o formato, se não for JSON)."""
+    chave = f"{rota}?{urlencode(sorted(args.items(multi=True)))}"
+    return f"{chave}#{formato}" if formato and formato != TIPO_JSON else chave
+
+def codificar_cursor(ultimo_id, **extra):
+    """Gera um cursor opaco (base64 URL-safe) a partir do último ID devolvido e de chaves extra de ordenação."""
+    payload = json.dumps({'id': ultimo_id, **extra}, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+def ler_cursor(cursor):
+    """Devolve o conteúdo de um cursor gerado por codificar_cursor() (com 'id' sempre inteiro)."""
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        payload['id'] = int(payload['id'])
+        return payload
+    except (ValueError, TypeError, KeyError):
+        abort(400, description="Cursor de paginação inválido")
+
+def decodificar_cursor(cursor):
+    """Extrai o último ID de um cursor gerado por codificar_cursor()."""
+    return ler_cursor(cursor)['id']
+
+def escapar_like(texto):
+    """Escapa os caracteres especiais do LIKE para que o texto seja procurado literalmente."""
+    return texto.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def termos_fulltext(texto):
+    """
+    Converte o texto pesquisado numa expressão FULLTEXT em modo booleano,
+    com pesquisa por prefixo em cada palavra (ex.: "ana sil" -> "ana* sil*").
+    Os operadores booleanos digitados pelo utilizador são descartados.
+    """
+    palavras = re.findall(r'\w+', texto, flags=re.UNICODE)
+    return ' '.join(f"{palavra}*" for palavra in palavras)
+
+# Pesos de relevância das correspondências por prefixo (somados à pontuação FULLTEXT)
+PESO_MATRICULA = 10
+PESO_EMAIL = 5
+LIMITE_BUSCA_MAXIMO = 100
+
+def parametros_busca(args):
+    """Lê e valida q, limit e cursor da pesquisa; devolve (q, limite, posicao)."""
+    q = args.get('q', '').strip()
+    if not q:
+        abort(400, description="Parâmetro 'q' é obrigatório")
+    limite = min(max(args.get('limit', 20, type=int), 1), LIMITE_BUSCA_MAXIMO)
+    cursor_param = args.get('cursor')
+    posicao = ler_cursor(cursor_param) if cursor_param else None
+    if posicao is not None and not isinstance(posicao.get('r'), (int, float)):
+        abort(400, description="Cursor de paginação inválido")
+    return q, limite, posicao
+
+def consulta_busca(q, limite, posicao=None):
+    """
+    Constrói a pesquisa por relevância. Cada critério é resolvido pelo seu próprio
+    índice e os resultados são unidos:
+    - nome/curso: índice FULLTEXT (ft_alunos_nome_curso), com prefixo por palavra;
+    - matrícula: prefixo no índice B-tree único (apenas se 'q' for numérico);
+    - email: prefixo no índice B-tree único.
+    Devolve (query, params); pede uma linha extra para saber se existe próxima página.
+    """
+    ramos = []
+    params = []
+    expressao_ft = termos_fulltext(q)
+    if expressao_ft:
+        ramos.append(
+            "SELECT id, MATCH(nome, curso) AGAINST (%s IN BOOLEAN MODE) AS pontuacao "
+            "FROM alunos WHERE MATCH(nome, curso) AGAINST (%s IN BOOLEAN MODE)"
+        )
+        params += [expressao_ft, expressao_ft]
+    if q.isdigit():
+        ramos.append(f"SELECT id, {PESO_MATRICULA}E0 AS pontuacao FROM alunos WHERE matricula LIKE %s")
+        params.append(escapar_like(q) + '%')
+    ramos.append(f"SELECT id, {PESO_EMAIL}E0 AS pontuacao FROM alunos WHERE email LIKE %s")
+    params.append(escapar_like(q.lower()) + '%')
+
+    query = f"""
+        SELECT a.id, a.nome, a.matricula, a.curso, a.email, SUM(r.pontuacao) AS relevancia
+        FROM ({' UNION ALL '.join(ramos)}) AS r
+        JOIN alunos a ON a.id = r.id
+        GROUP BY a.id
+    """
+    if posicao is not None:
+        query += " HAVING relevancia < %s OR (relevancia = %s AND a.id > %s)"
+        params += [posicao['r'], posicao['r'], posicao['id']]
+    query += " ORDER BY relevancia DESC, a.id LIMIT %s"
+    params.append(limite + 1)
+    return query, params
+
+def resultado_busca(alunos, q, limite):
+    """Corpo da resposta da pesquisa a partir das linhas devolvidas por consulta_busca()."""
+    tem_mais = len(alunos) > limite
+    alunos = alunos[:limite]
+    ultimo = alunos[-1] if alunos else None
+    return {
+        'sucesso': True,
+        'alunos': alunos,
+        'q': q,
+        'limite': limite,
+        'next_cursor': codificar_cursor(ultimo['id'], r=ultimo['relevancia']) if tem_mais else None
+    }
+
+def corpo_listagem(alunos, tem_mais, total, modo, por_pagina, pagina=None, colunas=None):
+    """
+    Corpo da resposta da listagem; 'pagina' só existe na paginação por OFFSET.
+    Com 'colunas', os alunos são tuplos por essa ordem (o 'id' primeiro) e o
+    corpo usa o formato tabular 'columns'/'rows'.
+    """
+    resposta = {'sucesso': True}
+    if colunas is None:
+        resposta['alunos'] = alunos
+        ultimo_id = alunos[-1]['id'] if alunos else None
+    else:
+        resposta['columns'] = list(colunas)
+        resposta['rows'] = alunos
+        ultimo_id = alunos[-1][0] if alunos else None
+    resposta.update({
+        'total': total,
+        'contagem': modo,
+        'por_pagina': por_pagina,
+        # Cursor opaco para continuar a listagem a partir do último aluno devolvido
+        'next_cursor': codificar_cursor(ultimo_id) if alunos and tem_mais else None
+    })
+    if pagina is not None:
+        resposta['pagina'] = pagina
+    return resposta
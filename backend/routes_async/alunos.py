@@ -0,0 +1,377 @@
+from quart import Blueprint, request, jsonify, abort, current_app
+from werkzeug.exceptions import HTTPException
+import aiomysql
+import logging
+
+# Variante assíncrona de routes/alunos.py: a validação, as consultas e os formatos
+# de resposta vêm de routes/comum.py, por isso o contrato é o mesmo nas duas APIs
+from routes_async.auth import token_required, admin_required
+from database_async import db_connection_async
+from routes.comum import (
+    envelope_erro, validar_aluno, valores_aluno, modo_contagem as ler_modo_contagem,
+    SQL_INSERIR_ALUNO, SQL_CONTAR_ALUNOS, SQL_VERSAO_TABELA, SQL_INCREMENTAR_VERSAO_TABELA,
+    SQL_VERSAO_ALUNO, sql_obter_aluno, sql_listar_apos_id, sql_listar_pagina, campos_pedidos,
+    etag_aluno, etag_listagem, etag_corresponde, versao_esperada, falha_escrita_condicional,
+    montar_atualizacao, montar_exclusao, TAG_LISTA, TAG_BUSCA, tag_aluno, chave_cache, chave_cache_aluno,
+    parametros_listagem, parametros_busca, consulta_busca, resultado_busca, corpo_listagem, corpo_aluno,
+    CHAVES_LOOKUP, chaves_lookup, sql_obter_varios, resultado_lookup, TIPO_JSON, escolher_formato,
+    com_etag, nao_modificado, renderizar, resposta_do_cache
+)
+
+logger = logging.getLogger(__name__)
+
+alunos_bp = Blueprint('alunos', __name__, url_prefix='/api/v1/alunos/')
+
+@alunos_bp.errorhandler(HTTPException)
+async def handle_exception(e):
+    """Handler global para exceções HTTP dentro do blueprint de alunos"""
+    logger.error(f"Erro HTTP {e.code}: {e.description}")
+    return jsonify(envelope_erro(e.code, e.description)), e.code
+
+@alunos_bp.errorhandler(Exception)
+async def handle_unexpected_error(e):
+    """Handler para erros inesperados dentro do blueprint de alunos"""
+    logger.exception("Erro inesperado no blueprint de alunos")
+    return jsonify(envelope_erro(500, "Ocorreu um erro interno no servidor")), 500
+
+def get_contador():
+    return current_app.extensions['contador_alunos']
+
+def get_cache_respostas():
+    return current_app.extensions['cache_respostas']
+
+async def contar_alunos(cursor, modo):
+    """Devolve o total de alunos conforme o modo pedido (ver routes/alunos.py)."""
+    if modo == 'none':
+        return None
+
+    contador = get_contador()
+    if modo == 'estimate':
+        total = contador.obter()
+        if total is not None:
+            return total
+
+    await cursor.execute(SQL_CONTAR_ALUNOS)
+    total = (await cursor.fetchone())['total']
+    contador.definir(total)
+    return total
+
+async def versao_tabela(cursor):
+    """Lê a versão atual da tabela alunos (incrementada a cada escrita)."""
+    await cursor.execute(SQL_VERSAO_TABELA)
+    linha = await cursor.fetchone()
+    return linha['versao'] if linha else 0
+
+def resposta_em_cache(chave, formato=None):
+    """Devolve a resposta guardada em cache (304 se o ETag corresponder), ou None."""
+    em_cache = get_cache_respostas().obter(chave)
+    if em_cache is None:
+        return None
+    return resposta_do_cache(current_app, em_cache, request.if_none_match, formato)
+
+async def aluno_existe(cursor, aluno_id, versao):
+    """Só no caminho de erro de uma escrita condicional: lê a versão atual para distinguir 404 de 412."""
+    if versao is None:
+        return False
+    await cursor.execute(SQL_VERSAO_ALUNO, (aluno_id,))
+    return await cursor.fetchone() is not None
+
+@alunos_bp.route('/', methods=['GET'])
+@token_required
+async def listar_alunos():
+    """Lista os alunos ordenados por ID, com paginação por OFFSET ou por cursor (keyset)."""
+    formato = escolher_formato(request.accept_mimetypes)
+    if 'ids' in request.args:
+        return await obter_varios_alunos(
+            'ids', request.args['ids'], campos_pedidos(request.args), formato,
+            chave=chave_cache('ids', request.args, formato)
+        )
+
+    per_page, after_id, page, campos = parametros_listagem(request.args)
+    modo_contagem = ler_modo_contagem(request.args)
+
+    chave = chave_cache('listar', request.args, formato) if modo_contagem != 'exact' else None
+    if chave:
+        em_cache = resposta_em_cache(chave, formato)
+        if em_cache:
+            return em_cache
+    # Antes da leitura: se uma escrita invalidar a lista entretanto, esta resposta não é guardada
+    marca = get_cache_respostas().marca()
+
+    # Nos formatos tabulares as linhas seguem como tuplos do cursor, sem criar dicionários
+    tabular = formato != TIPO_JSON
+    try:
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                etag = etag_listagem(await versao_tabela(cursor), request.args, formato)
+                if etag_corresponde(request.if_none_match, etag):
+                    return nao_modificado(current_app, etag, formato)
+
+                async with conn.cursor(aiomysql.Cursor if tabular else aiomysql.DictCursor) as cursor_alunos:
+                    if after_id is not None:
+                        await cursor_alunos.execute(sql_listar_apos_id(campos), (after_id, per_page + 1))
+                        alunos = await cursor_alunos.fetchall()
+                        tem_mais = len(alunos) > per_page
+                        alunos = alunos[:per_page]
+                    else:
+                        await cursor_alunos.execute(sql_listar_pagina(campos), (per_page, (page - 1) * per_page))
+                        alunos = await cursor_alunos.fetchall()
+                        tem_mais = len(alunos) == per_page
+
+                total = await contar_alunos(cursor, modo_contagem)
+
+        resposta = corpo_listagem(
+            list(alunos), tem_mais, total, modo_contagem, per_page, pagina=page,
+            colunas=campos if tabular else None
+        )
+        if chave:
+            get_cache_respostas().guardar(
+                chave, (resposta, etag),
+                tags=[TAG_LISTA] + [tag_aluno(aluno[0] if tabular else aluno['id']) for aluno in alunos],
+                desde=marca
+            )
+        return com_etag(renderizar(current_app, resposta, formato), etag), 200
+
+    except HTTPException:
+        raise
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao listar alunos: {err}")
+        abort(500, description=f"Erro no banco de dados ao listar alunos: {err}")
+    except Exception:
+        logger.exception("Erro inesperado ao listar alunos")
+        abort(500, description="Erro ao listar alunos")
+
+async def obter_varios_alunos(tipo, valores, campos, formato, chave=None):
+    """Multi-get numa única consulta IN (...); ver obter_varios_alunos em routes/alunos.py."""
+    if chave:
+        em_cache = resposta_em_cache(chave, formato)
+        if em_cache:
+            return em_cache
+    marca = get_cache_respostas().marca()
+
+    chaves = chaves_lookup(valores, tipo, current_app.config['ALUNOS_LOOKUP_MAX_KEYS'])
+    coluna = CHAVES_LOOKUP[tipo]
+    tabular = formato != TIPO_JSON
+    try:
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.Cursor if tabular else aiomysql.DictCursor) as cursor:
+                await cursor.execute(sql_obter_varios(coluna, len(chaves), campos), chaves)
+                linhas = await cursor.fetchall()
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao obter vários alunos: {err}")
+        abort(500, description=f"Erro no banco de dados ao obter alunos: {err}")
+
+    resposta = resultado_lookup(linhas, chaves, coluna, campos, tabular)
+    if chave:
+        ids = [linha[0] for linha in resposta['rows']] if tabular else [aluno['id'] for aluno in resposta['alunos']]
+        get_cache_respostas().guardar(
+            chave, (resposta, None), tags=[TAG_LISTA] + [tag_aluno(i) for i in ids], desde=marca
+        )
+    return renderizar(current_app, resposta, formato), 200
+
+@alunos_bp.route('/lookup', methods=['POST'])
+@token_required
+async def procurar_alunos():
+    """Corpo {"ids": [...]} ou {"matriculas": [...]}, com até ALUNOS_LOOKUP_MAX_KEYS chaves."""
+    formato = escolher_formato(request.accept_mimetypes)
+    data = await request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="Corpo JSON com 'ids' ou 'matriculas' é obrigatório")
+    tipos = [tipo for tipo in CHAVES_LOOKUP if tipo in data]
+    if len(tipos) != 1:
+        abort(400, description="Envie exatamente um de 'ids' ou 'matriculas'")
+    return await obter_varios_alunos(tipos[0], data[tipos[0]], campos_pedidos(request.args), formato)
+
+@alunos_bp.route('/search', methods=['GET'])
+@token_required
+async def buscar_alunos():
+    """Pesquisa alunos ordenados por relevância (ver consulta_busca em routes/comum.py)."""
+    q, limite, posicao = parametros_busca(request.args)
+
+    chave = chave_cache('buscar', request.args)
+    em_cache = resposta_em_cache(chave)
+    if em_cache:
+        return em_cache
+    marca = get_cache_respostas().marca()
+
+    query, params = consulta_busca(q, limite, posicao)
+    try:
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, params)
+                alunos = await cursor.fetchall()
+
+        resposta = resultado_busca(alunos, q, limite)
+        get_cache_respostas().guardar(chave, (resposta, None), tags=[TAG_BUSCA], desde=marca)
+        return jsonify(resposta), 200
+
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao pesquisar alunos: {err}")
+        abort(500, description=f"Erro no banco de dados ao pesquisar alunos: {err}")
+    except Exception:
+        logger.exception("Erro inesperado ao pesquisar alunos")
+        abort(500, description="Erro ao pesquisar alunos")
+
+@alunos_bp.route('/', methods=['POST'])
+@token_required
+@admin_required
+async def cadastrar_aluno():
+    """Cadastra um novo aluno."""
+    try:
+        data = await request.get_json()
+        validar_aluno(data, 'create')
+
+        async with db_connection_async() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(SQL_INSERIR_ALUNO, valores_aluno(data))
+                aluno_id = cursor.lastrowid
+                await cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+            await conn.commit()
+        get_contador().ajustar(+1)
+        get_cache_respostas().invalidar(TAG_LISTA, TAG_BUSCA)
+
+        logger.info(f"Aluno cadastrado com ID: {aluno_id}")
+        return jsonify({
+            'sucesso': True,
+            'mensagem': 'Aluno cadastrado com sucesso',
+            'id': aluno_id
+        }), 201
+
+    except HTTPException:
+        raise
+    except aiomysql.IntegrityError as e:
+        logger.error(f"Erro de integridade ao cadastrar aluno: {str(e)}")
+        abort(400, description="Matrícula ou email já cadastrados")
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao cadastrar aluno: {err}")
+        abort(500, description=f"Erro no banco de dados ao cadastrar aluno: {err}")
+    except Exception:
+        logger.exception("Erro inesperado ao cadastrar aluno")
+        abort(500, description="Erro ao cadastrar aluno")
+
+@alunos_bp.route('/<int:id>', methods=['GET'])
+@token_required
+async def obter_aluno(id):
+    """Obtém detalhes de um aluno específico (apenas os campos de ?fields=, se enviado)."""
+    campos = campos_pedidos(request.args)
+    chave = chave_cache_aluno(id, campos)
+    em_cache = resposta_em_cache(chave)
+    if em_cache:
+        return em_cache
+    marca = get_cache_respostas().marca()
+
+    try:
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                if request.if_none_match:
+                    # Revalidação: lê apenas a versão da linha, sem serializar o aluno
+                    await cursor.execute(SQL_VERSAO_ALUNO, (id,))
+                    linha = await cursor.fetchone()
+                    if not linha:
+                        abort(404, description="Aluno não encontrado")
+                    etag = etag_aluno(id, linha['versao'], campos)
+                    if etag_corresponde(request.if_none_match, etag):
+                        return nao_modificado(current_app, etag)
+
+                await cursor.execute(sql_obter_aluno(campos), (id,))
+                aluno = await cursor.fetchone()
+
+        if not aluno:
+            abort(404, description="Aluno não encontrado")
+
+        resposta, etag = corpo_aluno(id, aluno, campos)
+        get_cache_respostas().guardar(chave, (resposta, etag), tags=[tag_aluno(id)], desde=marca)
+        return com_etag(jsonify(resposta), etag), 200
+
+    except HTTPException:
+        raise
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao obter aluno {id}: {err}")
+        abort(500, description=f"Erro no banco de dados ao obter aluno: {err}")
+    except Exception:
+        logger.exception(f"Erro inesperado ao obter aluno {id}")
+        abort(500, description="Erro ao obter aluno")
+
+@alunos_bp.route('/<int:id>', methods=['PUT', 'PATCH'])
+@token_required
+@admin_required
+async def editar_aluno(id):
+    """Atualiza as colunas enviadas num único UPDATE, condicionado ao If-Match se presente."""
+    try:
+        data = await request.get_json()
+        validar_aluno(data, 'update')
+        versao = versao_esperada(request.if_match, id)
+        query, valores = montar_atualizacao(id, data, versao)
+
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, valores)
+                if cursor.rowcount == 0:
+                    await conn.rollback()
+                    falha_escrita_condicional(await aluno_existe(cursor, id, versao))
+                await cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+            await conn.commit()
+        get_cache_respostas().invalidar(tag_aluno(id), TAG_BUSCA)
+
+        logger.info(f"Aluno {id} atualizado")
+        resposta = jsonify({
+            'sucesso': True,
+            'mensagem': 'Aluno atualizado com sucesso'
+        })
+        if versao is not None:
+            com_etag(resposta, etag_aluno(id, versao + 1))
+        return resposta, 200
+
+    except HTTPException:
+        raise
+    except aiomysql.IntegrityError as e:
+        logger.error(f"Erro de integridade ao atualizar aluno: {str(e)}")
+        abort(400, description="Matrícula ou email já cadastrados")
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao atualizar aluno {id}: {err}")
+        abort(500, description=f"Erro no banco de dados ao atualizar aluno: {err}")
+    except Exception:
+        logger.exception(f"Erro inesperado ao atualizar aluno {id}")
+        abort(500, description="Erro ao atualizar aluno")
+
+@alunos_bp.route('/<int:id>', methods=['DELETE'])
+@token_required
+@admin_required
+async def excluir_aluno(id):
+    """Remove um aluno num único DELETE, condicionado ao If-Match se presente."""
+    try:
+        versao = versao_esperada(request.if_match, id)
+        query, valores = montar_exclusao(id, versao)
+
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute(query, valores)
+                if cursor.rowcount == 0:
+                    await conn.rollback()
+                    falha_escrita_condicional(await aluno_existe(cursor, id, versao))
+                await cursor.execute(SQL_INCREMENTAR_VERSAO_TABELA)
+            await conn.commit()
+        get_contador().ajustar(-1)
+        get_cache_respostas().invalidar(tag_aluno(id), TAG_LISTA, TAG_BUSCA)
+
+        logger.info(f"Aluno {id} removido")
+        return jsonify({
+            'sucesso': True,
+            'mensagem': 'Aluno excluído com sucesso'
+        }), 200
+
+    except HTTPException:
+        raise
+    except aiomysql.Error as err:
+        logger.error(f"Erro MySQL ao excluir aluno {id}: {err}")
+        abort(500, description=f"Erro no banco de dados ao excluir aluno: {err}")
+    except Exception:
+        logger.exception(f"Erro inesperado ao excluir aluno {id}")
+        abort(500, description="Erro ao excluir aluno")
+
+@alunos_bp.route('/cache', methods=['GET'])
+@token_required
+@admin_required
+async def estatisticas_cache():
+    """Expõe os contadores do cache de respostas (hits, misses, invalidações) deste processo."""
+    return jsonify(get_cache_respostas().estatisticas()), 200
@@ -0,0 +1,248 @@
+from quart import Blueprint, request, jsonify, current_app
+import aiomysql
+from datetime import datetime
+import logging
+from functools import wraps
+
+# Variante assíncrona de routes/auth.py: mesmas rotas e respostas, sem bloquear o event loop
+from database_async import db_connection_async
+from auth.senhas import ServicoSobrecarregado
+from auth.jwt_handler import parece_jwt
+from auth.sessoes import hash_sessao, SQL_CRIAR_SESSAO, SQL_OBTER_SESSAO, SQL_TERMINAR_SESSAO
+from auth.autenticacao import (
+    RecusaAutenticacao, MSG_TOKEN_INVALIDO, token_bearer, claims_de_acesso, validar_sessao_opaca,
+    identificar, exigir_admin, credenciais, abrir_sessao, claims_de_renovacao, renovar, claims_ou_nada
+)
+
+logger = logging.getLogger(__name__)
+
+auth_bp = Blueprint('auth', __name__, url_prefix='/api/v1/auth')
+
+def get_senhas():
+    return current_app.extensions['senhas']
+
+def get_lista_revogacao():
+    return current_app.extensions['lista_revogacao']
+
+def get_token_cache():
+    return current_app.extensions['token_cache']
+
+async def obter_sessao(token_hash):
+    async with db_connection_async() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(SQL_OBTER_SESSAO, (token_hash,))
+            return await cursor.fetchone()
+
+async def terminar_sessao(token_hash):
+    async with db_connection_async() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(SQL_TERMINAR_SESSAO, (token_hash,))
+            terminadas = cursor.rowcount
+        await conn.commit()
+    return terminadas > 0
+
+def servico_sobrecarregado():
+    """Resposta 503 imediata quando a fila de hashing de senhas está cheia."""
+    logger.warning("Fila de hashing de senhas cheia: pedido recusado com 503")
+    resposta = jsonify({"message": "Servidor ocupado. Tente novamente dentro de instantes."})
+    resposta.headers['Retry-After'] = '1'
+    return resposta, 503
+
+def recusar(e):
+    """Resposta {"message": ...} de uma RecusaAutenticacao."""
+    return jsonify({"message": e.mensagem}), e.codigo
+
+@auth_bp.route('/register', methods=['POST'])
+async def register_user():
+    """Regista um novo utilizador (ver routes/auth.py)."""
+    data = await request.get_json()
+    try:
+        username, password = credenciais(data)
+    except RecusaAutenticacao as e:
+        return recusar(e)
+    role = data.get('role', 'user') # Padrão para 'user', pode ser 'admin'
+
+    try:
+        # O bcrypt corre no pool dedicado; o loop continua a servir outros pedidos
+        hashed_password = await get_senhas().gerar_hash_async(password)
+
+        async with db_connection_async() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
+                    (username, hashed_password, role)
+                )
+            await conn.commit()
+        logger.info(f"Utilizador '{username}' registado com sucesso com a função '{role}'.")
+        return jsonify({"message": "Utilizador registado com sucesso"}), 201
+    except aiomysql.IntegrityError:
+        # Erro de integridade ocorre se o username já existir (UNIQUE constraint)
+        return jsonify({"message": "Nome de utilizador já existe"}), 409
+    except ServicoSobrecarregado:
+        return servico_sobrecarregado()
+    except Exception:
+        logger.exception("Erro ao registar utilizador:")
+        return jsonify({"message": "Erro interno ao registar utilizador"}), 500
+
+@auth_bp.route('/login', methods=['POST'])
+async def login_user():
+    """Autentica um utilizador e emite os tokens de acesso e de renovação."""
+    try:
+        username, password = credenciais(await request.get_json())
+    except RecusaAutenticacao as e:
+        return recusar(e)
+
+    try:
+        async with db_connection_async() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cursor:
+                await cursor.execute("SELECT id, username, password_hash, role FROM users WHERE username = %s", (username,))
+                user = await cursor.fetchone()
+
+        senhas = get_senhas()
+        if not user or not await senhas.verificar_async(password, user['password_hash']):
+            return jsonify({"message": "Nome de utilizador ou senha inválidos"}), 401
+
+        # Se o custo do bcrypt configurado mudou, regrava o hash com o novo custo
+        if senhas.precisa_atualizar(user['password_hash']):
+            novo_hash = await senhas.gerar_hash_async(password)
+            async with db_connection_async() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute("UPDATE users SET password_hash = %s WHERE id = %s", (novo_hash, user['id']))
+                await conn.commit()
+            logger.info(f"Hash da senha de '{username}' atualizado para o custo {senhas.rounds}.")
+
+        # Cada login abre uma sessão nova, sem tocar na linha do utilizador
+        token_hash, expira_em, corpo = abrir_sessao(user, current_app.config)
+        async with db_connection_async() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(SQL_CRIAR_SESSAO, (token_hash, user['id'], datetime.now(), expira_em))
+            await conn.commit()
+        logger.info(f"Utilizador '{username}' autenticado com sucesso. Token gerado.")
+        return jsonify(corpo), 200
+    except ServicoSobrecarregado:
+        return servico_sobrecarregado()
+    except Exception:
+        logger.exception("Erro durante o login:")
+        return jsonify({"message": "Erro interno durante o login"}), 500
+
+@auth_bp.route('/refresh', methods=['POST'])
+async def refresh_token():
+    """Emite um novo token de acesso a partir de um token de renovação válido."""
+    try:
+        claims = claims_de_renovacao(await request.get_json(silent=True), current_app.config)
+    except RecusaAutenticacao as e:
+        return recusar(e)
+    if await get_lista_revogacao().revogado(claims['jti']):
+        return jsonify({"message": "Token de renovação revogado"}), 401
+
+    try:
+        if 'sid' in claims:
+            user = await obter_sessao(hash_sessao(claims['sid']))
+        else:
+            # Tokens de renovação emitidos antes das sessões: aceites até expirarem
+            async with db_connection_async() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cursor:
+                    await cursor.execute("SELECT id, username, role FROM users WHERE id = %s", (int(claims['sub']),))
+                    user = await cursor.fetchone()
+        return jsonify(renovar(claims, user, current_app.config)), 200
+    except RecusaAutenticacao as e:
+        return recusar(e)
+    except Exception:
+        logger.exception("Erro ao renovar token:")
+        return jsonify({"message": "Erro interno ao renovar token"}), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+async def logout_user():
+    """Revoga o token de acesso e termina a sua sessão (e a do token de renovação, se enviado no corpo)."""
+    try:
+        token = token_bearer(request.headers.get('Authorization'), "Token de autenticação ausente ou mal formatado")
+    except RecusaAutenticacao as e:
+        return recusar(e)
+
+    if parece_jwt(token):
+        claims = claims_ou_nada(token, 'access', current_app.config)
+        if claims is None:
+            return jsonify({"message": "Token inválido ou já expirado"}), 401
+        try:
+            lista = get_lista_revogacao()
+            await lista.revogar(claims)
+            if 'sid' in claims:
+                await terminar_sessao(hash_sessao(claims['sid']))
+            refresh = (await request.get_json(silent=True) or {}).get('refresh_token')
+            # Já expirado ou inválido: nada a revogar
+            claims_refresh = claims_ou_nada(refresh, 'refresh', current_app.config) if refresh else None
+            if claims_refresh is not None:
+                if 'sid' in claims_refresh:
+                    await terminar_sessao(hash_sessao(claims_refresh['sid']))
+                else:
+                    await lista.revogar(claims_refresh)
+            logger.info("Token invalidado com sucesso.")
+            return jsonify({"message": "Logout bem-sucedido"}), 200
+        except Exception:
+            logger.exception("Erro durante o logout:")
+            return jsonify({"message": "Erro interno durante o logout"}), 500
+
+    # Tokens opacos emitidos antes dos tokens assinados, migrados de users.token para 'sessoes'
+    get_token_cache().evict(token)
+    try:
+        if await terminar_sessao(hash_sessao(token)):
+            logger.info("Token invalidado com sucesso.")
+            return jsonify({"message": "Logout bem-sucedido"}), 200
+        return jsonify({"message": "Token inválido ou já expirado"}), 401
+    except Exception:
+        logger.exception("Erro durante o logout:")
+        return jsonify({"message": "Erro interno durante o logout"}), 500
+
+def token_required(f):
+    """
+    Versão assíncrona do decorador de routes/auth.py: tokens assinados são
+    validados só com CPU; os tokens opacos antigos passam pelo cache e, se
+    necessário, por uma leitura da tabela 'sessoes' que não bloqueia o event loop.
+    """
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        try:
+            token = token_bearer(request.headers.get('Authorization'))
+
+            if parece_jwt(token):
+                claims = claims_de_acesso(token, current_app.config)
+                if await get_lista_revogacao().revogado(claims['jti']):
+                    raise RecusaAutenticacao(MSG_TOKEN_INVALIDO)
+                identificar(request, claims=claims)
+                return await f(*args, **kwargs)
+
+            cache = get_token_cache()
+            user = cache.get(token)
+            if user is None:
+                try:
+                    user = validar_sessao_opaca(await obter_sessao(hash_sessao(token)))
+                    cache.put(token, user)
+                except RecusaAutenticacao:
+                    raise
+                except Exception:
+                    logger.exception("Erro na validação do token:")
+                    return jsonify({"message": "Erro interno na validação do token"}), 500
+        except RecusaAutenticacao as e:
+            return recusar(e)
+
+        identificar(request, user=user)
+        return await f(*args, **kwargs)
+    return decorated
+
+def admin_required(f):
+    """Versão assíncrona de admin_required. Deve ser usado APÓS @token_required."""
+    @wraps(f)
+    async def decorated(*args, **kwargs):
+        try:
+            exigir_admin(request)
+        except RecusaAutenticacao as e:
+            return recusar(e)
+        return await f(*args, **kwargs)
+    return decorated
+
+@auth_bp.route('/token-cache', methods=['GET'])
+@token_required
+@admin_required
+async def token_cache_stats():
+    """Expõe os contadores do cache de tokens (hits, misses, tamanho) deste processo."""
+    return jsonify(get_token_cache().stats()), 200
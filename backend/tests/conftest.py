@@ -0,0 +1,86 @@
+"""
+Testes da API sobre o SQLite em memória (STORAGE_BACKEND=sqlite): cada teste
+recebe uma aplicação nova, com o banco vazio, sem precisar de um servidor MySQL.
+"""
+import os
+import tempfile
+
+import pytest
+
+# Lida por config.py ao criar a aplicação: tem de ser definida antes de importar app.py
+os.environ.update({
+    'STORAGE_BACKEND': 'sqlite',
+    'SQLITE_PATH': ':memory:',
+    'BCRYPT_EXECUTOR': 'thread',
+    'BCRYPT_ROUNDS': '4',   # O custo mínimo: os testes não medem o bcrypt
+    'LOG_ACCESS': '0',
+    'LOG_LEVEL': 'WARNING',
+    'SESSION_SWEEP_INTERVAL': '0',
+    'SECRET_KEY': 'chave-dos-testes',
+})
+# logs/api.log e o diretório das exportações são relativos ao diretório atual
+os.chdir(tempfile.mkdtemp(prefix='testes-escola-'))
+
+from app import create_app  # noqa: E402
+
+SENHA = 'senha-de-teste'
+PREFIXO = '/api/v1'
+
+
+@pytest.fixture
+def app():
+    aplicacao = create_app()
+    yield aplicacao
+    aplicacao.extensions['senhas'].encerrar()
+    aplicacao.extensions['logs'].parar()
+
+
+@pytest.fixture
+def cliente(app):
+    return app.test_client()
+
+
+def registar(app, username, role='user'):
+    app.extensions['repo_users'].criar(username, app.extensions['senhas'].gerar_hash(SENHA), role)
+
+
+def entrar(cliente, username):
+    """Faz login e devolve o corpo da resposta (token, refresh_token, ...)."""
+    resposta = cliente.post(f'{PREFIXO}/auth/login', json={'username': username, 'password': SENHA})
+    assert resposta.status_code == 200, resposta.get_json()
+    return resposta.get_json()
+
+
+def autorizacao(token):
+    return {'Authorization': f'Bearer {token}'}
+
+
+@pytest.fixture
+def admin(app, cliente):
+    """Cabeçalhos de um administrador autenticado."""
+    registar(app, 'admin', 'admin')
+    return autorizacao(entrar(cliente, 'admin')['token'])
+
+
+@pytest.fixture
+def utilizador(app, cliente):
+    """Cabeçalhos de um utilizador comum autenticado."""
+    registar(app, 'leitor')
+    return autorizacao(entrar(cliente, 'leitor')['token'])
+
+
+def aluno(numero):
+    return {
+        'nome': f'Aluno {numero}',
+        'matricula': str(2023000 + numero),
+        'curso': 'Análise e Desenvolvimento de Sistemas',
+        'email': f'aluno{numero}@escola.local',
+    }
+
+
+@pytest.fixture
+def alunos(app):
+    """Semeia 25 alunos (IDs 1 a 25) e devolve a quantidade."""
+    from routes.comum import valores_aluno
+    app.extensions['repo_alunos'].inserir_lote([(n, valores_aluno(aluno(n))) for n in range(1, 26)], [])
+    return 25
@@ -0,0 +1,153 @@
+"""
+Smoke test da variante assíncrona (app_async.py): o pool aiomysql é substituído por
+um pool falso sobre o SQLite em memória, com o esquema de repositorios/sqlite.py,
+para exercitar as rotas Quart sem um servidor MySQL.
+"""
+import asyncio
+import sqlite3
+
+import aiomysql
+import bcrypt
+import pytest
+
+from repositorios.sqlite import ESQUEMA, _linha_dict
+from routes.comum import SQL_INSERIR_ALUNO, valores_aluno
+
+from conftest import SENHA, PREFIXO, aluno
+
+
+class CursorFalso:
+    def __init__(self, conexao, dicionario):
+        self._raw = conexao.cursor()
+        self._dicionario = dicionario
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._raw.close()
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._raw.lastrowid
+
+    async def execute(self, query, params=()):
+        self._raw.execute(query.replace('%s', '?'), tuple(params))
+
+    async def fetchone(self):
+        linha = self._raw.fetchone()
+        return _linha_dict(self._raw, linha) if linha is not None and self._dicionario else linha
+
+    async def fetchall(self):
+        linhas = self._raw.fetchall()
+        return [_linha_dict(self._raw, linha) for linha in linhas] if self._dicionario else linhas
+
+
+class ConexaoFalsa:
+    def __init__(self, conexao):
+        self._conexao = conexao
+
+    def cursor(self, classe=aiomysql.Cursor):
+        return CursorFalso(self._conexao, classe is aiomysql.DictCursor)
+
+    def get_transaction_status(self):
+        return self._conexao.in_transaction
+
+    async def commit(self):
+        self._conexao.commit()
+
+    async def rollback(self):
+        self._conexao.rollback()
+
+    async def ping(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Emprestimo:
+    """Resultado de pool.acquire(): pode ser aguardado ou usado em 'async with', como no aiomysql."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __await__(self):
+        return asyncio.sleep(0, result=self._pool.conexao).__await__()
+
+    async def __aenter__(self):
+        return self._pool.conexao
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+class PoolFalso:
+    def __init__(self, conexao):
+        self.conexao = ConexaoFalsa(conexao)
+
+    def acquire(self):
+        return Emprestimo(self)
+
+    def release(self, conexao):
+        pass
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+
+@pytest.fixture
+def app_async(monkeypatch):
+    conexao = sqlite3.connect(':memory:', check_same_thread=False)
+    conexao.executescript(ESQUEMA)
+    conexao.execute(
+        "INSERT INTO users (username, password_hash, role) VALUES (?, ?, 'user')",
+        ('leitor', bcrypt.hashpw(SENHA.encode('utf-8'), bcrypt.gensalt(4)).decode('utf-8'))
+    )
+    conexao.executemany(SQL_INSERIR_ALUNO.replace('%s', '?'), [valores_aluno(aluno(n)) for n in range(1, 13)])
+    conexao.commit()
+
+    async def criar_pool(**argumentos):
+        return PoolFalso(conexao)
+
+    monkeypatch.setattr(aiomysql, 'create_pool', criar_pool)
+    from app_async import create_app_async
+    aplicacao = create_app_async()
+    yield aplicacao
+    aplicacao.extensions['logs'].parar()
+
+
+def test_login_listagem_e_304(app_async):
+    async def cenario():
+        async with app_async.test_app() as servidor:
+            cliente = servidor.test_client()
+            resposta = await cliente.post(f'{PREFIXO}/auth/login', json={'username': 'leitor', 'password': SENHA})
+            assert resposta.status_code == 200
+            cabecalhos = {'Authorization': f"Bearer {(await resposta.get_json())['token']}"}
+
+            resposta = await cliente.get(f'{PREFIXO}/alunos/?per_page=5&count=exact', headers=cabecalhos)
+            assert resposta.status_code == 200
+            corpo = await resposta.get_json()
+            assert [a['nome'] for a in corpo['alunos']] == [f'Aluno {n}' for n in range(1, 6)]
+            assert corpo['total'] == 12
+            etag = resposta.headers['ETag']
+
+            resposta = await cliente.get(
+                f'{PREFIXO}/alunos/?per_page=5&count=exact', headers={**cabecalhos, 'If-None-Match': etag}
+            )
+            assert resposta.status_code == 304
+
+            resposta = await cliente.get(f'{PREFIXO}/alunos/3', headers=cabecalhos)
+            assert (await resposta.get_json())['aluno']['nome'] == 'Aluno 3'
+            assert resposta.headers['ETag'] == '"aluno-3-v1"'
+
+            assert (await cliente.get(f'{PREFIXO}/alunos/')).status_code == 401
+
+    asyncio.run(cenario())
@@ -0,0 +1,14 @@
+from conftest import PREFIXO, registar
+
+AUTH = f'{PREFIXO}/auth'
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_login_com_senha_errada_devolve_401(app, cliente):
+    registar(app, 'ana')
+    resposta = cliente.post(f'{AUTH}/login', json={'username': 'ana', 'password': 'outra'})
+    assert resposta.status_code == 401
+
+
+def test_rota_protegida_sem_token_devolve_401(cliente):
+    assert cliente.get(ALUNOS).status_code == 401
@@ -0,0 +1,67 @@
+from repositorios.mysql import BancoMySQL
+
+
+class CursorFalso:
+    def __init__(self, registo):
+        self.registo = registo
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        self.registo.append(query)
+
+
+class ConexaoFalsa:
+    def __init__(self, registo):
+        self.registo = registo
+
+    def cursor(self, **opcoes):
+        return CursorFalso(self.registo)
+
+    def start_transaction(self, **opcoes):
+        self.registo.append('START' + (' SNAPSHOT' if opcoes.get('consistent_snapshot') else ''))
+
+    def commit(self):
+        self.registo.append('COMMIT')
+
+    def close(self):
+        self.registo.append('CLOSE')
+
+
+class PoolFalso:
+    def __init__(self):
+        self.registo = []
+        self.emprestimos = 0
+
+    def get_connection(self):
+        self.emprestimos += 1
+        return ConexaoFalsa(self.registo)
+
+
+def test_leitura_avulsa_nao_abre_transacao_nem_faz_commit():
+    pool = PoolFalso()
+    with BancoMySQL(pool).leitura() as cursor:
+        cursor.execute("SELECT 1")
+    assert pool.registo == ['SELECT 1', 'CLOSE']
+
+
+def test_transacao_e_explicita():
+    pool = PoolFalso()
+    with BancoMySQL(pool).transacao() as cursor:
+        cursor.execute("UPDATE alunos SET nome = %s")
+    assert pool.registo == ['START', 'UPDATE alunos SET nome = %s', 'COMMIT', 'CLOSE']
+
+
+def test_instantaneo_usa_uma_conexao_e_um_snapshot():
+    pool = PoolFalso()
+    banco = BancoMySQL(pool)
+    with banco.instantaneo():
+        for query in ("SELECT versao", "SELECT alunos", "SELECT COUNT(*)"):
+            with banco.leitura() as cursor:
+                cursor.execute(query)
+    assert pool.emprestimos == 1
+    assert pool.registo == ['START SNAPSHOT', 'SELECT versao', 'SELECT alunos', 'SELECT COUNT(*)', 'COMMIT', 'CLOSE']
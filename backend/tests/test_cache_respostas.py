@@ -0,0 +1,36 @@
+from conftest import PREFIXO
+from cache_respostas import CacheMemoriaLRU
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_exclusao_invalida_o_detalhe_em_cache(cliente, admin, alunos):
+    assert cliente.get(f'{ALUNOS}6', headers=admin).status_code == 200
+    assert cliente.delete(f'{ALUNOS}6', headers=admin).status_code == 200
+    assert cliente.get(f'{ALUNOS}6', headers=admin).status_code == 404
+
+
+def test_leitura_concorrente_com_invalidacao_nao_fica_em_cache():
+    cache = CacheMemoriaLRU()
+    marca = cache.marca()
+    # Uma escrita termina (e invalida) entre a leitura do banco e o guardar()
+    cache.invalidar('aluno:1')
+    cache.guardar('detalhe-1', 'antigo', tags=['aluno:1'], desde=marca)
+    assert cache.obter('detalhe-1') is None
+    assert cache.estatisticas()['descartadas'] == 1
+
+    # Invalidações de outras etiquetas não impedem o guardar()
+    marca = cache.marca()
+    cache.invalidar('aluno:2')
+    cache.guardar('detalhe-1', 'novo', tags=['aluno:1'], desde=marca)
+    assert cache.obter('detalhe-1') == 'novo'
+
+
+def test_marca_mais_antiga_que_as_geracoes_lembradas_nao_guarda():
+    cache = CacheMemoriaLRU(max_geracoes=2)
+    marca = cache.marca()
+    cache.invalidar('aluno:1')
+    cache.invalidar('aluno:2')
+    cache.invalidar('aluno:3')  # Esquece a geração de aluno:1
+    cache.guardar('detalhe-1', 'antigo', tags=['aluno:1'], desde=marca)
+    assert cache.obter('detalhe-1') is None
@@ -0,0 +1,29 @@
+import gzip
+
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_resposta_comprimida_tem_etag_proprio_e_revalida(cliente, utilizador, alunos):
+    sem_compressao = cliente.get(ALUNOS, headers=utilizador, query_string={'per_page': 25})
+    comprimida = cliente.get(ALUNOS, headers={**utilizador, 'Accept-Encoding': 'gzip'}, query_string={'per_page': 25})
+
+    assert comprimida.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(comprimida.data) == sem_compressao.data
+    etag = comprimida.headers['ETag']
+    assert etag == sem_compressao.headers['ETag'][:-1] + '-gzip"'
+
+    revalidacao = cliente.get(
+        ALUNOS, headers={**utilizador, 'Accept-Encoding': 'gzip', 'If-None-Match': etag}, query_string={'per_page': 25}
+    )
+    assert revalidacao.status_code == 304
+    assert revalidacao.headers['ETag'] == etag
+
+
+def test_if_match_aceita_o_etag_da_versao_comprimida(cliente, admin, alunos):
+    etag = cliente.get(f'{ALUNOS}4', headers=admin).headers['ETag']
+    comprimido = etag[:-1] + '-gzip"'
+    resposta = cliente.patch(f'{ALUNOS}4', headers={**admin, 'If-Match': comprimido}, json={'curso': 'Direito'})
+    assert resposta.status_code == 200
+    assert cliente.patch(f'{ALUNOS}4', headers={**admin, 'If-Match': comprimido}, json={'curso': 'Letras'}).status_code == 412
@@ -0,0 +1,20 @@
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_cursor_percorre_todos_os_alunos_sem_repetir(cliente, utilizador, alunos):
+    vistos = []
+    resposta = cliente.get(ALUNOS, headers=utilizador, query_string={'after_id': 0, 'per_page': 10})
+    while True:
+        corpo = resposta.get_json()
+        vistos += [aluno['id'] for aluno in corpo['alunos']]
+        if corpo['next_cursor'] is None:
+            break
+        resposta = cliente.get(ALUNOS, headers=utilizador, query_string={'cursor': corpo['next_cursor'], 'per_page': 10})
+    assert vistos == list(range(1, alunos + 1))
+
+
+def test_cursor_invalido_devolve_400(cliente, utilizador, alunos):
+    resposta = cliente.get(ALUNOS, headers=utilizador, query_string={'cursor': '!!!'})
+    assert resposta.status_code == 400
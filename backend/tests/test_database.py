@@ -0,0 +1,63 @@
+from database import ConnectionPool
+
+
+class ConexaoFalsa:
+    """Conexão MySQL mínima: conta as idas ao servidor (ping e rollback)."""
+
+    def __init__(self):
+        self.in_transaction = False
+        self.pings = 0
+        self.rollbacks = 0
+        self.fechada = False
+
+    def is_connected(self):
+        self.pings += 1
+        return True
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.fechada = True
+
+
+def _pool(conexoes, **opcoes):
+    pool = ConnectionPool({}, size=2, **opcoes)
+    pool._connect = lambda: conexoes.pop(0)
+    return pool
+
+
+def test_devolver_uma_conexao_nao_faz_ping():
+    raw = ConexaoFalsa()
+    pool = _pool([raw], ping_interval=30)
+    for _ in range(3):
+        pool.get_connection().close()
+    assert raw.pings == 0
+    assert raw.rollbacks == 0
+
+
+def test_transacao_pendente_e_desfeita_ao_devolver():
+    raw = ConexaoFalsa()
+    pool = _pool([raw])
+    conn = pool.get_connection()
+    raw.in_transaction = True
+    conn.close()
+    assert raw.rollbacks == 1
+    assert pool.get_connection()._raw is raw
+
+
+def test_conexao_ociosa_ha_mais_de_ping_interval_e_verificada():
+    raw = ConexaoFalsa()
+    pool = _pool([raw], ping_interval=0)
+    pool.get_connection().close()
+    pool.get_connection().close()
+    assert raw.pings == 1
+
+
+def test_conexao_acima_do_max_lifetime_e_reciclada():
+    antiga, nova = ConexaoFalsa(), ConexaoFalsa()
+    pool = _pool([antiga, nova], max_lifetime=-1)
+    pool.get_connection().close()
+    assert pool.get_connection()._raw is nova
+    assert antiga.fechada
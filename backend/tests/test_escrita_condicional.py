@@ -0,0 +1,34 @@
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_if_match_atual_altera_e_devolve_o_novo_etag(cliente, admin, alunos):
+    etag = cliente.get(f'{ALUNOS}4', headers=admin).headers['ETag']
+    resposta = cliente.patch(f'{ALUNOS}4', headers={**admin, 'If-Match': etag}, json={'curso': 'Direito'})
+    assert resposta.status_code == 200
+    novo = resposta.headers['ETag']
+    assert novo != etag
+    assert cliente.get(f'{ALUNOS}4', headers=admin).headers['ETag'] == novo
+
+
+def test_if_match_desatualizado_devolve_412(cliente, admin, alunos):
+    etag = cliente.get(f'{ALUNOS}4', headers=admin).headers['ETag']
+    cliente.patch(f'{ALUNOS}4', headers=admin, json={'curso': 'Direito'})
+
+    resposta = cliente.patch(f'{ALUNOS}4', headers={**admin, 'If-Match': etag}, json={'curso': 'Medicina'})
+    assert resposta.status_code == 412
+    assert cliente.delete(f'{ALUNOS}4', headers={**admin, 'If-Match': etag}).status_code == 412
+    assert cliente.get(f'{ALUNOS}4', headers=admin).get_json()['aluno']['curso'] == 'Direito'
+
+
+def test_if_match_de_outro_aluno_devolve_412(cliente, admin, alunos):
+    etag = cliente.get(f'{ALUNOS}4', headers=admin).headers['ETag']
+    assert cliente.patch(f'{ALUNOS}5', headers={**admin, 'If-Match': etag}, json={'curso': 'Direito'}).status_code == 412
+
+
+def test_escrita_em_aluno_inexistente_devolve_404(cliente, admin, alunos):
+    assert cliente.patch(f'{ALUNOS}999', headers=admin, json={'curso': 'Direito'}).status_code == 404
+    assert cliente.patch(f'{ALUNOS}999', headers={**admin, 'If-Match': '"aluno-999-v1"'},
+                         json={'curso': 'Direito'}).status_code == 404
+    assert cliente.delete(f'{ALUNOS}999', headers=admin).status_code == 404
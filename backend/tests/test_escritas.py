@@ -0,0 +1,14 @@
+from conftest import PREFIXO, aluno
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_cadastro_exige_admin(cliente, utilizador):
+    assert cliente.post(ALUNOS, headers=utilizador, json=aluno(1)).status_code == 403
+
+
+def test_cadastro_duplicado_devolve_400(cliente, admin):
+    assert cliente.post(ALUNOS, headers=admin, json=aluno(1)).status_code == 201
+    resposta = cliente.post(ALUNOS, headers=admin, json=aluno(1))
+    assert resposta.status_code == 400
+    assert resposta.get_json()['mensagem'] == "Matrícula ou email já cadastrados"
@@ -0,0 +1,33 @@
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_listagem_responde_304_enquanto_a_tabela_nao_muda(cliente, admin, alunos):
+    resposta = cliente.get(ALUNOS, headers=admin)
+    assert resposta.status_code == 200
+    etag = resposta.headers['ETag']
+
+    revalidacao = cliente.get(ALUNOS, headers={**admin, 'If-None-Match': etag})
+    assert revalidacao.status_code == 304
+    assert revalidacao.data == b''
+
+    cliente.post(ALUNOS, headers=admin, json={'nome': 'Novo', 'matricula': '999', 'curso': 'Direito', 'email': 'novo@x.pt'})
+    depois = cliente.get(ALUNOS, headers={**admin, 'If-None-Match': etag})
+    assert depois.status_code == 200
+    assert depois.headers['ETag'] != etag
+
+
+def test_detalhe_responde_304_com_o_etag_do_aluno(cliente, utilizador, alunos):
+    resposta = cliente.get(f'{ALUNOS}3', headers=utilizador)
+    assert resposta.status_code == 200
+    assert resposta.get_json()['aluno']['id'] == 3
+
+    revalidacao = cliente.get(f'{ALUNOS}3', headers={**utilizador, 'If-None-Match': resposta.headers['ETag']})
+    assert revalidacao.status_code == 304
+
+
+def test_detalhe_inexistente_devolve_404(cliente, utilizador, alunos):
+    resposta = cliente.get(f'{ALUNOS}999', headers=utilizador)
+    assert resposta.status_code == 404
+    assert resposta.get_json() == {'sucesso': False, 'mensagem': 'Aluno não encontrado', 'codigo': 404}
@@ -0,0 +1,81 @@
+import os
+import json
+import time
+from datetime import datetime, timedelta
+
+from exportacao import GestorExportacoes
+
+from conftest import PREFIXO
+
+EXPORTS = f'{PREFIXO}/alunos/exports'
+
+
+def _esperar(cliente, headers, url):
+    for _ in range(100):
+        job = cliente.get(url, headers=headers).get_json()['exportacao']
+        if job['estado'] not in ('pendente', 'em_execucao'):
+            return job
+        time.sleep(0.02)
+    raise AssertionError('Exportação não terminou')
+
+
+def _envelhecer(gestor, job_id, **campos):
+    """Recua as datas gravadas no estado da tarefa."""
+    caminho = gestor._caminho_estado(job_id)
+    with open(caminho, encoding='utf-8') as f:
+        job = json.load(f)
+    job.update({campo: (datetime.now() - timedelta(seconds=segundos)).isoformat() for campo, segundos in campos.items()})
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(job, f)
+
+
+def test_exportacao_conclui_e_expira_depois_da_retencao(app, cliente, admin, alunos):
+    resposta = cliente.post(EXPORTS, headers=admin, json={'formato': 'csv'})
+    assert resposta.status_code == 202
+    job = _esperar(cliente, admin, resposta.get_json()['status_url'])
+    assert job['estado'] == 'concluido'
+    assert job['linhas'] == alunos
+
+    gestor = app.extensions['exportacoes']
+    ficheiro = gestor.caminho_ficheiro(job)
+    assert os.path.exists(ficheiro)
+
+    _envelhecer(gestor, job['id'], concluido_em=app.config['EXPORTS_RETENTION'] + 1)
+    assert gestor.limpar() == 1
+    assert not os.path.exists(ficheiro)
+    assert cliente.get(resposta.get_json()['status_url'], headers=admin).status_code == 404
+
+
+def test_tarefa_sem_progresso_e_marcada_como_falhada(tmp_path):
+    gestor = GestorExportacoes(str(tmp_path), timeout=60)
+    job = {
+        'id': 'a' * 32, 'estado': 'em_execucao', 'ficheiro': 'alunos-x.csv',
+        'criado_em': datetime.now().isoformat(), 'atualizado_em': datetime.now().isoformat(),
+        'concluido_em': None, 'erro': None,
+    }
+    gestor._guardar_estado(job)
+    assert gestor.obter(job['id'])['estado'] == 'em_execucao'
+
+    _envelhecer(gestor, job['id'], atualizado_em=61)
+    falhada = gestor.obter(job['id'])
+    assert falhada['estado'] == 'erro'
+    assert falhada['concluido_em'] is not None
+    assert gestor.obter(job['id'])['estado'] == 'erro'
+
+
+def test_tarefa_pendente_na_fila_nao_expira_pelo_timeout(tmp_path):
+    gestor = GestorExportacoes(str(tmp_path), timeout=60, retencao=3600)
+    job = {
+        'id': 'b' * 32, 'estado': 'pendente', 'ficheiro': 'alunos-y.csv',
+        'criado_em': datetime.now().isoformat(), 'atualizado_em': datetime.now().isoformat(),
+        'concluido_em': None, 'erro': None,
+    }
+    gestor._guardar_estado(job)
+
+    # À espera de um worker livre há mais do que o timeout: continua pendente
+    _envelhecer(gestor, job['id'], atualizado_em=61)
+    assert gestor.obter(job['id'])['estado'] == 'pendente'
+
+    # Pendente há mais do que a retenção: o processo que a agendou já não existe
+    _envelhecer(gestor, job['id'], atualizado_em=3601)
+    assert gestor.obter(job['id'])['estado'] == 'erro'
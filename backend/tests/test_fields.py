@@ -0,0 +1,37 @@
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_fields_devolve_apenas_os_campos_pedidos_e_o_id(cliente, utilizador, alunos):
+    corpo = cliente.get(ALUNOS, headers=utilizador, query_string={'fields': 'nome', 'per_page': 3}).get_json()
+    assert [set(aluno) for aluno in corpo['alunos']] == [{'id', 'nome'}] * 3
+
+    detalhe = cliente.get(f'{ALUNOS}2', headers=utilizador, query_string={'fields': 'email'}).get_json()
+    assert detalhe['aluno'] == {'id': 2, 'email': 'aluno2@escola.local'}
+
+
+def test_fields_invalido_devolve_400(cliente, utilizador, alunos):
+    resposta = cliente.get(ALUNOS, headers=utilizador, query_string={'fields': 'nome,senha'})
+    assert resposta.status_code == 400
+    assert 'senha' in resposta.get_json()['mensagem']
+
+
+def test_fields_no_detalhe_tem_etag_proprio(cliente, admin, alunos):
+    completo = cliente.get(f'{ALUNOS}2', headers=admin)
+    parcial = cliente.get(f'{ALUNOS}2', headers=admin, query_string={'fields': 'email'})
+    assert parcial.headers['ETag'] != completo.headers['ETag']
+
+    # O ETag de um corpo não revalida o outro
+    resposta = cliente.get(f'{ALUNOS}2', headers={**admin, 'If-None-Match': completo.headers['ETag']},
+                           query_string={'fields': 'email'})
+    assert resposta.status_code == 200
+    assert resposta.get_json()['aluno'] == {'id': 2, 'email': 'aluno2@escola.local'}
+    resposta = cliente.get(f'{ALUNOS}2', headers={**admin, 'If-None-Match': parcial.headers['ETag']},
+                           query_string={'fields': 'email'})
+    assert resposta.status_code == 304
+
+    # Ambos servem para o If-Match de uma escrita
+    resposta = cliente.patch(f'{ALUNOS}2', headers={**admin, 'If-Match': parcial.headers['ETag']},
+                             json={'curso': 'Direito'})
+    assert resposta.status_code == 200
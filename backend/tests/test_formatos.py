@@ -0,0 +1,42 @@
+import pytest
+
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_accept_colunar(cliente, utilizador, alunos):
+    resposta = cliente.get(
+        ALUNOS, headers={**utilizador, 'Accept': 'application/vnd.escola.colunar+json'},
+        query_string={'fields': 'nome', 'per_page': 2}
+    )
+    assert resposta.mimetype == 'application/vnd.escola.colunar+json'
+    assert 'Accept' in resposta.headers['Vary']
+    corpo = resposta.get_json(force=True)
+    assert corpo['columns'] == ['id', 'nome']
+    assert corpo['rows'] == [[1, 'Aluno 1'], [2, 'Aluno 2']]
+
+
+def test_accept_msgpack(cliente, utilizador, alunos):
+    msgpack = pytest.importorskip('msgpack')
+    resposta = cliente.get(ALUNOS, headers={**utilizador, 'Accept': 'application/msgpack'}, query_string={'per_page': 2})
+    assert resposta.mimetype == 'application/msgpack'
+    assert [linha[0] for linha in msgpack.unpackb(resposta.data)['rows']] == [1, 2]
+
+
+def test_accept_sem_formato_disponivel_devolve_json(cliente, utilizador, alunos):
+    resposta = cliente.get(ALUNOS, headers={**utilizador, 'Accept': 'text/html'})
+    assert resposta.status_code == 200
+    assert resposta.mimetype == 'application/json'
+    assert len(resposta.get_json()['alunos']) == 10
+
+
+def test_accept_que_recusa_json_devolve_406(cliente, utilizador, alunos):
+    resposta = cliente.get(ALUNOS, headers={**utilizador, 'Accept': 'text/html, application/json;q=0'})
+    assert resposta.status_code == 406
+
+
+def test_formatos_diferentes_tem_etags_diferentes(cliente, utilizador, alunos):
+    json_ = cliente.get(ALUNOS, headers=utilizador)
+    colunar = cliente.get(ALUNOS, headers={**utilizador, 'Accept': 'application/vnd.escola.colunar+json'})
+    assert json_.headers['ETag'] != colunar.headers['ETag']
@@ -0,0 +1,61 @@
+import json
+
+from conftest import PREFIXO, aluno
+
+BULK = f'{PREFIXO}/alunos/bulk'
+
+
+def test_bulk_json_reporta_erros_por_linha_e_importa_os_restantes(cliente, admin):
+    registos = [aluno(1), {**aluno(2), 'email': 'sem-arroba'}, aluno(3), {**aluno(4), 'matricula': aluno(1)['matricula']}, 'x']
+    corpo = cliente.post(BULK, headers=admin, json=registos).get_json()
+
+    assert corpo['inseridos'] == 2
+    assert corpo['total_linhas'] == 5
+    assert [erro['linha'] for erro in corpo['erros']] == [2, 4, 5]
+    assert corpo['sucesso'] is False
+
+
+def test_bulk_ndjson_com_linha_invalida(cliente, admin):
+    linhas = [json.dumps(aluno(1)), '{nao e json', json.dumps(aluno(2))]
+    resposta = cliente.post(BULK, headers={**admin, 'Content-Type': 'application/x-ndjson'}, data='\n'.join(linhas))
+    corpo = resposta.get_json()
+    assert corpo['inseridos'] == 2
+    assert corpo['erros'] == [{'linha': 2, 'erro': 'JSON inválido'}]
+
+
+def test_bulk_csv(cliente, admin):
+    csv = 'nome,matricula,curso,email\n' + '\n'.join(
+        f"{a['nome']},{a['matricula']},{a['curso']},{a['email']}" for a in (aluno(1), aluno(2))
+    )
+    resposta = cliente.post(BULK, headers={**admin, 'Content-Type': 'text/csv'}, data=csv)
+    assert resposta.get_json()['inseridos'] == 2
+    total = cliente.get(f'{PREFIXO}/alunos/', headers=admin, query_string={'count': 'exact'}).get_json()['total']
+    assert total == 2
+
+
+def test_bulk_csv_com_linha_curta_reporta_a_linha_e_importa_as_restantes(cliente, admin):
+    a1, a3 = aluno(1), aluno(3)
+    csv = (
+        'nome,matricula,curso,email\n'
+        f"{a1['nome']},{a1['matricula']},{a1['curso']},{a1['email']}\n"
+        'Aluno 2,2023002\n'
+        f"{a3['nome']},{a3['matricula']},{a3['curso']},{a3['email']}\n"
+    )
+    resposta = cliente.post(BULK, headers={**admin, 'Content-Type': 'text/csv'}, data=csv)
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert corpo['inseridos'] == 2
+    assert [erro['linha'] for erro in corpo['erros']] == [2]
+
+
+def test_bulk_json_com_campos_que_nao_sao_texto(cliente, admin):
+    registos = [aluno(1), {**aluno(2), 'email': 123}, {**aluno(3), 'nome': None}, {**aluno(4), 'matricula': 2023004}]
+    corpo = cliente.post(BULK, headers=admin, json=registos).get_json()
+    assert corpo['inseridos'] == 1
+    assert [erro['linha'] for erro in corpo['erros']] == [2, 3, 4]
+
+
+def test_cadastro_com_campo_nulo_ou_numerico_devolve_400(cliente, admin):
+    assert cliente.post(f'{PREFIXO}/alunos/', headers=admin, json={**aluno(1), 'nome': None}).status_code == 400
+    assert cliente.post(f'{PREFIXO}/alunos/', headers=admin, json={**aluno(1), 'email': 123}).status_code == 400
+    assert cliente.patch(f'{PREFIXO}/alunos/1', headers=admin, json={'curso': 5}).status_code == 400
@@ -0,0 +1,84 @@
+import mysql.connector
+import pytest
+
+import migracoes
+
+
+def test_migracoes_esperam_pelo_banco_e_depois_desistem(monkeypatch):
+    chamadas, esperas = [], []
+    monkeypatch.setattr(migracoes.time, 'sleep', esperas.append)
+
+    def migrar(app):
+        chamadas.append(app)
+        if len(chamadas) < 3:
+            raise mysql.connector.InterfaceError("2003: Can't connect to MySQL server")
+        return [1]
+
+    monkeypatch.setattr(migracoes, 'migrar', migrar)
+    assert migracoes.migrar_com_tentativas('app', tentativas=5, espera=1) == [1]
+    assert esperas == [1, 2]
+
+    def sem_banco(app):
+        raise mysql.connector.InterfaceError("2003: Can't connect to MySQL server")
+
+    monkeypatch.setattr(migracoes, 'migrar', sem_banco)
+    with pytest.raises(mysql.connector.InterfaceError):
+        migracoes.migrar_com_tentativas('app', tentativas=3, espera=20, espera_maxima=30)
+    assert esperas[2:] == [20, 30]
+
+
+def test_erro_de_sql_nao_e_repetido(monkeypatch):
+    chamadas = []
+
+    def migrar(app):
+        chamadas.append(app)
+        raise mysql.connector.ProgrammingError("1064: syntax error")
+
+    monkeypatch.setattr(migracoes, 'migrar', migrar)
+    with pytest.raises(mysql.connector.ProgrammingError):
+        migracoes.migrar_com_tentativas('app', tentativas=5, espera=1)
+    assert len(chamadas) == 1
+
+
+class CursorRegisto:
+    """Cursor MySQL falso: regista o SQL e responde como um banco com as colunas antigas de users."""
+
+    def __init__(self):
+        self.comandos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=()):
+        self.comandos.append(' '.join(query.split()))
+
+    def fetchone(self):
+        # GET_LOCK/RELEASE_LOCK devolvem 1; as colunas consultadas existem todas
+        return (1,)
+
+    def fetchall(self):
+        return []
+
+
+class ConexaoRegisto:
+    def __init__(self):
+        self.cursor_registo = CursorRegisto()
+
+    def cursor(self):
+        return self.cursor_registo
+
+    def commit(self):
+        pass
+
+
+def test_remocao_de_users_token_so_corre_na_contracao():
+    conn = ConexaoRegisto()
+    assert migracoes.aplicar_migracoes(conn) == [1, 2, 3, 4, 5, 6]
+    assert not [c for c in conn.cursor_registo.comandos if 'DROP COLUMN' in c]
+
+    conn = ConexaoRegisto()
+    assert migracoes.aplicar_migracoes(conn, contrair=True)[-1] == 7
+    assert [c for c in conn.cursor_registo.comandos if 'DROP COLUMN token' in c]
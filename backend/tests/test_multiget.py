@@ -0,0 +1,21 @@
+from conftest import PREFIXO
+
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_ids_segue_a_ordem_pedida_e_indica_os_inexistentes(cliente, utilizador, alunos):
+    corpo = cliente.get(ALUNOS, headers=utilizador, query_string={'ids': '7,2,999,7'}).get_json()
+    assert [aluno['id'] for aluno in corpo['alunos']] == [7, 2]
+    assert corpo['nao_encontrados'] == [999]
+
+
+def test_lookup_por_matricula(cliente, utilizador, alunos):
+    resposta = cliente.post(f'{ALUNOS}lookup', headers=utilizador, json={'matriculas': ['2023005', '1']})
+    corpo = resposta.get_json()
+    assert [aluno['matricula'] for aluno in corpo['alunos']] == ['2023005']
+    assert corpo['nao_encontrados'] == ['1']
+
+
+def test_lookup_com_demasiadas_chaves_devolve_400(app, cliente, utilizador, alunos):
+    ids = list(range(1, app.config['ALUNOS_LOOKUP_MAX_KEYS'] + 2))
+    assert cliente.post(f'{ALUNOS}lookup', headers=utilizador, json={'ids': ids}).status_code == 400
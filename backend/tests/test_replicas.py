@@ -0,0 +1,86 @@
+import time
+import threading
+
+import pytest
+
+import replicas
+from cache_respostas import get_cache_respostas
+from replicas import RoteadorLeituras, Replica, COOKIE_PRIMARIO
+from routes.comum import CAMPOS_ALUNO, chave_cache_aluno
+
+from conftest import PREFIXO
+
+
+@pytest.fixture
+def roteador(app):
+    """Roteador com uma réplica (nunca contactada: as rotas do SQLite não a usam) e o hook das escritas."""
+    app.config.update(STORAGE_BACKEND='mysql', DB_REPLICA_HOSTS=('127.0.0.1:1',))
+    roteador = replicas.init_app(app)
+    app.config['STORAGE_BACKEND'] = 'sqlite'
+    return roteador
+
+
+def _cache_desatualizado(app):
+    """Simula uma leitura de réplica atrasada, guardada no cache antes de a escrita chegar."""
+    with app.app_context():
+        get_cache_respostas().guardar(
+            chave_cache_aluno(1, CAMPOS_ALUNO),
+            ({'sucesso': True, 'aluno': {'id': 1, 'nome': 'Desatualizado'}}, 'aluno-1-v0'),
+        )
+
+
+def test_pedido_fixado_no_primario_ignora_o_cache(app, cliente, utilizador, alunos):
+    app.extensions['db_replicas'] = RoteadorLeituras(primario=None, replicas=[])
+    _cache_desatualizado(app)
+
+    assert cliente.get(f'{PREFIXO}/alunos/1', headers=utilizador).get_json()['aluno']['nome'] == 'Desatualizado'
+
+    cliente.set_cookie(COOKIE_PRIMARIO, '1')
+    assert cliente.get(f'{PREFIXO}/alunos/1', headers=utilizador).get_json()['aluno']['nome'] == 'Aluno 1'
+
+
+def test_sem_replicas_o_cookie_nao_muda_nada(app, cliente, utilizador, alunos):
+    _cache_desatualizado(app)
+    cliente.set_cookie(COOKIE_PRIMARIO, '1')
+    assert cliente.get(f'{PREFIXO}/alunos/1', headers=utilizador).get_json()['aluno']['nome'] == 'Desatualizado'
+
+
+def test_so_as_escritas_confirmadas_fixam_o_primario(roteador, cliente, admin, alunos):
+    # O login (cria a sessão) e o /lookup (só lê) não fixam as leituras no primário
+    assert cliente.get_cookie(COOKIE_PRIMARIO) is None
+    resposta = cliente.post(f'{PREFIXO}/alunos/lookup', headers=admin, json={'ids': [1, 2]})
+    assert resposta.status_code == 200
+    assert cliente.get_cookie(COOKIE_PRIMARIO) is None
+    # Uma escrita recusada também não
+    assert cliente.patch(f'{PREFIXO}/alunos/999', headers=admin, json={'curso': 'Direito'}).status_code == 404
+    assert cliente.get_cookie(COOKIE_PRIMARIO) is None
+
+    assert cliente.patch(f'{PREFIXO}/alunos/1', headers=admin, json={'curso': 'Direito'}).status_code == 200
+    assert cliente.get_cookie(COOKIE_PRIMARIO) is not None
+
+
+def test_argumentos_da_replica_tem_timeout_de_conexao(app, roteador):
+    pool = roteador.replicas[0].pool
+    assert pool.connect_args['connection_timeout'] == app.config['DB_REPLICA_CONNECT_TIMEOUT']
+    assert 'connection_timeout' not in app.extensions['db_pool'].connect_args
+
+
+class PoolLento:
+    """Pool de uma réplica que demora a responder (ex.: host inacessível)."""
+
+    def __init__(self):
+        self.liberar = threading.Event()
+
+    def get_connection(self):
+        self.liberar.wait(5)
+        raise OSError("sem resposta")
+
+
+def test_verificacao_da_replica_nao_bloqueia_o_pedido():
+    pool = PoolLento()
+    roteador = RoteadorLeituras(primario=None, replicas=[Replica('lenta', pool)])
+    inicio = time.monotonic()
+    # Ainda não verificada: fica fora da rotação e a leitura vai ao primário sem esperar
+    assert roteador.replica_disponivel() is None
+    assert time.monotonic() - inicio < 1
+    pool.liberar.set()
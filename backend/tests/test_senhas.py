@@ -0,0 +1,12 @@
+from auth.senhas import GestorSenhas
+
+
+def test_pool_de_processos_gera_e_verifica_hashes():
+    gestor = GestorSenhas(rounds=4, workers=1, tipo='process')
+    try:
+        hash_senha = gestor.gerar_hash('segredo')
+        assert gestor.verificar('segredo', hash_senha)
+        assert not gestor.verificar('outra', hash_senha)
+        assert gestor._get_executor()._mp_context.get_start_method() == 'forkserver'
+    finally:
+        gestor.encerrar()
@@ -0,0 +1,24 @@
+from conftest import PREFIXO, registar, entrar, autorizacao
+
+AUTH = f'{PREFIXO}/auth'
+ALUNOS = f'{PREFIXO}/alunos/'
+
+
+def test_logout_revoga_o_token_de_acesso(app, cliente):
+    registar(app, 'ana')
+    tokens = entrar(cliente, 'ana')
+    assert cliente.get(ALUNOS, headers=autorizacao(tokens['token'])).status_code == 200
+
+    assert cliente.post(f'{AUTH}/logout', headers=autorizacao(tokens['token'])).status_code == 200
+    assert cliente.get(ALUNOS, headers=autorizacao(tokens['token'])).status_code == 401
+    assert cliente.post(f'{AUTH}/refresh', json={'refresh_token': tokens['refresh_token']}).status_code == 401
+
+
+def test_logout_termina_apenas_a_propria_sessao(app, cliente):
+    registar(app, 'ana')
+    primeira, segunda = entrar(cliente, 'ana'), entrar(cliente, 'ana')
+    cliente.post(f'{AUTH}/logout', headers=autorizacao(primeira['token']))
+
+    resposta = cliente.post(f'{AUTH}/refresh', json={'refresh_token': segunda['refresh_token']})
+    assert resposta.status_code == 200
+    assert cliente.get(ALUNOS, headers=autorizacao(resposta.get_json()['token'])).status_code == 200
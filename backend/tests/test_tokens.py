@@ -0,0 +1,22 @@
+import pytest
+
+from conftest import PREFIXO, registar, entrar
+
+AUTH = f'{PREFIXO}/auth'
+
+
+def test_refresh_nao_aceita_um_token_de_acesso(app, cliente):
+    registar(app, 'ana')
+    tokens = entrar(cliente, 'ana')
+    assert cliente.post(f'{AUTH}/refresh', json={'refresh_token': tokens['token']}).status_code == 401
+
+
+def test_sem_secret_key_a_configuracao_e_recusada(monkeypatch):
+    from config import carregar_configuracao, CHAVE_DESENVOLVIMENTO
+    monkeypatch.delenv('SECRET_KEY')
+    monkeypatch.delenv('FLASK_DEBUG', raising=False)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        carregar_configuracao()
+
+    monkeypatch.setenv('FLASK_DEBUG', '1')
+    assert carregar_configuracao()['SECRET_KEY'] == CHAVE_DESENVOLVIMENTO
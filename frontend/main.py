@@ -2,13 +2,18 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import requests
 import threading
-from datetime import datetime
+from datetime import datetime, timedelta
 import queue 
 
 # URLs para o backend Flask
 BASE_ALUNOS_URL = "http://localhost:5000/api/v1/alunos/" # Com a barra final!
 BASE_AUTH_URL = "http://localhost:5000/api/v1/auth/"
 
+# Uma única sessão HTTP para todos os pedidos: reutiliza as conexões e devolve os
+# cookies da API (ex.: escola_primario, que após uma escrita faz as leituras
+# seguintes irem ao banco primário em vez de uma réplica ainda desatualizada)
+sessao_http = requests.Session()
+
 class LoginWindow(tk.Toplevel):
     def __init__(self, parent, on_login_success):
         super().__init__(parent)
@@ -57,7 +62,7 @@ class LoginWindow(tk.Toplevel):
 
     def _send_login_request(self, username, password):
         try:
-            response = requests.post(
+            response = sessao_http.post(
                 f"{BASE_AUTH_URL}login",
                 json={"username": username, "password": password},
                 timeout=5
@@ -65,9 +70,7 @@ class LoginWindow(tk.Toplevel):
             data = response.json()
 
             if response.status_code == 200:
-                token = data.get("token")
-                role = data.get("role")
-                self.parent.after(0, lambda: self._login_success(token, role)) # Chama na thread principal
+                self.parent.after(0, lambda: self._login_success(data)) # Chama na thread principal
             else:
                 message = data.get("message", "Erro desconhecido de login.")
                 self.parent.after(0, lambda: messagebox.showerror("Erro de Login", message))
@@ -76,8 +79,8 @@ class LoginWindow(tk.Toplevel):
         except ValueError: # Para o caso de resposta não ser um JSON válido
             self.parent.after(0, lambda: messagebox.showerror("Erro de Resposta", "Resposta inválida do servidor de autenticação."))
 
-    def _login_success(self, token, role):
-        self.on_login_success(token, role) # Chama o callback na AlunoApp
+    def _login_success(self, data):
+        self.on_login_success(data) # Chama o callback na AlunoApp
         self.destroy() # Fecha a janela de login
 
 class AlunoApp:
@@ -89,6 +92,11 @@ class AlunoApp:
         
         self.auth_token = None # Armazenará o token de autenticação
         self.user_role = None  # Armazenará a função do utilizador (ex: 'admin', 'user')
+        self.etag_lista = None # ETag da última listagem, para pedir apenas se houver alterações
+        self.aluno_carregado = None # Valores do aluno no formulário, para enviar só os campos alterados
+        self.refresh_token = None # Token de renovação, usado para obter novos tokens de acesso
+        self.token_expira_em = None # Expiração do token de acesso atual
+        self.token_lock = threading.Lock() # Evita renovações simultâneas a partir de várias threads
 
         self.status_var = tk.StringVar()
         self.status_bar = ttk.Label(self.root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
@@ -103,10 +111,13 @@ class AlunoApp:
         """Exibe a janela de login."""
         LoginWindow(self.root, self._handle_login_success)
 
-    def _handle_login_success(self, token, role):
+    def _handle_login_success(self, data):
         """Callback chamado após um login bem-sucedido."""
-        self.auth_token = token
+        role = data.get("role")
+        self.auth_token = data.get("token")
         self.user_role = role
+        self.refresh_token = data.get("refresh_token")
+        self.token_expira_em = datetime.fromisoformat(data["expires_at"]) if data.get("expires_at") else None
         self.update_status(f"Login bem-sucedido! Função: {role}")
         self.setup_ui() # Configura a UI principal após o login
         self.atualizar_tabela() # Atualiza a tabela de alunos
@@ -206,8 +217,29 @@ class AlunoApp:
         self.status_var.set(f"[{timestamp}] {message}")
         self.status_bar.configure(style='Error.TLabel' if error else 'TLabel')
         
+    def _renovar_token_se_necessario(self):
+        """Renova o token de acesso (de curta duração) pouco antes de expirar."""
+        with self.token_lock:
+            if not self.refresh_token or not self.token_expira_em:
+                return
+            if datetime.now() < self.token_expira_em - timedelta(seconds=60):
+                return
+            try:
+                response = sessao_http.post(
+                    f"{BASE_AUTH_URL}refresh",
+                    json={"refresh_token": self.refresh_token},
+                    timeout=5
+                )
+                if response.status_code == 200:
+                    data = response.json()
+                    self.auth_token = data.get("token")
+                    self.token_expira_em = datetime.fromisoformat(data["expires_at"])
+            except (requests.exceptions.RequestException, ValueError, KeyError):
+                pass # O pedido seguinte recebe 401 e o utilizador volta a fazer login
+
     def _get_headers(self):
         """Retorna os cabeçalhos com o token de autenticação."""
+        self._renovar_token_se_necessario()
         if self.auth_token:
             return {"Authorization": f"Bearer {self.auth_token}", "Content-Type": "application/json"}
         return {"Content-Type": "application/json"}
@@ -216,7 +248,11 @@ class AlunoApp:
         """Realiza o logout do utilizador."""
         def thread_logout():
             try:
-                response = requests.post(f"{BASE_AUTH_URL}logout", headers=self._get_headers())
+                response = sessao_http.post(
+                    f"{BASE_AUTH_URL}logout",
+                    json={"refresh_token": self.refresh_token}, # Revoga também o token de renovação
+                    headers=self._get_headers()
+                )
                 data = response.json()
                 if response.status_code == 200:
                     self._run_on_main_thread(messagebox.showinfo, "Logout", "Sessão encerrada com sucesso.")
@@ -234,6 +270,9 @@ class AlunoApp:
         """Reinicia o estado da aplicação para a tela de login."""
         self.auth_token = None
         self.user_role = None
+        self.etag_lista = None
+        self.refresh_token = None
+        self.token_expira_em = None
         # Limpa todos os widgets existentes no root e re-exibe a janela de login
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -251,16 +290,25 @@ class AlunoApp:
         self.entry_matricula.delete(0, tk.END)
         self.entry_curso.delete(0, tk.END)
         self.entry_email.delete(0, tk.END)
+        self.aluno_carregado = None
         self.update_status("Campos limpos")
         
     def atualizar_tabela(self):
         def thread_atualizar_alunos():
             try:
                 self._run_on_main_thread(self.update_status, "Atualizando lista de alunos...")
-                response = requests.get(BASE_ALUNOS_URL, headers=self._get_headers()) # Envia o token
+                headers = self._get_headers() # Envia o token
+                if self.etag_lista:
+                    headers['If-None-Match'] = self.etag_lista
+                response = sessao_http.get(BASE_ALUNOS_URL, headers=headers)
+                if response.status_code == 304:
+                    # A tabela já mostra os dados atuais
+                    self._run_on_main_thread(self.update_status, "Lista já está atualizada")
+                    return
                 data = response.json() 
 
                 if response.status_code == 200:
+                    self.etag_lista = response.headers.get('ETag')
                     alunos = data.get('alunos', [])
                     self._run_on_main_thread(self.tabela.delete, *self.tabela.get_children())
                     for aluno in alunos:
@@ -324,7 +372,7 @@ class AlunoApp:
 
             try:
                 self._run_on_main_thread(self.update_status, "Cadastrando aluno...")
-                response = requests.post(BASE_ALUNOS_URL, json=dados, headers=self._get_headers()) # Envia o token
+                response = sessao_http.post(BASE_ALUNOS_URL, json=dados, headers=self._get_headers()) # Envia o token
                 data = response.json()
                 
                 if response.status_code == 201:
@@ -356,14 +404,22 @@ class AlunoApp:
                 return
 
             aluno_id = self.entry_id.get().strip()
+            if not aluno_id:
+                # Sem ID selecionado: pesquisa pelo primeiro campo preenchido do formulário
+                termo = next((entry.get().strip() for entry in (
+                    self.entry_nome, self.entry_matricula, self.entry_email, self.entry_curso
+                ) if entry.get().strip()), "")
+                if termo:
+                    self._pesquisar_alunos(termo)
+                    return
             if not aluno_id or not aluno_id.isdigit():
-                self._run_on_main_thread(self.update_status, "Informe um ID válido para buscar", error=True)
-                self._run_on_main_thread(messagebox.showwarning, "Atenção", "Informe um ID válido para buscar.")
+                self._run_on_main_thread(self.update_status, "Informe um ID ou um termo para buscar", error=True)
+                self._run_on_main_thread(messagebox.showwarning, "Atenção", "Selecione um aluno ou preencha nome, matrícula, email ou curso para buscar.")
                 return
                 
             try:
                 self._run_on_main_thread(self.update_status, f"Buscando aluno ID {aluno_id}...")
-                response = requests.get(f"{BASE_ALUNOS_URL}{aluno_id}", headers=self._get_headers()) # Envia o token
+                response = sessao_http.get(f"{BASE_ALUNOS_URL}{aluno_id}", headers=self._get_headers()) # Envia o token
                 data = response.json() 
                 
                 if response.status_code == 200:
@@ -378,6 +434,8 @@ class AlunoApp:
                     self._run_on_main_thread(self.entry_matricula.insert, 0, aluno.get('matricula', ''))
                     self._run_on_main_thread(self.entry_curso.insert, 0, aluno.get('curso', ''))
                     self._run_on_main_thread(self.entry_email.insert, 0, aluno.get('email', ''))
+                    # Guarda o ETag para que a edição falhe (412) se outro utilizador alterar o aluno entretanto
+                    self._run_on_main_thread(self._guardar_aluno_carregado, aluno, response.headers.get('ETag'))
                     
                     self._run_on_main_thread(self.update_status, f"Aluno ID {aluno_id} carregado")
                 else:
@@ -395,6 +453,48 @@ class AlunoApp:
                 self._run_on_main_thread(messagebox.showerror, "Erro", error_msg)
 
         threading.Thread(target=thread_buscar_aluno, daemon=True).start()
+
+    def _pesquisar_alunos(self, termo):
+        """Preenche a tabela com os alunos encontrados por /search (executado na thread de busca)."""
+        try:
+            self._run_on_main_thread(self.update_status, f"Pesquisando '{termo}'...")
+            response = sessao_http.get(
+                f"{BASE_ALUNOS_URL}search",
+                params={"q": termo, "limit": 100},
+                headers=self._get_headers() # Envia o token
+            )
+            data = response.json()
+
+            if response.status_code == 200:
+                alunos = data.get('alunos', [])
+                self.etag_lista = None # A tabela deixa de mostrar a listagem completa
+                self._run_on_main_thread(self.tabela.delete, *self.tabela.get_children())
+                for aluno in alunos:
+                    self._run_on_main_thread(
+                        self.tabela.insert,
+                        "", "end",
+                        values=(
+                            aluno.get("id"),
+                            aluno.get("nome"),
+                            aluno.get("matricula"),
+                            aluno.get("curso"),
+                            aluno.get("email")
+                        )
+                    )
+                self._run_on_main_thread(self.update_status, f"{len(alunos)} aluno(s) encontrado(s) para '{termo}'")
+            else:
+                error_msg = data.get('mensagem', f'Erro ao pesquisar alunos (Status: {response.status_code})')
+                self._run_on_main_thread(self.update_status, error_msg, error=True)
+                self._run_on_main_thread(messagebox.showerror, "Erro", error_msg)
+
+        except requests.exceptions.RequestException as e:
+            error_msg = f"Erro de conexão: {str(e)}"
+            self._run_on_main_thread(self.update_status, error_msg, error=True)
+            self._run_on_main_thread(messagebox.showerror, "Erro", error_msg)
+        except ValueError: 
+            error_msg = "Resposta inválida do servidor (não é JSON válido)."
+            self._run_on_main_thread(self.update_status, error_msg, error=True)
+            self._run_on_main_thread(messagebox.showerror, "Erro", error_msg)
             
     def editar(self):
         def thread_editar_aluno():
@@ -430,9 +530,21 @@ class AlunoApp:
                 self._run_on_main_thread(messagebox.showwarning, "Aviso", "A matrícula deve conter apenas números.")
                 return
             
+            # Envia apenas os campos alterados desde que o aluno foi carregado no formulário
+            original = self.aluno_carregado
+            if original and str(original['id']) == aluno_id:
+                dados = {campo: valor for campo, valor in dados.items() if valor != original[campo]}
+                if not dados:
+                    self._run_on_main_thread(self.update_status, "Nenhuma alteração para guardar")
+                    return
+
+            headers = self._get_headers() # Envia o token
+            if original and original.get('etag') and str(original['id']) == aluno_id:
+                headers['If-Match'] = original['etag']
+
             try:
                 self._run_on_main_thread(self.update_status, f"Atualizando aluno ID {aluno_id}...")
-                response = requests.put(f"{BASE_ALUNOS_URL}{aluno_id}", json=dados, headers=self._get_headers()) # Envia o token
+                response = sessao_http.patch(f"{BASE_ALUNOS_URL}{aluno_id}", json=dados, headers=headers)
                 data = response.json()
                 
                 if response.status_code == 200:
@@ -470,7 +582,7 @@ class AlunoApp:
                 
             try:
                 self._run_on_main_thread(self.update_status, f"Excluindo aluno ID {aluno_id}...")
-                response = requests.delete(f"{BASE_ALUNOS_URL}{aluno_id}", headers=self._get_headers()) # Envia o token
+                response = sessao_http.delete(f"{BASE_ALUNOS_URL}{aluno_id}", headers=self._get_headers()) # Envia o token
                 data = response.json()
                 
                 if response.status_code == 200:
@@ -521,8 +633,17 @@ class AlunoApp:
                 self.entry_matricula.insert(0, valores[2])
                 self.entry_curso.insert(0, valores[3])
                 self.entry_email.insert(0, valores[4])
+                self._guardar_aluno_carregado({
+                    'id': valores[0], 'nome': valores[1], 'matricula': valores[2],
+                    'curso': valores[3], 'email': valores[4]
+                })
                 self.update_status(f"Aluno ID {valores[0]} selecionado")
 
+    def _guardar_aluno_carregado(self, aluno, etag=None):
+        """Memoriza os valores mostrados no formulário (como texto) e o ETag, se conhecido."""
+        self.aluno_carregado = {campo: str(aluno.get(campo, '')) for campo in ('id', 'nome', 'matricula', 'curso', 'email')}
+        self.aluno_carregado['etag'] = etag
+
 if __name__ == "__main__":
     root = tk.Tk()
     try:
@@ -0,0 +1,2 @@
+-- Permite ao utilizador da API ler o estado das réplicas (SHOW REPLICA STATUS)
+GRANT REPLICATION CLIENT ON *.* TO 'user'@'%';
@@ -0,0 +1,9 @@
+-- Replica o primário (serviço db) por GTID: o banco escola e o utilizador da API
+-- chegam pela replicação. Arranca só com o perfil "replica" do docker-compose.
+CHANGE REPLICATION SOURCE TO
+    SOURCE_HOST = 'db',
+    SOURCE_USER = 'root',
+    SOURCE_PASSWORD = 'root',
+    SOURCE_AUTO_POSITION = 1,
+    GET_SOURCE_PUBLIC_KEY = 1;
+START REPLICA;